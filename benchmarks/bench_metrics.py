@@ -0,0 +1,84 @@
+"""
+Benchmark: scalar compute_all_metrics (one dict per ticker) vs the vectorized
+batch engine, on synthetic universes.
+
+Usage:
+    python benchmarks/bench_metrics.py [n1 n2 ...]   # default: 6000 60000
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import compute_metrics, batch_metrics
+from src.data_ingestion.history_block import HISTORY_FIELDS, HistoryBlock
+from benchmarks.synthetic import make_processed_rows
+
+def bench(n):
+    rows = make_processed_rows(n)
+
+    start = time.perf_counter()
+    scalar = [compute_metrics.compute_all_metrics(row) for row in rows]
+    t_scalar = time.perf_counter() - start
+
+    # Packing lists into padded arrays is a one-off cost when histories are still lists
+    start = time.perf_counter()
+    scalar_rows = [{k: v for k, v in row.items() if k not in batch_metrics.HISTORY_FIELDS} for row in rows]
+    frame = pd.DataFrame(scalar_rows)
+    hist_values, hist_lengths = batch_metrics.pad_histories(rows)
+    t_pack = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = batch_metrics.compute_all_metrics_batch(frame, hist_values, hist_lengths)
+    t_batch = time.perf_counter() - start
+
+    expected = np.array([[m[name] for name in batch_metrics.METRIC_NAMES] for m in scalar], dtype=float)
+    match = np.allclose(batch.to_numpy(), expected, rtol=1e-9, atol=0, equal_nan=True)
+
+    print(f"n={n:>7,} | scalar {t_scalar:8.3f}s | batch {t_batch:8.4f}s "
+          f"(+{t_pack:.3f}s packing) | speedup x{t_scalar / t_batch:,.0f} "
+          f"(x{t_scalar / (t_batch + t_pack):,.1f} incl. packing) | match={match}")
+    return {"n": n, "scalar_sec": t_scalar, "batch_sec": t_batch, "pack_sec": t_pack, "match": bool(match)}
+
+def _traced(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+def bench_history_block(n):
+    """Typed histories: stacking cost into a HistoryBlock and memory vs Python lists."""
+    lists, list_bytes = _traced(lambda: [
+        {field: row[field] for field in HISTORY_FIELDS} for row in make_processed_rows(n)
+    ])
+    rows = make_processed_rows(n, typed=True)
+
+    start = time.perf_counter()
+    block = HistoryBlock.from_rows(rows)
+    t_stack = time.perf_counter() - start
+
+    frame = pd.DataFrame([{k: v for k, v in row.items() if k not in HISTORY_FIELDS and k != "hist_years"}
+                          for row in rows])
+    start = time.perf_counter()
+    batch_metrics.compute_metrics_for_block(frame, block)
+    t_batch = time.perf_counter() - start
+
+    print(f"n={n:>7,} | block stack {t_stack:.3f}s | batch {t_batch:.4f}s | "
+          f"histories: lists {list_bytes / n:,.0f} B/ticker, block {block.nbytes / n:,.0f} B/ticker")
+    del lists
+    return {"n": n, "stack_sec": t_stack, "batch_sec": t_batch,
+            "list_bytes_per_ticker": list_bytes / n, "block_bytes_per_ticker": block.nbytes / n}
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [6000, 60000]
+    for n in sizes:
+        bench(n)
+    for n in sizes:
+        bench_history_block(n)
@@ -0,0 +1,131 @@
+"""
+Local fake LLM server for offline tests and benchmarks.
+
+Speaks the llm_client.HTTPClient protocol (POST /generate {"model", "prompt"} ->
+{"text"}) with a configurable latency, and can inject throttling (HTTP 429) and
+server errors (HTTP 500). Tracks request counts and the peak number of concurrent
+requests so tests can check the worker pool and the rate limit.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_BLOCK = re.compile(r"Company \d+:\n")
+_COMPANY = re.compile(r"Company Name: (\S+)")
+
+
+def single_answer(prompt):
+    """Deterministic answer in the prompt template's four-section format."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return (
+        f"1. Business Strength Summary\nSynthetic summary {digest}.\n"
+        "2. Key Fundamental Strengths\n- Strong returns\n- Low leverage\n- Steady growth\n"
+        "3. Potential Risks to Monitor\n- Valuation\n"
+        f"4. Overall Verdict\nBuy - fundamentals intact ({digest})."
+    )
+
+
+def default_responder(prompt, bad_tickers=()):
+    """
+    Single-company prompts get single_answer(); batch prompts (prompt_template_batch.txt)
+    get a JSON array with one item per "Company Name:" line, answered as if that company
+    had been asked alone. Items for `bad_tickers` come back without the verdict section.
+    """
+    if "JSON array" not in prompt:
+        return single_answer(prompt)
+    items = []
+    for block in _BLOCK.split(prompt)[1:]:
+        match = _COMPANY.search(block)
+        if match is None:
+            continue
+        ticker = match.group(1)
+        text = single_answer(block) if ticker not in bad_tickers else "1. Business Strength Summary\nCut short"
+        items.append({"ticker": ticker, "explanation": text})
+    return json.dumps(items)
+
+
+class FakeLLMServer:
+    """
+    Threaded HTTP server on 127.0.0.1 (random port). Use as a context manager.
+
+    Args:
+        latency (float): seconds per request.
+        fail_first (int): the first N requests for each prompt return HTTP 500.
+        throttle_every (int): every Nth request overall returns HTTP 429 (0 = never).
+        responder (callable): prompt -> text.
+        bad_tickers (iterable): malformed items in batch answers (default responder only).
+    """
+
+    def __init__(self, latency=0.05, fail_first=0, throttle_every=0, responder=None, bad_tickers=()):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.throttle_every = throttle_every
+        self.bad_tickers = set(bad_tickers)
+        self.responder = responder or (lambda prompt: default_responder(prompt, self.bad_tickers))
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.request_times = []
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handle(self, prompt):
+        """Returns (status, body) for one request."""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            self.request_times.append(time.monotonic())
+            self._attempts[prompt] = self._attempts.get(prompt, 0) + 1
+            attempt = self._attempts[prompt]
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if self.throttle_every and n % self.throttle_every == 0:
+                return 429, {"error": "Too Many Requests"}
+            if attempt <= self.fail_first:
+                return 500, {"error": "Internal Server Error"}
+            return 200, {"text": self.responder(prompt)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length).decode("utf-8"))
+                status, body = fake._handle(request["prompt"])
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,247 @@
+"""
+Offline benchmark suite for the ingestion -> scoring -> monitoring pipeline.
+
+Times every stage on synthetic universes (no network access) and writes the results
+to a JSON file, so runs from different commits can be compared:
+
+    process_ticker_data   yfinance-shaped payloads -> processed rows
+    compute_all_metrics   scalar metrics, one dict per ticker
+    batch_metrics         vectorized metric engine on the same rows
+    normalize_metrics     percentile scoring over the whole universe
+    get_top_n             top 50 by final_score
+    evaluate_alerts       every alert rule over the universe vs the previous snapshot
+    generate_daily_brief  churn/trend brief from the snapshot store (LLM step stubbed out)
+    app_load              dashboard data loading (CSV reads + display/alert frames)
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000 6000 50000] [--output PATH]
+                                        [--max-process N] [--repeat R]
+
+--max-process caps how many tickers go through process_ticker_data (it is the
+slowest stage); its per-ticker time is still reported. Downstream stages always
+run on the full universe.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.data_ingestion import processor
+from src.metrics import compute_metrics, batch_metrics
+from src.scoring import scorer
+from src.monitoring import alerts
+from src.storage import snapshot_store
+from benchmarks.synthetic import make_processed_rows, make_raw_payloads
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = [1000, 6000, 50000]
+
+
+def _timed(fn, repeat=1):
+    """Best-of-`repeat` wall time of fn() in seconds, plus the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_processing(n):
+    """process_ticker_data over n synthetic tickers (payload generation not timed)."""
+    total = 0.0
+    for ticker, raw_data in make_raw_payloads(n):
+        start = time.perf_counter()
+        processor.process_ticker_data(ticker, raw_data)
+        total += time.perf_counter() - start
+    return total
+
+
+def _load_app():
+    """The dashboard module, or None when streamlit isn't installed."""
+    try:
+        from src.presentation import app
+    except ImportError:
+        return None
+    return app
+
+
+def _load_monitoring():
+    """run_monitoring, or None when one of its dependencies isn't installed."""
+    try:
+        from src.pipeline import run_monitoring
+    except ImportError:
+        return None
+    return run_monitoring
+
+
+def bench_app_load(scores_path, top_path, app):
+    # What the dashboard reads on load: the top 50 (table + alerts) and the full score list
+    top_df = pd.read_csv(top_path)
+    pd.read_csv(scores_path)
+    if app is not None:
+        app.process_top_50_data(top_df)
+        app.generate_alerts_from_data(top_df.head(50))
+
+
+def bench_daily_brief(data_dir, run_monitoring):
+    # Offline: the Gemini explanation step is skipped (it's network bound, not ours). The
+    # synchronous path is forced so no jobs are queued and no worker is started, and the
+    # explanation cache is off, even with GEMINI_API_KEY set.
+    with patch.object(settings, "DATA_DIR", data_dir), \
+            patch.object(settings, "SNAPSHOT_STORE_DIR", os.path.join(data_dir, "snapshot_store")), \
+            patch.object(settings, "LLM_ASYNC_EXPLANATIONS", False), \
+            patch.object(settings, "LLM_CACHE_ENABLED", False), \
+            patch.object(settings, "LLM_WORKER_AUTOSTART", False), \
+            patch.object(run_monitoring.generate_explanations, "generate_explanations", return_value=None), \
+            contextlib.redirect_stdout(io.StringIO()):
+        run_monitoring.generate_daily_brief()
+
+
+def run_size(n, max_process=None, repeat=1, workdir=None):
+    """
+    Times every stage for one universe size.
+
+    Returns:
+        dict: {"n": n, "stages": {stage: {"sec", "tickers", "us_per_ticker"}}}
+    """
+    stages = {}
+
+    def record(name, seconds, tickers):
+        stages[name] = {
+            "sec": seconds,
+            "tickers": tickers,
+            "us_per_ticker": seconds / tickers * 1e6 if tickers else None
+        }
+
+    n_process = min(n, max_process) if max_process else n
+    record("process_ticker_data", bench_processing(n_process), n_process)
+
+    rows = make_processed_rows(n, typed=True)
+    sec, metrics = _timed(lambda: [compute_metrics.compute_all_metrics(row) for row in rows], repeat)
+    record("compute_all_metrics", sec, n)
+    sec, _ = _timed(lambda: batch_metrics.compute_metrics_for_rows(rows), repeat)
+    record("batch_metrics", sec, n)
+
+    scalars = [{k: v for k, v in row.items() if not k.startswith("hist_")} for row in rows]
+    features = pd.DataFrame([{**row, **m} for row, m in zip(scalars, metrics)])
+    sec, scored = _timed(lambda: scorer.normalize_metrics(features), repeat)
+    record("normalize_metrics", sec, n)
+    sec, top = _timed(lambda: scorer.get_top_n(scored, n=50), repeat)
+    record("get_top_n", sec, n)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as data_dir:
+        reports = os.path.join(data_dir, "reports")
+        history = os.path.join(reports, "history")
+        os.makedirs(history)
+        # Previous day: same universe with a slightly shuffled top 50
+        rng = np.random.default_rng(n)
+        previous = scored.assign(final_score=scored["final_score"] + rng.normal(0, 1.0, len(scored)))
+        sec, _ = _timed(lambda: alerts.evaluate_alerts_frame(scored, previous), repeat)
+        record("evaluate_alerts", sec, n)
+        scorer.get_top_n(previous, n=50).to_csv(os.path.join(history, "top_50_2025-06-01.csv"), index=False)
+        top.to_csv(os.path.join(history, "top_50_2025-06-02.csv"), index=False)
+        store = snapshot_store.SnapshotStore(os.path.join(data_dir, "snapshot_store"))
+        store.append("2025-06-01", previous)
+        store.append("2025-06-02", scored)
+        run_monitoring = _load_monitoring()
+        if run_monitoring is not None:
+            sec, _ = _timed(lambda: bench_daily_brief(data_dir, run_monitoring), repeat)
+            record("generate_daily_brief", sec, 50)
+        else:
+            stages["generate_daily_brief"] = {"skipped": "run_monitoring dependencies not installed"}
+
+        scores_path = os.path.join(reports, "all_companies_scores.csv")
+        top_path = os.path.join(reports, "top_50.csv")
+        scored.to_csv(scores_path, index=False)
+        top.to_csv(top_path, index=False)
+        app = _load_app()
+        sec, _ = _timed(lambda: bench_app_load(scores_path, top_path, app), repeat)
+        record("app_load", sec, n)
+        stages["app_load"]["streamlit"] = app is not None
+
+    return {"n": n, "stages": stages}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=settings.BASE_DIR, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(sizes=None, max_process=None, repeat=1, output_path=None):
+    """
+    Runs every size and writes the JSON results file.
+
+    Returns:
+        (dict, str): results, path of the written file.
+    """
+    sizes = sizes or DEFAULT_SIZES
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "max_process": max_process,
+        "repeat": repeat,
+        "results": []
+    }
+    for n in sizes:
+        result = run_size(n, max_process=max_process, repeat=repeat)
+        results["results"].append(result)
+        print(format_result(result))
+
+    if output_path is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output_path = os.path.join(RESULTS_DIR, f"bench_{stamp}_{(commit or 'nogit')[:8]}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output_path}")
+    return results, output_path
+
+
+def format_result(result):
+    lines = [f"--- n={result['n']:,} ---"]
+    for name, stage in result["stages"].items():
+        if "skipped" in stage:
+            lines.append(f"  {name:<22} skipped ({stage['skipped']})")
+            continue
+        per = stage["us_per_ticker"]
+        lines.append(f"  {name:<22} {stage['sec']:9.4f}s  ({stage['tickers']:,} tickers, "
+                     f"{per:,.1f} us/ticker)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks on synthetic universes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", default=None, help="JSON results path (default: benchmarks/results/)")
+    parser.add_argument("--max-process", type=int, default=None,
+                        help="Cap on tickers timed through process_ticker_data")
+    parser.add_argument("--repeat", type=int, default=1, help="Best-of-R timing for the fast stages")
+    args = parser.parse_args()
+    run_suite(args.sizes, max_process=args.max_process, repeat=args.repeat, output_path=args.output)
@@ -0,0 +1,123 @@
+"""
+Synthetic universes for offline benchmarks and equivalence tests.
+No network access: everything is generated from a seeded RNG.
+"""
+import numpy as np
+
+from src.data_ingestion.history_block import HISTORY_FIELDS
+
+SCALAR_FIELDS = [
+    "net_income", "equity", "ebit", "capital_employed", "revenue", "gross_profit", "eps",
+    "total_debt", "interest_expense", "total_liabilities", "cfo", "cfi", "capex",
+    "total_assets", "receivables", "peg_ratio", "market_cap", "price_current",
+    "price_1y_ago", "revenue_3y_ago", "profit_3y_ago"
+]
+
+def _noisy(rng, n, scale, nan_rate=0.05, zero_rate=0.01, neg_rate=0.1):
+    values = rng.lognormal(mean=np.log(scale), sigma=1.0, size=n)
+    values[rng.random(n) < neg_rate] *= -1
+    values[rng.random(n) < zero_rate] = 0.0
+    values[rng.random(n) < nan_rate] = np.nan
+    return values
+
+def make_processed_rows(n, max_years=5, seed=0, typed=False):
+    """
+    Returns `n` dicts shaped like processor.process_ticker_data output,
+    with histories of 0..max_years entries (NaNs, zeros and negatives included).
+    typed=True gives float64 arrays plus `hist_years` (current processor output),
+    otherwise plain lists (legacy rows).
+    """
+    rng = np.random.default_rng(seed)
+    columns = {field: _noisy(rng, n, 1e9) for field in SCALAR_FIELDS}
+    columns["eps"] = _noisy(rng, n, 20)
+    columns["peg_ratio"] = _noisy(rng, n, 1.5, nan_rate=0.3)
+    columns["price_current"] = _noisy(rng, n, 500, neg_rate=0)
+    columns["price_1y_ago"] = _noisy(rng, n, 450, neg_rate=0)
+    lengths = rng.integers(0, max_years + 1, size=n)
+
+    hist_columns = {}
+    for field in HISTORY_FIELDS:
+        scale = 20 if field == "hist_eps" else 1e9
+        hist_columns[field] = _noisy(rng, n * max_years, scale).reshape(n, max_years)
+
+    rows = []
+    for i in range(n):
+        row = {"ticker": f"SYN{i:06d}"}
+        for field in SCALAR_FIELDS:
+            row[field] = float(columns[field][i])
+        for field in HISTORY_FIELDS:
+            hist = hist_columns[field][i, :lengths[i]]
+            row[field] = hist.copy() if typed else hist.tolist()
+        if typed:
+            row["hist_years"] = np.arange(2025, 2025 - lengths[i], -1, dtype=np.int16)
+        rows.append(row)
+    return rows
+
+# yfinance row labels per statement (first alias from settings.YAHOO_MAPPING)
+RAW_STATEMENT_ROWS = {
+    "financials": ["Total Revenue", "Net Income", "EBIT", "Gross Profit", "Basic EPS", "Interest Expense"],
+    "balance_sheet": ["Stockholders Equity", "Total Assets", "Current Liabilities", "Total Debt",
+                      "Total Liabilities Net Minority Interest", "Receivables"],
+    "cashflow": ["Operating Cash Flow", "Capital Expenditure", "Investing Cash Flow"],
+}
+
+def make_raw_payloads(n, years=5, seed=0, price_days=250):
+    """
+    Yields (ticker, raw_data) with yfinance-shaped payloads, as fetcher.fetch_raw_data returns them:
+    statements are DataFrames (row labels x fiscal year-end dates), history has a Close column,
+    info is a dict. Generated lazily so 50k-ticker universes don't sit in memory.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime([f"{2025 - k}-03-31" for k in range(years)])
+    price_index = pd.bdate_range("2024-04-01", periods=price_days)
+    for i in range(n):
+        raw_data = {}
+        for statement_type, labels in RAW_STATEMENT_ROWS.items():
+            values = rng.lognormal(np.log(1e9), 1.0, size=(len(labels), years))
+            values[rng.random(values.shape) < 0.03] = np.nan
+            raw_data[statement_type] = pd.DataFrame(values, index=labels, columns=dates)
+        raw_data["financials"].loc["Basic EPS"] /= 1e8
+        raw_data["cashflow"].loc[["Capital Expenditure", "Investing Cash Flow"]] *= -0.3
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=price_days)))
+        raw_data["history"] = pd.DataFrame({"Close": closes}, index=price_index)
+        raw_data["info"] = {"marketCap": float(rng.lognormal(np.log(1e11), 1.0)),
+                            "pegRatio": float(rng.lognormal(0.3, 0.5))}
+        yield f"SYN{i:06d}", raw_data
+
+def make_pit_archive(archive, n_tickers, n_dates, seed=0, start="2022-01-03", update_every=63):
+    """
+    Fills a PITArchive with `n_dates` business days of synthetic scored metrics and prices.
+    Metrics are redrawn around a per-ticker quality level every `update_every` dates
+    (statement updates), prices follow random walks whose drift follows quality, and
+    ~10% of tickers list part-way through.
+
+    Returns:
+        list: archived dates.
+    """
+    import pandas as pd
+    from config import settings
+
+    rng = np.random.default_rng(seed)
+    metrics = list(settings.SCORING_WEIGHTS)
+    tickers = np.array([f"SYN{i:06d}" for i in range(n_tickers)])
+    quality = rng.normal(0, 1, n_tickers)
+    listed_from = np.where(rng.random(n_tickers) < 0.1, rng.integers(0, n_dates, n_tickers), 0)
+    daily = rng.normal(0.0002 + 0.0003 * quality[None, :], 0.02, size=(n_dates, n_tickers))
+    prices = 100 * np.exp(np.cumsum(daily, axis=0))
+    direction = np.array([-1.0 if m in settings.LOWER_IS_BETTER else 1.0 for m in metrics])
+
+    dates = [d.strftime("%Y-%m-%d") for d in pd.bdate_range(start, periods=n_dates)]
+    values = None
+    for d, date in enumerate(dates):
+        if d % update_every == 0:
+            noise = rng.normal(0, 1, (len(metrics), n_tickers))
+            values = direction[:, None] * quality[None, :] + noise
+            values[rng.random(values.shape) < 0.05] = np.nan
+        listed = listed_from <= d
+        df = pd.DataFrame(values[:, listed].T, columns=metrics)
+        df.insert(0, "ticker", tickers[listed])
+        df["price"] = prices[d, listed]
+        archive.append(date, df)
+    return dates
@@ -5,12 +5,126 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 RAW_DATA_PATH = os.path.join(DATA_DIR, 'raw')
 
+# Raw Statement Cache (src/data_ingestion/raw_cache.py)
+RAW_CACHE_ENABLED = True
+RAW_CACHE_DIR = os.path.join(RAW_DATA_PATH, 'cache')
+# Calendar days a cached payload stays fresh, per statement type.
+# Annual statements change at most once a quarter; prices/info are refreshed every day.
+RAW_CACHE_TTL_DAYS = {
+    "financials": 90,
+    "balance_sheet": 90,
+    "cashflow": 90,
+    "history": 1,
+    "info": 1
+}
+RAW_CACHE_MAX_BYTES = 2 * 1024 ** 3 # 2 GB, least-recently-used entries are evicted beyond this
+RAW_CACHE_FLUSH_EVERY = 500 # Persist the index after this many writes
+
 # Market Config
 # PROCESSED DATA PATH
+# Legacy CSV, only read when the feature store is empty
 PROCESSED_DATA_PATH = os.path.join(DATA_DIR, 'processed', 'features.csv')
+# Parquet feature store (src/storage/feature_store.py), partitioned by run date
+FEATURE_STORE_DIR = os.path.join(DATA_DIR, 'processed', 'feature_store')
+FEATURE_STORE_RETENTION_DAYS = 30 # Older run partitions are pruned (0 keeps everything)
+# Checkpoint journal (src/data_ingestion/checkpoint.py): per-ticker ok / no_data / error for resume
+CHECKPOINT_PATH = os.path.join(DATA_DIR, 'processed', 'checkpoint.jsonl')
+CHECKPOINT_NO_DATA_RECHECK_DAYS = 7 # Tickers without statements are skipped until then
+CHECKPOINT_COMPACT_RATIO = 3 # Compact when the journal has this many lines per tracked ticker
+# Incremental runs (src/data_ingestion/incremental.py): reuse the previous run's rows for
+# tickers whose statements/prices are unchanged
+INCREMENTAL_MODE = True
+FEATURE_LOGIC_VERSION = 1 # Bump after changing processor/metric logic to force a full recompute
+HISTORY_YEARS = 10 # Fixed width of the multi-year history columns (fiscal years, newest first)
+# Point-in-time archive (src/backtest/pit_archive.py): every run's scored metrics + price,
+# kept forever (unlike the feature store) so backtests replay what was known on each date
+PIT_ARCHIVE_ENABLED = True
+PIT_ARCHIVE_DIR = os.path.join(DATA_DIR, 'processed', 'pit_archive')
+# Snapshot history store (src/storage/snapshot_store.py): every scoring run's ranked universe,
+# read by monitoring instead of globbing data/reports/history/top_50_*.csv
+SNAPSHOT_STORE_DIR = os.path.join(DATA_DIR, 'processed', 'snapshot_store')
+# Every ALERT_RULES metric must be here, or the brief (which evaluates the rules on snapshots) skips the rule
+SNAPSHOT_STORE_METRICS = ["debt_to_equity", "cfo", "roce_latest", "roe_10y", "pe_ratio", "price_current",
+                          "roe", "revenue_cagr", "interest_coverage", "fcf_margin"]
+SNAPSHOT_STORE_COMPACT_EVERY = 20 # Daily part files merged into the year's indexed files beyond this
+SNAPSHOT_STORE_TICKER_ROW_GROUP = 50000 # Rows per by_ticker row group (granularity of trajectory reads)
 MARKET_SUFFIX = '.NS'  # NSE stocks
 START_DATE = '2020-01-01'
 
+# Ingestion Config
+# "async" fetches every ticker's payloads concurrently (src/data_ingestion/async_ingestion.py),
+# "staged" additionally moves processing + metrics to a process pool (src/pipeline/stages.py),
+# "threads" keeps the legacy ThreadPoolExecutor loop.
+INGESTION_MODE = "async"
+INGESTION_MAX_CONCURRENCY = 16 # Global budget of in-flight provider calls
+INGESTION_ENDPOINT_CONCURRENCY = {
+    "financials": 8,
+    "balance_sheet": 8,
+    "cashflow": 8,
+    "history": 8,
+    "info": 4 # Slowest / flakiest endpoint
+}
+INGESTION_MAX_WORKERS = 16 # "threads" mode; actual request rate is governed by the rate limiter
+
+# Staged pipeline ("staged" mode): I/O stage -> bounded queue -> CPU process pool -> writer
+PIPELINE_QUEUE_SIZE = 200 # Raw payloads waiting for the CPU stage; fetching blocks when full
+PIPELINE_CHUNK_SIZE = 25 # Tickers per process-pool task (also the feature store batch size)
+PIPELINE_CPU_WORKERS = 0 # Worker processes for parsing + metrics (0 = one per CPU)
+PIPELINE_MAX_INFLIGHT_CHUNKS = 4 # Per worker; bounds memory held by submitted/finished chunks
+
+# Adaptive Rate Limiting (src/data_ingestion/rate_limiter.py)
+# Token bucket shared by all workers. The rate grows additively on success and
+# is cut multiplicatively when Yahoo throttles us (HTTP 429).
+RATE_LIMIT_INITIAL_RPS = 4.0
+RATE_LIMIT_MIN_RPS = 0.5
+RATE_LIMIT_MAX_RPS = 50.0
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_INCREASE_RPS = 0.1 # Added to the rate after every successful call
+RATE_LIMIT_DECREASE_FACTOR = 0.5 # Rate multiplier on throttle
+RATE_LIMIT_COOLDOWN_SEC = 2.0 # At most one decrease per window
+
+# Retries (per ticker, jittered exponential backoff)
+INGESTION_MAX_RETRIES = 4
+RETRY_BACKOFF_BASE_SEC = 2.0
+RETRY_BACKOFF_MAX_SEC = 120.0
+RETRY_QUEUE_MAX_SIZE = 1000
+
+# LLM Explanations (src/llm_reasoning/async_explanations.py)
+# Requests run concurrently on a bounded worker pool; the token bucket keeps us under
+# the provider's requests-per-minute quota (Gemini free tier: 15 RPM).
+LLM_MODEL = "gemini-flash-latest"
+LLM_BASE_URL = os.getenv("NFM_LLM_BASE_URL") # JSON endpoint (e.g. a local fake server) instead of Gemini
+LLM_REQUESTS_PER_MINUTE = 15
+LLM_BURST = 2 # Requests allowed back to back before the bucket throttles
+LLM_MAX_CONCURRENCY = 4
+LLM_REQUEST_TIMEOUT_SEC = 60.0
+LLM_MAX_RETRIES = 3 # Per request, jittered exponential backoff
+LLM_RETRY_BACKOFF_BASE_SEC = 4.0
+LLM_RETRY_BACKOFF_MAX_SEC = 60.0
+# Batched mode (src/llm_reasoning/batch_explanations.py): several companies per request,
+# answered as a JSON array. 1 keeps one prompt per company.
+LLM_BATCH_SIZE = 1
+LLM_BATCH_TOKEN_BUDGET = 8000 # Estimated prompt + answer tokens per batch request
+LLM_BATCH_OUTPUT_TOKENS = 300 # Expected answer tokens per company
+LLM_CHARS_PER_TOKEN = 4 # Token estimate for the budget
+
+# Explanation cache (src/llm_reasoning/explanation_cache.py)
+# Keyed on sha256(model + rendered prompt): unchanged companies reuse yesterday's text.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = None # None: DATA_DIR/processed/llm_cache.json, resolved when the cache is opened
+LLM_CACHE_MAX_AGE_DAYS = 30 # Refresh the wording at least monthly
+LLM_CACHE_MAX_ENTRIES = 5000 # Least-recently-used entries are evicted beyond this
+
+# Background explanation jobs (src/llm_reasoning/job_queue.py, explanation_worker.py)
+# The brief is published with pending verdicts; a worker patches them as results arrive.
+LLM_ASYNC_EXPLANATIONS = True # False: the brief waits for generate_explanations
+LLM_JOB_QUEUE_PATH = None # None: DATA_DIR/processed/llm_jobs.sqlite, resolved when the queue is opened
+LLM_WORKER_AUTOSTART = True # run_pipeline / run_monitoring spawn a background worker when the brief queues jobs
+LLM_WORKER_CLAIM_SIZE = 50 # Jobs claimed per round
+LLM_WORKER_POLL_SEC = 5.0 # --wait: polling interval for jobs running in other workers
+LLM_JOB_STALE_SEC = 900 # A running job older than this (dead worker) is claimed again
+LLM_JOB_RETENTION_DAYS = 7 # Finished jobs are purged after this
+
 # Metrics Schema (Required Fields for NFM Model)
 REQUIRED_FIELDS = [
     # Profitability
@@ -99,6 +213,60 @@ SCORING_WEIGHTS = {
     "mkt_cap_retained_val": 8.0, # "Market cap — (retained earnings * annual growth)"
     "market_share": 3.0 # Placeholder
 }
+# final_score is a weighted sum of percentiles: 0 to the sum of the weights
+SCORING_MAX_SCORE = sum(SCORING_WEIGHTS.values())
+
+# Backtest (src/backtest/engine.py)
+BACKTEST_TOP_N = 50
+BACKTEST_REBALANCE_DAYS = 1 # Churn is applied every N archived dates (1 = daily, like the pipeline)
+BACKTEST_COST_BPS = 10.0 # Transaction cost per unit of traded value, in basis points
+BACKTEST_CHUNK_DATES = 32 # Dates scored per vectorized pass (bounds memory: dates x metrics x tickers)
+
+# Churn (src/monitoring/churn.py): hysteresis bands so tickers oscillating around
+# rank 50 don't trade every day
+CHURN_ENTRY_RANK = 40 # Buy when ranked within this
+CHURN_EXIT_RANK = 60 # Sell when ranked beyond this
+CHURN_MIN_HOLD_DAYS = 5 # Snapshots a position is held before a rank-based exit
+CHURN_FORCED_EXIT_ALERTS = ["SCORE_DROP", "CASH_FLOW_COLLAPSE"] # Exit immediately, even within the bands
+
+# Alert rules (src/monitoring/rules.py), compiled once into vectorized evaluators.
+#   metric:      snapshot column the rule reads
+#   comparison:  "absolute"    -> the current value
+#                "vs_previous" -> current - previous (tickers without a previous row never trigger)
+#                "relative"    -> (current - previous) / previous, only where previous > 0
+#   op:          "<", "<=", ">", ">=" or "between" (exclusive, threshold = [low, high])
+#   escalate:    optional {"op", "threshold", "severity"} on the same compared value
+#   scale:       optional divisor for "absolute" rules (e.g. SCORING_MAX_SCORE compares
+#                final_score as a share of the maximum); the message shows the raw value
+#   message:     str.format template; fields: value, previous, change, pct, abs_pct
+ALERT_RULES = [
+    # Change rules (vs the previous snapshot)
+    {"type": "SCORE_DROP", "metric": "final_score", "comparison": "relative", "op": "<", "threshold": -0.15,
+     "severity": "HIGH", "message": "Composite score dropped by {abs_pct:.1%}"},
+    {"type": "DEBT_SPIKE", "metric": "debt_to_equity", "comparison": "vs_previous", "op": ">", "threshold": 0.5,
+     "severity": "MEDIUM", "message": "Debt/Equity ratio spiked from {previous:.2f} to {value:.2f}"},
+    {"type": "CASH_FLOW_COLLAPSE", "metric": "cfo", "comparison": "relative", "op": "<", "threshold": -0.50,
+     "severity": "HIGH", "message": "Operating Cash Flow collapsed by {abs_pct:.1%}"},
+    # Level rules (current snapshot only)
+    {"type": "HIGH_DEBT", "metric": "debt_to_equity", "comparison": "absolute", "op": ">", "threshold": 1.0,
+     "severity": "MEDIUM", "escalate": {"op": ">", "threshold": 2.0, "severity": "HIGH"},
+     "message": "Debt/Equity ratio at {value:.2f}"},
+    {"type": "NEGATIVE_FCF", "metric": "fcf_margin", "comparison": "absolute", "op": "<", "threshold": 0.0,
+     "severity": "MEDIUM", "escalate": {"op": "<", "threshold": -0.10, "severity": "HIGH"},
+     "message": "Free Cash Flow margin is negative ({value:.1%})"},
+    # A typical company scores about half the maximum
+    {"type": "LOW_SCORE", "metric": "final_score", "comparison": "absolute", "scale": SCORING_MAX_SCORE,
+     "op": "<", "threshold": 0.45, "severity": "MEDIUM", "escalate": {"op": "<", "threshold": 0.40, "severity": "HIGH"},
+     "message": f"Composite score below 45% of the maximum ({{value:.1f}}/{SCORING_MAX_SCORE:.0f})"},
+    {"type": "LOW_PROFITABILITY", "metric": "roe", "comparison": "absolute", "op": "between", "threshold": [0.0, 0.10],
+     "severity": "LOW", "message": "ROE below 10% ({value:.1%})"},
+    {"type": "NEGATIVE_GROWTH", "metric": "revenue_cagr", "comparison": "absolute", "op": "<", "threshold": 0.0,
+     "severity": "MEDIUM", "escalate": {"op": "<", "threshold": -0.10, "severity": "HIGH"},
+     "message": "Revenue declining ({value:.1%} CAGR)"},
+    {"type": "SOLVENCY_RISK", "metric": "interest_coverage", "comparison": "absolute", "op": "between", "threshold": [0.0, 3.0],
+     "severity": "MEDIUM", "escalate": {"op": "<", "threshold": 1.5, "severity": "HIGH"},
+     "message": "Interest Coverage Ratio low ({value:.2f})"}
+]
 
 # Metrics where lower values are better (Rank Inversion)
 # Updated based on standard interpretation unless user implied otherwise
@@ -0,0 +1,263 @@
+"""
+Backtest engine for the Top 50 strategy on the point-in-time archive.
+
+1. Replay: for every archived date, score the universe exactly like
+   scorer.normalize_metrics would have on that day's features. Dates are scored in
+   chunks of BACKTEST_CHUNK_DATES: the (dates x metrics x tickers) cube is ranked as one
+   (dates*metrics, tickers) matrix by the scorer's kernel, tickers not archived on a date
+   are left out of that date's ranking.
+2. Churn: on rebalance dates, churn.churn_step sells holdings ranked beyond `exit_rank`
+   (once held `min_hold` rebalances) and buys tickers ranked within `entry_rank` (both
+   50 and no holding period by default, i.e. churn.decide_churn).
+   Entrants get an equal 1/holdings weight, funded pro-rata from the kept positions;
+   nothing else is traded, so turnover measures churn only.
+3. Performance: daily NAV, CAGR, XIRR of the cash flows (initial capital, optional
+   periodic contributions, final value), turnover and max drawdown.
+
+Prices are forward-filled; a ticker can only be bought once it has a price.
+"""
+import os
+import sys
+import time
+from datetime import date as date_cls
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from src.scoring import scorer
+from src.backtest import pit_archive
+from src.monitoring import churn
+
+
+def _to_date(value):
+    return value if isinstance(value, date_cls) else pd.Timestamp(value).date()
+
+
+def xirr(amounts, dates, guess=0.1, tol=1e-10, max_iter=100):
+    """
+    Annualized internal rate of return of irregular cash flows (Excel XIRR convention,
+    365-day years). Negative amounts are investments, positive ones are withdrawals.
+
+    Returns:
+        float: rate, NaN if there is no sign change.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if not (amounts > 0).any() or not (amounts < 0).any():
+        return np.nan
+    start = _to_date(dates[0])
+    years = np.array([(_to_date(d) - start).days / 365.0 for d in dates])
+
+    def npv(rate):
+        return np.sum(amounts / (1 + rate) ** years)
+
+    # Newton steps, then bisection if they leave the valid range or don't converge
+    rate = guess
+    for _ in range(max_iter):
+        if rate <= -1:
+            break
+        value = npv(rate)
+        derivative = np.sum(-years * amounts / (1 + rate) ** (years + 1))
+        if derivative == 0:
+            break
+        step = value / derivative
+        rate -= step
+        if abs(step) < tol:
+            return float(rate) if rate > -1 else np.nan
+
+    lo, hi = -0.9999, 10.0
+    if npv(lo) * npv(hi) > 0:
+        return np.nan
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if npv(lo) * npv(mid) <= 0:
+            hi = mid
+        else:
+            lo = mid
+        if hi - lo < tol:
+            break
+    return float((lo + hi) / 2)
+
+
+def replay_scores(values, present, metrics, weights=None):
+    """
+    Final scores for a chunk of dates, identical to normalize_metrics on each date's frame.
+
+    Args:
+        values (np.ndarray): (dates, metrics, tickers) archived metric values.
+        present (np.ndarray): (dates, tickers) bool mask of tickers in each date's universe.
+        metrics (list): metric names (rows of `values`).
+        weights (dict): scoring weights (default settings.SCORING_WEIGHTS).
+
+    Returns:
+        np.ndarray: (dates, tickers) scores, NaN for tickers not in the universe.
+    """
+    weights = weights or settings.SCORING_WEIGHTS
+    n_dates, n_metrics, n_tickers = values.shape
+    lower = np.array([m in settings.LOWER_IS_BETTER for m in metrics], dtype=bool)
+    mask = np.repeat(present, n_metrics, axis=0)
+    percentiles = scorer.directional_percentile_matrix(
+        values.reshape(n_dates * n_metrics, n_tickers), np.tile(lower, n_dates), mask
+    ).reshape(n_dates, n_metrics, n_tickers)
+
+    # Summed metric by metric, in weight order (same floating point result as normalize_metrics)
+    scores = np.zeros((n_dates, n_tickers))
+    for j, metric in enumerate(metrics):
+        scores += percentiles[:, j, :] * weights[metric]
+    scores[~present] = np.nan
+    return scores
+
+
+def rank_positions(scores, present):
+    """1-based ranks of one date's scores (get_top_n order), 0 for tickers not in the universe."""
+    valid = np.flatnonzero(present)
+    order = valid[scorer.top_n_positions(scores[valid], len(valid))]
+    ranks = np.zeros(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(order) + 1)
+    return ranks
+
+
+def run_backtest(archive=None, start=None, end=None, top_n=None, entry_rank=None, exit_rank=None,
+                 rebalance_every=None, cost_bps=None, initial_capital=1_000_000.0,
+                 contribution=0.0, weights=None, chunk_dates=None, min_hold=0):
+    """
+    Replays the strategy over the archived dates in [start, end].
+
+    Args:
+        archive (PITArchive): source of point-in-time features and prices.
+        top_n (int): portfolio size target (default settings.BACKTEST_TOP_N).
+        entry_rank (int): buy tickers ranked within this (default top_n).
+        exit_rank (int): sell holdings ranked beyond this (default top_n).
+        min_hold (int): rebalances a position is held before a rank-based exit.
+        rebalance_every (int): apply churn every N archived dates (default settings.BACKTEST_REBALANCE_DAYS).
+        cost_bps (float): transaction cost on traded value (default settings.BACKTEST_COST_BPS).
+        contribution (float): cash added on every rebalance after the first (SIP-style); affects XIRR.
+        weights (dict): scoring weights (default settings.SCORING_WEIGHTS).
+
+    Returns:
+        dict: {"nav": pd.DataFrame (date -> value, holdings, turnover, cash_flow),
+               "summary": dict of CAGR / XIRR / turnover / drawdown}
+    """
+    archive = archive or pit_archive.PITArchive()
+    top_n = top_n or settings.BACKTEST_TOP_N
+    entry_rank = entry_rank or top_n
+    exit_rank = exit_rank or top_n
+    rebalance_every = rebalance_every or settings.BACKTEST_REBALANCE_DAYS
+    cost_bps = settings.BACKTEST_COST_BPS if cost_bps is None else cost_bps
+    chunk_dates = chunk_dates or settings.BACKTEST_CHUNK_DATES
+    weights = weights or settings.SCORING_WEIGHTS
+    metrics = [m for m in pit_archive.archive_metrics() if m in weights]
+
+    dates = archive.dates(start, end)
+    if len(dates) < 2:
+        raise ValueError(f"Backtest needs at least 2 archived dates, found {len(dates)} in {archive.root}")
+    started = time.perf_counter()
+    tickers = archive.tickers(dates)
+    prices = pd.DataFrame(archive.read_prices(dates, tickers)).ffill().to_numpy()
+
+    shares = np.zeros(len(tickers))
+    held_days = np.zeros(len(tickers), dtype=np.int64)
+    cash = float(initial_capital)
+    records = []
+    cash_flows = [(-float(initial_capital), dates[0])]
+
+    for chunk_start in range(0, len(dates), chunk_dates):
+        chunk = dates[chunk_start:chunk_start + chunk_dates]
+        values, present = archive.read_panel(chunk, tickers, metrics)
+        scores = replay_scores(values, present, metrics, weights)
+
+        for offset, date in enumerate(chunk):
+            d = chunk_start + offset
+            price = np.nan_to_num(prices[d])
+            value = cash + shares @ price
+            turnover, flow = 0.0, 0.0
+
+            if d % rebalance_every == 0 and d < len(dates) - 1:
+                if d > 0 and contribution:
+                    cash += contribution
+                    value += contribution
+                    flow = -contribution
+                    cash_flows.append((-float(contribution), date))
+                # Ranked over the day's whole universe; only tickers with a price can be bought
+                ranks = rank_positions(scores[offset], present[offset])
+                tradable = present[offset] & (price > 0)
+                held = shares > 0
+                actions, _, _, held_days = churn.churn_step(
+                    ranks, held, held_days, eligible=tradable,
+                    entry_rank=entry_rank, exit_rank=exit_rank, min_hold=min_hold)
+                keep = actions == churn.KEEP
+                entrants = actions == churn.ADD
+
+                current = np.where(price > 0, shares * price, 0.0) / value if value > 0 else np.zeros_like(price)
+                target = np.zeros_like(current)
+                holdings = keep.sum() + entrants.sum()
+                if holdings:
+                    target[entrants] = 1.0 / holdings
+                    kept_weight = current[keep].sum()
+                    if kept_weight > 0:
+                        target[keep] = current[keep] / kept_weight * (1 - entrants.sum() / holdings)
+                    else:
+                        target[keep | entrants] = 1.0 / holdings
+                # One-way turnover; costs are charged on both legs
+                traded = np.abs(target - current).sum()
+                turnover = traded / 2
+                value -= traded * value * cost_bps / 1e4
+                shares = np.where(price > 0, target * value / np.where(price > 0, price, 1.0), 0.0)
+                cash = value * (1 - target.sum())
+
+            records.append({"date": date, "value": value, "holdings": int((shares > 0).sum()),
+                            "turnover": turnover, "cash_flow": flow})
+
+    nav = pd.DataFrame(records).set_index("date")
+    final_value = nav["value"].iloc[-1]
+    cash_flows.append((float(final_value), dates[-1]))
+    summary = summarize(nav, initial_capital, cash_flows)
+    summary["elapsed_sec"] = time.perf_counter() - started
+    summary["tickers"] = len(tickers)
+    return {"nav": nav, "summary": summary}
+
+
+def summarize(nav, initial_capital, cash_flows):
+    """CAGR (time-weighted), XIRR (money-weighted), turnover and drawdown of a NAV series."""
+    first, last = _to_date(nav.index[0]), _to_date(nav.index[-1])
+    years = max((last - first).days / 365.0, 1e-9)
+    # Time-weighted growth strips out contributions
+    flows = nav["cash_flow"].to_numpy()
+    values = nav["value"].to_numpy()
+    growth = np.empty(len(values))
+    growth[0] = values[0] / initial_capital  # first day's trading costs
+    growth[1:] = (values[1:] + flows[1:]) / values[:-1]
+    growth_total = float(np.prod(growth))
+    wealth = np.cumprod(growth)
+    drawdown = 1 - wealth / np.maximum.accumulate(wealth)
+    amounts, dates = zip(*cash_flows)
+    return {
+        "start": str(first),
+        "end": str(last),
+        "years": years,
+        "final_value": float(values[-1]),
+        "total_return": growth_total - 1,
+        "cagr": growth_total ** (1 / years) - 1,
+        "xirr": xirr(amounts, dates),
+        "turnover_total": float(nav["turnover"].sum()),
+        "turnover_annual": float(nav["turnover"].sum() / years),
+        "max_drawdown": float(drawdown.max()),
+        "avg_holdings": float(nav["holdings"].mean())
+    }
+
+
+def format_summary(summary):
+    return (f"Backtest {summary['start']} -> {summary['end']} ({summary['years']:.1f}y, {summary['tickers']} tickers)\n"
+            f"CAGR: {summary['cagr']:.2%} | XIRR: {summary['xirr']:.2%} | Total return: {summary['total_return']:.2%}\n"
+            f"Turnover: {summary['turnover_annual']:.2f}x/yr | Max drawdown: {summary['max_drawdown']:.2%} | "
+            f"Avg holdings: {summary['avg_holdings']:.1f} | Elapsed: {summary['elapsed_sec']:.1f}s")
+
+
+if __name__ == "__main__":
+    start = sys.argv[1] if len(sys.argv) > 1 else None
+    end = sys.argv[2] if len(sys.argv) > 2 else None
+    result = run_backtest(start=start, end=end)
+    print(format_summary(result["summary"]))
@@ -0,0 +1,126 @@
+"""
+Point-in-time archive of the scored metrics and prices of every run.
+
+The feature store keeps FEATURE_STORE_RETENTION_DAYS of runs and top_50_*.csv only the
+final lists, so neither can replay history. The archive keeps, for every run date,
+what was known that day:
+
+    settings.PIT_ARCHIVE_DIR/date=YYYY-MM-DD.parquet   # ticker, price, SCORING_WEIGHTS metrics
+
+One small ticker-sorted file per date (float64 columns), written atomically and never
+pruned. Backtests read a few columns for a range of dates and stack them on one
+ticker axis (read_panel / read_prices).
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import settings
+from src.storage import feature_store
+
+PRICE_COLUMN = "price"
+_FILE_RE = re.compile(r"^date=(\d{4}-\d{2}-\d{2})\.parquet$")
+
+
+def archive_metrics():
+    """Metrics the scorer uses (the archive stores exactly these)."""
+    return list(settings.SCORING_WEIGHTS)
+
+
+class PITArchive:
+    """Append-only, one Parquet file per date."""
+
+    def __init__(self, root=None):
+        self.root = root or settings.PIT_ARCHIVE_DIR
+
+    def _path(self, date):
+        return os.path.join(self.root, f"date={date}.parquet")
+
+    def dates(self, start=None, end=None):
+        """Archived dates (YYYY-MM-DD strings, ascending), optionally within [start, end]."""
+        if not os.path.isdir(self.root):
+            return []
+        dates = sorted(m.group(1) for m in map(_FILE_RE.match, os.listdir(self.root)) if m)
+        return [d for d in dates if (start is None or d >= start) and (end is None or d <= end)]
+
+    def append(self, date, df):
+        """
+        Writes (or replaces) one date's snapshot.
+
+        Args:
+            date (str): YYYY-MM-DD.
+            df (pd.DataFrame): `ticker`, `price` and metric columns (missing metrics are stored as NaN).
+        """
+        columns = {"ticker": pa.array(df["ticker"].astype(str).to_numpy(), type=pa.string())}
+        for col in [PRICE_COLUMN] + archive_metrics():
+            values = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+            columns[col] = pa.array(np.broadcast_to(np.asarray(values, dtype=np.float64), len(df)))
+        table = pa.table(columns).sort_by("ticker")
+
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(date)
+        # Hidden temp name + rename, so a crash never leaves a torn file
+        tmp_path = os.path.join(self.root, "." + os.path.basename(path) + ".tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return path
+
+    def archive_feature_run(self, store=None, run_date=None):
+        """
+        Copies one feature store run (default: the latest) into the archive.
+
+        Returns:
+            str: archived date (None if the store is empty).
+        """
+        store = store or feature_store.FeatureStore()
+        run_date = run_date or store.latest_run_date()
+        if run_date is None:
+            return None
+        metrics = [m for m in archive_metrics() if m in feature_store.SCALAR_COLUMNS]
+        df = store.read(columns=["price_current"] + metrics, run_date=run_date)
+        self.append(run_date, df.rename(columns={"price_current": PRICE_COLUMN}))
+        return run_date
+
+    def read_date(self, date, columns=None):
+        """One date's snapshot as a DataFrame (ticker-sorted)."""
+        columns = None if columns is None else ["ticker"] + [c for c in columns if c != "ticker"]
+        return pq.read_table(self._path(date), columns=columns).to_pandas()
+
+    def tickers(self, dates):
+        """Sorted union of the tickers archived on `dates` (the panel's ticker axis)."""
+        tickers = set()
+        for date in dates:
+            tickers.update(pq.read_table(self._path(date), columns=["ticker"]).column("ticker").to_pylist())
+        return np.array(sorted(tickers), dtype=object)
+
+    def read_panel(self, dates, tickers, columns):
+        """
+        Stacks columns of several dates on a common ticker axis.
+
+        Args:
+            dates (list): archived dates.
+            tickers (np.ndarray): ticker axis (see tickers()).
+            columns (list): columns to read.
+
+        Returns:
+            (np.ndarray, np.ndarray): values (dates, columns, tickers) with NaN where a
+            ticker wasn't archived, and a (dates, tickers) bool mask of archived tickers.
+        """
+        axis = pd.Index(tickers)
+        values = np.full((len(dates), len(columns), len(axis)), np.nan)
+        present = np.zeros((len(dates), len(axis)), dtype=bool)
+        for d, date in enumerate(dates):
+            df = self.read_date(date, columns)
+            idx = axis.get_indexer(df["ticker"])
+            values[d][:, idx] = df[columns].to_numpy(dtype=np.float64).T
+            present[d, idx] = True
+        return values, present
+
+    def read_prices(self, dates, tickers):
+        """(dates, tickers) price matrix."""
+        values, _ = self.read_panel(dates, tickers, [PRICE_COLUMN])
+        return values[:, 0, :]
@@ -0,0 +1,347 @@
+"""
+Asyncio ingestion engine.
+
+Fetches the per-ticker payloads (financials, balance_sheet, cashflow, history, info)
+concurrently instead of one blocking call after another, and streams every completed
+ticker straight to a callback (processing + metrics) as soon as it is ready.
+
+Concurrency is bounded twice (and the request rate by the shared AdaptiveRateLimiter):
+- a global budget of in-flight provider calls (INGESTION_MAX_CONCURRENCY)
+- a per-endpoint budget (INGESTION_ENDPOINT_CONCURRENCY), e.g. `info` is flakier
+  than the statements so it gets fewer slots.
+
+A "provider" is any callable `provider(ticker, statement_type)` returning the raw payload.
+It can be a plain (blocking) function, which is run on a dedicated thread pool,
+or an `async def` coroutine function (e.g. a local fake provider in tests).
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import time
+
+import numpy as np
+
+from config import settings
+from src.data_ingestion import fetcher, raw_cache, rate_limiter
+
+
+class ConcurrencyBudget:
+    """Global + per-endpoint semaphores shared by all ticker workers."""
+
+    def __init__(self, global_limit, endpoint_limits=None):
+        self.global_limit = global_limit
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.global_slots = asyncio.Semaphore(global_limit)
+        self._endpoints = {
+            name: asyncio.Semaphore(min(limit, global_limit))
+            for name, limit in self.endpoint_limits.items()
+        }
+
+    def endpoint(self, statement_type):
+        # Endpoints without an explicit budget are only bound by the global one
+        if statement_type not in self._endpoints:
+            self._endpoints[statement_type] = asyncio.Semaphore(self.global_limit)
+        return self._endpoints[statement_type]
+
+
+class IngestionStats:
+    """Collects per-call latencies and per-ticker outcomes for the throughput report."""
+
+    def __init__(self):
+        self.started_at = None
+        self.finished_at = None
+        self.fetch_latencies = {}    # statement_type -> [seconds]
+        self.ticker_latencies = []   # seconds from first call to last payload
+        self.tickers_ok = 0
+        self.tickers_no_data = 0
+        self.tickers_failed = 0
+        self.fetch_errors = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = {}           # ticker -> reason, after all retries
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    def record_failure(self, ticker, reason):
+        self.tickers_failed += 1
+        self.failures[ticker] = reason
+
+    def record_fetch(self, statement_type, latency):
+        self.fetch_latencies.setdefault(statement_type, []).append(latency)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def tickers_done(self):
+        return self.tickers_ok + self.tickers_no_data + self.tickers_failed
+
+    def report(self):
+        """
+        Returns a dict with throughput (tickers/sec) and p50/p95 fetch latencies
+        (overall and per endpoint, in milliseconds).
+        """
+        elapsed = self.elapsed
+        all_latencies = [l for values in self.fetch_latencies.values() for l in values]
+
+        def pct(values, q):
+            if not values:
+                return np.nan
+            return float(np.percentile(values, q) * 1000)
+
+        return {
+            "tickers": self.tickers_done,
+            "tickers_ok": self.tickers_ok,
+            "tickers_no_data": self.tickers_no_data,
+            "tickers_failed": self.tickers_failed,
+            "fetch_calls": len(all_latencies),
+            "fetch_errors": self.fetch_errors,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "elapsed_sec": elapsed,
+            "tickers_per_sec": self.tickers_done / elapsed if elapsed > 0 else np.nan,
+            "fetch_p50_ms": pct(all_latencies, 50),
+            "fetch_p95_ms": pct(all_latencies, 95),
+            "ticker_p50_ms": pct(self.ticker_latencies, 50),
+            "ticker_p95_ms": pct(self.ticker_latencies, 95),
+            "endpoints": {
+                name: {
+                    "calls": len(values),
+                    "p50_ms": pct(values, 50),
+                    "p95_ms": pct(values, 95)
+                }
+                for name, values in sorted(self.fetch_latencies.items())
+            }
+        }
+
+    def format_report(self):
+        """Human readable throughput report (printed at the end of a run)."""
+        r = self.report()
+        lines = [
+            "--- Ingestion Throughput Report ---",
+            f"Tickers: {r['tickers']} (ok={r['tickers_ok']}, no_data={r['tickers_no_data']}, failed={r['tickers_failed']})",
+            f"Elapsed: {r['elapsed_sec']:.1f}s | Throughput: {r['tickers_per_sec']:.2f} tickers/sec",
+            f"Fetch latency: p50={r['fetch_p50_ms']:.0f}ms p95={r['fetch_p95_ms']:.0f}ms ({r['fetch_calls']} calls, {r['fetch_errors']} errors)",
+            f"Ticker latency: p50={r['ticker_p50_ms']:.0f}ms p95={r['ticker_p95_ms']:.0f}ms",
+            f"Throttled calls: {r['throttled']} | Ticker retries: {r['retries']}",
+        ]
+        for name, ep in r["endpoints"].items():
+            lines.append(f"  {name:<14} calls={ep['calls']:<6} p50={ep['p50_ms']:.0f}ms p95={ep['p95_ms']:.0f}ms")
+        return "\n".join(lines)
+
+
+def is_async_provider(provider):
+    """True for `async def` functions and objects with an `async def __call__`."""
+    return (inspect.iscoroutinefunction(provider)
+            or inspect.iscoroutinefunction(getattr(provider, "__call__", None)))
+
+
+async def _call_provider(provider, ticker, statement_type, executor):
+    if is_async_provider(provider):
+        return await provider(ticker, statement_type)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, provider, ticker, statement_type)
+
+
+class TickerFetchError(Exception):
+    """A required payload for a ticker could not be fetched (retryable)."""
+
+    def __init__(self, ticker, statement_type, cause):
+        super().__init__(f"{statement_type}: {cause}")
+        self.ticker = ticker
+        self.statement_type = statement_type
+        self.cause = cause
+        self.throttled = rate_limiter.is_throttle_error(cause)
+
+
+async def fetch_statement_async(ticker, statement_type, provider, budget, stats, executor=None,
+                                cache=None, limiter=None):
+    """
+    Fetches one payload while holding a global and an endpoint slot.
+    Cache hits are served without taking a slot or a rate-limiter token. Cache reads
+    and writes hit the disk, so they run on `executor` (default pool if None), not the loop.
+    """
+    loop = asyncio.get_running_loop()
+    if cache is not None:
+        payload = await loop.run_in_executor(executor, cache.get, ticker, statement_type)
+        if payload is not None:
+            return payload
+
+    async with budget.endpoint(statement_type):
+        async with budget.global_slots:
+            if limiter is not None:
+                delay = limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            start = time.perf_counter()
+            try:
+                payload = await _call_provider(provider, ticker, statement_type, executor)
+            except Exception as e:
+                if limiter is not None and limiter.on_error(e):
+                    stats.throttled += 1
+                raise
+            finally:
+                stats.record_fetch(statement_type, time.perf_counter() - start)
+            if limiter is not None:
+                limiter.on_success()
+
+    if cache is not None and raw_cache.is_cacheable(payload):
+        await loop.run_in_executor(executor, cache.put, ticker, statement_type, payload)
+    return payload
+
+
+async def fetch_ticker_async(ticker, provider, budget, stats, executor=None, cache=None,
+                             limiter=None):
+    """
+    Fetches all STATEMENT_TYPES for one ticker concurrently.
+
+    Returns:
+        dict: raw data in the same shape as fetcher.fetch_financials, or None when
+              the ticker has no annual statements.
+
+    Raises:
+        TickerFetchError: a required payload failed (or `info` was throttled).
+    """
+    start = time.perf_counter()
+    tasks = [
+        fetch_statement_async(ticker, statement_type, provider, budget, stats, executor, cache, limiter)
+        for statement_type in fetcher.STATEMENT_TYPES
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    stats.ticker_latencies.append(time.perf_counter() - start)
+
+    payloads = {}
+    for statement_type, result in zip(fetcher.STATEMENT_TYPES, results):
+        if isinstance(result, Exception):
+            stats.fetch_errors += 1
+            if statement_type == "info" and not rate_limiter.is_throttle_error(result):
+                # Same leniency as the sync fetcher: info is optional
+                result = {}
+            else:
+                raise TickerFetchError(ticker, statement_type, result)
+        payloads[statement_type] = result
+
+    raw_data = fetcher.assemble_raw_data(ticker, payloads)
+    if raw_data is None:
+        stats.tickers_no_data += 1
+    else:
+        stats.tickers_ok += 1
+    return raw_data
+
+
+async def ingest(tickers, on_result=None, provider=None, max_concurrency=None,
+                 endpoint_concurrency=None, stats=None, cache=None, limiter=None,
+                 max_retries=None, retry_queue=None, stop=None):
+    """
+    Streams raw data for `tickers` into `on_result(ticker, raw_data)`.
+
+    The callback is invoked in the event loop thread as soon as each ticker's payloads
+    are complete (raw_data is None for tickers with missing statements or that failed
+    all retries), so processing and metric computation overlap with the remaining fetches.
+    It may be an `async def`: it is then awaited, so a consumer applying backpressure
+    only holds up that worker, never the loop.
+    When `stop` (threading.Event) is set, workers take no new tickers and ingestion
+    returns once the tickers in flight are done.
+    When `cache` (RawStatementCache) is given, fresh payloads are read from disk (off the loop).
+    When `limiter` (AdaptiveRateLimiter) is given, every provider call takes a token.
+
+    Failed tickers are retried up to `max_retries` times with jittered exponential
+    backoff via a bounded RetryQueue; final failures are kept in stats.failures.
+
+    Returns:
+        IngestionStats
+    """
+    provider = provider or fetcher.fetch_statement
+    max_concurrency = max_concurrency or settings.INGESTION_MAX_CONCURRENCY
+    if endpoint_concurrency is None:
+        endpoint_concurrency = settings.INGESTION_ENDPOINT_CONCURRENCY
+    if max_retries is None:
+        max_retries = settings.INGESTION_MAX_RETRIES
+    stats = stats or IngestionStats()
+    retry_queue = retry_queue or rate_limiter.RetryQueue()
+
+    budget = ConcurrencyBudget(max_concurrency, endpoint_concurrency)
+    queue = asyncio.Queue()
+    for t in tickers:
+        queue.put_nowait(t)
+
+    # One worker per global slot keeps the number of tickers in flight bounded,
+    # while each ticker still fans out over its endpoints.
+    n_workers = max(1, min(max_concurrency, len(tickers)))
+    executor = None
+    if not is_async_provider(provider):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def next_ticker():
+        """Ready retries first, then fresh tickers; waits out pending backoffs."""
+        while True:
+            item = retry_queue.pop_ready()
+            if item is not None:
+                return item
+            try:
+                return queue.get_nowait(), 0
+            except asyncio.QueueEmpty:
+                wait = retry_queue.next_ready_in()
+                if wait is None:
+                    return None
+                await asyncio.sleep(wait)
+
+    async def worker():
+        while True:
+            if stop is not None and stop.is_set():
+                return
+            item = await next_ticker()
+            if item is None:
+                return
+            ticker, attempt = item
+            try:
+                raw_data = await fetch_ticker_async(ticker, provider, budget, stats, executor, cache, limiter)
+            except Exception as e:
+                reason = str(e)
+                if attempt < max_retries:
+                    if retry_queue.push(ticker, attempt + 1, rate_limiter.backoff_delay(attempt)):
+                        stats.retries += 1
+                        continue
+                    reason = f"retry queue full: {reason}"
+                print(f"Error ingesting {ticker} after {attempt + 1} attempt(s): {reason}")
+                stats.record_failure(ticker, reason)
+                raw_data = None
+            if on_result is not None:
+                result = on_result(ticker, raw_data)
+                if inspect.isawaitable(result):
+                    await result
+
+    stats.start()
+    try:
+        await asyncio.gather(*(worker() for _ in range(n_workers)))
+    finally:
+        stats.stop()
+        if executor is not None:
+            executor.shutdown(wait=False)
+    return stats
+
+
+def run_ingestion(tickers, on_result=None, provider=None, max_concurrency=None,
+                  endpoint_concurrency=None, cache=None, limiter=None, max_retries=None, stats=None,
+                  stop=None):
+    """Synchronous entry point for `ingest` (used by run_data_pipeline)."""
+    return asyncio.run(ingest(
+        tickers,
+        on_result=on_result,
+        provider=provider,
+        max_concurrency=max_concurrency,
+        endpoint_concurrency=endpoint_concurrency,
+        stats=stats,
+        cache=cache,
+        limiter=limiter,
+        max_retries=max_retries,
+        stop=stop
+    ))
@@ -0,0 +1,158 @@
+"""
+Append-only checkpoint journal for resumable ingestion.
+
+Every finished ticker gets one JSON line in settings.CHECKPOINT_PATH:
+
+    {"ticker": "TCS", "status": "ok", "reason": null, "run_date": "2025-06-02", "ts": 1748822400.0}
+
+- ok:      features were written to the feature store for `run_date`
+- no_data: Yahoo returned no statements (skipped until the recheck interval passes)
+- error:   fetch/processing failed after retries (retried on the next run or resume)
+
+Lines are appended and fsync'd, so a crash loses at most the batch being written.
+A torn last line (crash mid-write) is ignored when the journal is read back, and the
+latest line per ticker wins. The journal is compacted (one line per ticker, atomic
+rewrite) when it grows well past the number of tickers it tracks.
+"""
+import json
+import os
+import threading
+import time
+
+from config import settings
+
+STATUS_OK = "ok"
+STATUS_NO_DATA = "no_data"
+STATUS_ERROR = "error"
+STATUSES = (STATUS_OK, STATUS_NO_DATA, STATUS_ERROR)
+
+
+class CheckpointLog:
+    """Latest completion status per ticker, backed by an fsync'd JSONL journal."""
+
+    def __init__(self, path=None, recheck_days=None, compact_ratio=None, clock=time.time):
+        self.path = path or settings.CHECKPOINT_PATH
+        self.recheck_days = settings.CHECKPOINT_NO_DATA_RECHECK_DAYS if recheck_days is None else recheck_days
+        self.compact_ratio = compact_ratio or settings.CHECKPOINT_COMPACT_RATIO
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.lines = 0
+        self.torn_lines = 0
+        self._load()
+        if self.lines > max(1000, self.compact_ratio * len(self.entries)):
+            self.compact()
+
+    # --- Reading ---
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if entry.get("status") not in STATUSES or not entry.get("ticker"):
+                        raise ValueError(line)
+                except ValueError:
+                    # Torn or garbled line from an interrupted write
+                    self.torn_lines += 1
+                    continue
+                self.entries[entry["ticker"]] = entry
+                self.lines += 1
+        if self.torn_lines:
+            print(f"Warning: Ignored {self.torn_lines} unreadable checkpoint line(s) in {self.path}")
+
+    def get(self, ticker):
+        return self.entries.get(ticker)
+
+    def should_process(self, ticker, run_date):
+        """
+        True if the ticker still needs work in this run:
+        never seen, last run failed, finished in an earlier run, or no data but due for a recheck.
+        """
+        entry = self.entries.get(ticker)
+        if entry is None:
+            return True
+        status = entry["status"]
+        if status == STATUS_OK:
+            return entry.get("run_date") != run_date
+        if status == STATUS_NO_DATA:
+            return self._clock() - entry.get("ts", 0) >= self.recheck_days * 86400
+        return True
+
+    def pending(self, tickers, run_date):
+        """Tickers (in input order) that should be processed in this run."""
+        return [t for t in tickers if self.should_process(t, run_date)]
+
+    def counts(self, run_date=None):
+        counts = {status: 0 for status in STATUSES}
+        for entry in self.entries.values():
+            if run_date is None or entry.get("run_date") == run_date or entry["status"] == STATUS_NO_DATA:
+                counts[entry["status"]] += 1
+        return counts
+
+    # --- Writing ---
+
+    def _entry(self, ticker, status, reason, run_date):
+        if status not in STATUSES:
+            raise ValueError(f"Unknown checkpoint status: {status}")
+        return {
+            "ticker": ticker,
+            "status": status,
+            "reason": None if reason is None else str(reason)[:500],
+            "run_date": run_date,
+            "ts": self._clock()
+        }
+
+    def record_many(self, records, run_date=None):
+        """
+        Appends (ticker, status, reason) records with a single fsync.
+
+        Args:
+            records (iterable): (ticker, status, reason) tuples.
+            run_date (str): run the records belong to.
+        """
+        entries = [self._entry(ticker, status, reason, run_date) for ticker, status, reason in records]
+        if not entries:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a+") as f:
+                # Terminate a torn last line so it doesn't swallow the next record
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != "\n":
+                        f.write("\n")
+                f.write("".join(json.dumps(e) + "\n" for e in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            for e in entries:
+                self.entries[e["ticker"]] = e
+            self.lines += len(entries)
+
+    def record(self, ticker, status, reason=None, run_date=None):
+        self.record_many([(ticker, status, reason)], run_date=run_date)
+
+    def compact(self):
+        """Rewrites the journal with one line per ticker (tmp file + fsync + rename)."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.lines = len(self.entries)
+            self.torn_lines = 0
+
+    def format_summary(self, run_date=None):
+        counts = self.counts(run_date)
+        return (f"Checkpoint: ok={counts[STATUS_OK]}, no_data={counts[STATUS_NO_DATA]}, "
+                f"error={counts[STATUS_ERROR]} ({self.path})")
@@ -1,53 +1,130 @@
-
 import yfinance as yf
 import pandas as pd
 from config import settings
+from src.data_ingestion import raw_cache, rate_limiter
+
+# Payloads fetched per ticker. Each one is a separate (blocking) yfinance call.
+STATEMENT_TYPES = ("financials", "balance_sheet", "cashflow", "history", "info")
 
-def fetch_financials(ticker_symbol):
+def fetch_statement(ticker_symbol, statement_type):
     """
-    Fetches financial data for a given ticker symbol using yfinance.
-    
+    Fetches a single raw payload for a ticker.
+
     Args:
-        ticker_symbol (str): The stock ticker (e.g., 'RELIANCE'). 
-                             Suffix will be added from settings.
-    
+        ticker_symbol (str): The stock ticker (e.g., 'RELIANCE').
+        statement_type (str): One of STATEMENT_TYPES.
+
     Returns:
-        dict: Dictionary containing 'financials', 'balance_sheet', 'cashflow' DataFrames,
-              plus 'info' dict and 'history' DataFrame.
-              Returns None if fetch fails.
+        pd.DataFrame for statements/history, dict for 'info'.
     """
-    try:
-        full_ticker = f"{ticker_symbol}{settings.MARKET_SUFFIX}"
-        stock = yf.Ticker(full_ticker)
-        
-        # Fetching annual data
-        financials = stock.financials
-        balance_sheet = stock.balance_sheet
-        cashflow = stock.cashflow
-        
+    full_ticker = f"{ticker_symbol}{settings.MARKET_SUFFIX}"
+    stock = yf.Ticker(full_ticker)
+
+    if statement_type == "history":
         # Fetching price history (1 Year) for Price Growth metric
         # period='1y' gives daily data for last year
-        history = stock.history(period="1y")
-        
+        return stock.history(period="1y")
+
+    if statement_type == "info":
         # Fetching info (Market Cap, PEG, etc.)
         # Note: info fetching can be slow or flaky, but it's needed for Market Cap & PEG
         try:
-            info = stock.info
-        except Exception:
-            info = {}
-        
-        if financials.empty or balance_sheet.empty or cashflow.empty:
-            print(f"Warning: Missing data for {full_ticker}")
+            return stock.info
+        except Exception as e:
+            # Throttling must surface so the rate limiter can back off
+            if rate_limiter.is_throttle_error(e):
+                raise
+            return {}
+
+    if statement_type not in STATEMENT_TYPES:
+        raise ValueError(f"Unknown statement type: {statement_type}")
+
+    # Annual statements: financials / balance_sheet / cashflow
+    return getattr(stock, statement_type)
+
+def assemble_raw_data(ticker_symbol, payloads):
+    """
+    Builds the raw data dict from individually fetched payloads.
+    Returns None if any of the annual statements is missing.
+    """
+    financials = payloads.get("financials")
+    balance_sheet = payloads.get("balance_sheet")
+    cashflow = payloads.get("cashflow")
+
+    for statement in (financials, balance_sheet, cashflow):
+        if statement is None or statement.empty:
+            print(f"Warning: Missing data for {ticker_symbol}{settings.MARKET_SUFFIX}")
             return None
-            
-        return {
-            "financials": financials,
-            "balance_sheet": balance_sheet,
-            "cashflow": cashflow,
-            "history": history,
-            "info": info
-        }
-        
+
+    history = payloads.get("history")
+    return {
+        "financials": financials,
+        "balance_sheet": balance_sheet,
+        "cashflow": cashflow,
+        "history": history if history is not None else pd.DataFrame(),
+        "info": payloads.get("info") or {}
+    }
+
+def fetch_statement_limited(ticker_symbol, statement_type, limiter=None):
+    """
+    fetch_statement behind the shared rate limiter.
+    Reports success / throttling back to the limiter and re-raises errors.
+    """
+    if limiter is None:
+        return fetch_statement(ticker_symbol, statement_type)
+
+    limiter.acquire()
+    try:
+        payload = fetch_statement(ticker_symbol, statement_type)
+    except Exception as e:
+        limiter.on_error(e)
+        raise
+    limiter.on_success()
+    return payload
+
+def fetch_statement_cached(ticker_symbol, statement_type, cache=None, limiter=None):
+    """
+    Same as fetch_statement, but served from the raw statement cache when fresh.
+    Fetched payloads are written back to the cache.
+    """
+    if cache is not None:
+        payload = cache.get(ticker_symbol, statement_type)
+        if payload is not None:
+            return payload
+
+    payload = fetch_statement_limited(ticker_symbol, statement_type, limiter)
+    if cache is not None and raw_cache.is_cacheable(payload):
+        cache.put(ticker_symbol, statement_type, payload)
+    return payload
+
+def fetch_raw_data(ticker_symbol, cache=None, limiter=None):
+    """
+    Like fetch_financials, but raises on fetch errors (including RateLimitError-like
+    throttling) so the caller can retry the ticker. Returns None only when the
+    ticker has no annual statements.
+    """
+    payloads = {}
+    for statement_type in STATEMENT_TYPES:
+        payloads[statement_type] = fetch_statement_cached(ticker_symbol, statement_type, cache, limiter)
+    return assemble_raw_data(ticker_symbol, payloads)
+
+def fetch_financials(ticker_symbol, cache=None):
+    """
+    Fetches financial data for a given ticker symbol using yfinance.
+
+    Args:
+        ticker_symbol (str): The stock ticker (e.g., 'RELIANCE').
+                             Suffix will be added from settings.
+        cache (RawStatementCache, optional): Serve fresh payloads from disk.
+
+    Returns:
+        dict: Dictionary containing 'financials', 'balance_sheet', 'cashflow' DataFrames,
+              plus 'info' dict and 'history' DataFrame.
+              Returns None if fetch fails.
+    """
+    try:
+        return fetch_raw_data(ticker_symbol, cache=cache)
+
     except Exception as e:
         print(f"Error fetching data for {ticker_symbol}: {e}")
         return None
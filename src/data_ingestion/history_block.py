@@ -0,0 +1,131 @@
+"""
+Typed, fixed-width storage for multi-year statement histories.
+
+processor.process_ticker_data returns each history (hist_revenue, hist_ebit, ...) as a
+float64 array aligned on the ticker's fiscal years (`hist_years`, newest first).
+HistoryBlock stacks those per-ticker arrays into one matrix per field:
+
+    values[field]  (n_tickers, width) float64, NaN where a year is missing
+    mask           (n_tickers, width) bool, True where the ticker has that fiscal year
+    years          (n_tickers, width) int16 fiscal-year labels (0 where masked)
+
+All fields of a ticker share the same year axis, so column j means the same fiscal
+year for revenue, EBIT, equity, ... Vectorized consumers (batch_metrics) read the
+matrices directly instead of parsing stringified lists. The feature store
+(src/storage/feature_store.py) persists them as fixed-size list columns.
+"""
+import numpy as np
+
+from config import settings
+
+# History fields produced by processor.process_ticker_data
+HISTORY_FIELDS = [
+    "hist_revenue",
+    "hist_net_income",
+    "hist_ebit",
+    "hist_equity",
+    "hist_cap_employed",
+    "hist_eps",
+    "hist_gross_profit"
+]
+
+
+class HistoryBlock:
+    """Fixed-width history matrices for a set of tickers."""
+
+    def __init__(self, tickers, years, mask, values):
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.years = np.asarray(years, dtype=np.int16)
+        self.mask = np.asarray(mask, dtype=bool)
+        self.values = {field: np.asarray(v, dtype=np.float64) for field, v in values.items()}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def width(self):
+        return self.mask.shape[1]
+
+    @classmethod
+    def empty(cls, width=None, fields=None):
+        width = settings.HISTORY_YEARS if width is None else width
+        fields = fields or HISTORY_FIELDS
+        return cls(
+            np.array([], dtype=object),
+            np.zeros((0, width), dtype=np.int16),
+            np.zeros((0, width), dtype=bool),
+            {field: np.zeros((0, width)) for field in fields}
+        )
+
+    @classmethod
+    def from_rows(cls, rows, width=None, fields=None):
+        """
+        Stacks processed rows (with `hist_years` and hist_* arrays) into a block.
+        Rows without `hist_years` (legacy list rows) are aligned positionally.
+        """
+        width = settings.HISTORY_YEARS if width is None else width
+        fields = fields or HISTORY_FIELDS
+        n = len(rows)
+        years = np.zeros((n, width), dtype=np.int16)
+        mask = np.zeros((n, width), dtype=bool)
+        values = {field: np.full((n, width), np.nan) for field in fields}
+
+        for i, row in enumerate(rows):
+            row_years = row.get("hist_years")
+            if row_years is not None:
+                k = min(len(row_years), width)
+                years[i, :k] = row_years[:k]
+            else:
+                k = min(max((len(row.get(f) if row.get(f) is not None else []) for f in fields), default=0), width)
+            mask[i, :k] = True
+            for field in fields:
+                hist = row.get(field)
+                if hist is None:
+                    continue
+                m = min(len(hist), k)
+                if m:
+                    values[field][i, :m] = np.asarray(hist[:m], dtype=np.float64)
+
+        return cls([row.get("ticker") for row in rows], years, mask, values)
+
+    def lengths(self):
+        """Number of fiscal years available per ticker."""
+        return self.mask.sum(axis=1)
+
+    def row(self, i):
+        """Per-ticker view in process_ticker_data format (arrays trimmed to available years)."""
+        k = int(self.mask[i].sum())
+        out = {"hist_years": self.years[i, :k].copy()}
+        for field, matrix in self.values.items():
+            out[field] = matrix[i, :k].copy()
+        return out
+
+    def take(self, indices):
+        indices = np.asarray(indices)
+        return HistoryBlock(
+            self.tickers[indices], self.years[indices], self.mask[indices],
+            {field: v[indices] for field, v in self.values.items()}
+        )
+
+    @property
+    def nbytes(self):
+        return self.years.nbytes + self.mask.nbytes + sum(v.nbytes for v in self.values.values())
+
+    @classmethod
+    def concat(cls, blocks):
+        blocks = [b for b in blocks if len(b)]
+        if not blocks:
+            return cls.empty()
+        fields = list(blocks[0].values)
+        return cls(
+            np.concatenate([b.tickers for b in blocks]),
+            np.concatenate([b.years for b in blocks]),
+            np.concatenate([b.mask for b in blocks]),
+            {field: np.concatenate([b.values[field] for b in blocks]) for field in fields}
+        )
+
+    def dedupe_last(self):
+        """Keeps the last occurrence of every ticker (later rows win)."""
+        _, last_idx = np.unique(self.tickers[::-1].astype(str), return_index=True)
+        keep = np.sort(len(self) - 1 - last_idx)
+        return self.take(keep)
@@ -0,0 +1,146 @@
+"""
+Incremental daily runs: only reprocess tickers whose raw inputs changed.
+
+Each ticker's raw payloads are fingerprinted in two parts:
+- fp_statements: financials, balance sheet, cash flow (change a few times a year)
+- fp_prices:     price history and info (change every trading day)
+
+Fingerprints are the sha256 content hashes the raw cache already keeps (computed from
+the serialized payload when there is no cache), combined with settings.FEATURE_LOGIC_VERSION
+so a change to processing/metric code invalidates everything. They are stored with
+the features, and the next run compares against the previous run's row:
+
+- both unchanged      -> "carried": previous row reused as is
+- only prices changed -> "market":  previous row + fresh price/info fields, MARKET_METRICS recomputed
+- statements changed  -> "full":    processed and all metrics recomputed
+
+Scoring (percentile ranks) still runs over the whole universe afterwards.
+"""
+import hashlib
+
+from config import settings
+from src.data_ingestion import processor, raw_cache
+from src.storage import feature_store
+
+STATEMENT_SOURCES = ("financials", "balance_sheet", "cashflow")
+PRICE_SOURCES = ("history", "info")
+
+REFRESH_FULL = "full"
+REFRESH_MARKET = "market"
+REFRESH_CARRIED = "carried"
+# Key added to processed rows to tell flush_batch how much to recompute
+REFRESH_KEY = "_refresh"
+
+
+def payload_hash(payload):
+    """Content hash of a raw payload (same hash the raw cache stores)."""
+    return hashlib.sha256(raw_cache.serialize_payload(payload)).hexdigest()
+
+
+def cached_hashes(ticker, cache):
+    """
+    Content hashes of a ticker's cached payloads ({source: hash or None}).
+    Lets fingerprints be computed in another process, where the cache isn't available.
+    """
+    if cache is None:
+        return {}
+    return {source: cache.content_hash(ticker, source) for source in STATEMENT_SOURCES + PRICE_SOURCES}
+
+
+def _combine(raw_data, sources, hashes):
+    digest = hashlib.sha256(f"v{settings.FEATURE_LOGIC_VERSION}".encode())
+    for source in sources:
+        content_hash = hashes.get(source)
+        if content_hash is None:
+            payload = raw_data.get(source)
+            content_hash = payload_hash(payload if payload is not None else {})
+        digest.update(f"|{source}:{content_hash}".encode())
+    return digest.hexdigest()
+
+
+def fingerprints(ticker, raw_data, cache=None, hashes=None):
+    """
+    Args:
+        cache (RawStatementCache): source of content hashes for cached payloads.
+        hashes (dict): precomputed cached_hashes() (used instead of `cache`).
+
+    Returns:
+        (str, str): statement fingerprint, price fingerprint.
+    """
+    if hashes is None:
+        hashes = cached_hashes(ticker, cache)
+    return (_combine(raw_data, STATEMENT_SOURCES, hashes),
+            _combine(raw_data, PRICE_SOURCES, hashes))
+
+
+class PreviousRun:
+    """Rows of the last stored run, looked up by ticker."""
+
+    def __init__(self, store, run_date):
+        self.run_date = run_date
+        self.rows = {}
+        if run_date is None:
+            return
+        columns = feature_store.SCALAR_COLUMNS + feature_store.FINGERPRINT_COLUMNS
+        df = store.read(columns=columns, run_date=run_date)
+        block = store.read_histories(run_date=run_date)
+        hist_index = {t: i for i, t in enumerate(block.tickers)}
+        for record in df.to_dict("records"):
+            # Rows written before fingerprints existed can't be compared
+            if not record.get("fp_statements"):
+                continue
+            i = hist_index.get(record["ticker"])
+            if i is not None:
+                record.update(block.row(i))
+            self.rows[record["ticker"]] = record
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, ticker):
+        return self.rows.get(ticker)
+
+
+def build_row(ticker, raw_data, previous=None, cache=None, hashes=None):
+    """
+    Processes one ticker incrementally.
+
+    Args:
+        raw_data (dict): fetched payloads (None if the ticker has no statements).
+        previous (PreviousRun or dict): last run's rows by ticker (None -> always full).
+        cache (RawStatementCache): source of payload content hashes.
+        hashes (dict): precomputed cached_hashes() for this ticker.
+
+    Returns:
+        dict: processed row tagged with REFRESH_KEY (None if there is no data).
+    """
+    if not raw_data:
+        return None
+    fp_statements, fp_prices = fingerprints(ticker, raw_data, cache, hashes)
+    prev = previous.get(ticker) if previous is not None else None
+
+    if prev is not None and prev.get("fp_statements") == fp_statements:
+        row = {k: v for k, v in prev.items()}
+        if prev.get("fp_prices") == fp_prices:
+            row[REFRESH_KEY] = REFRESH_CARRIED
+        else:
+            row.update(processor.process_market_data(raw_data.get("history"), raw_data.get("info") or {}))
+            row["fp_prices"] = fp_prices
+            row[REFRESH_KEY] = REFRESH_MARKET
+        return row
+
+    row = processor.process_ticker_data(ticker, raw_data)
+    if row is None:
+        return None
+    row["fp_statements"] = fp_statements
+    row["fp_prices"] = fp_prices
+    row[REFRESH_KEY] = REFRESH_FULL
+    return row
+
+
+def refresh_counts(rows):
+    counts = {REFRESH_FULL: 0, REFRESH_MARKET: 0, REFRESH_CARRIED: 0}
+    for row in rows:
+        kind = row.get(REFRESH_KEY, REFRESH_FULL)
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
@@ -44,6 +44,82 @@ def get_series_from_mapping(df, mapping_keys):
                 continue
     return None
 
+def _fiscal_year(column):
+    """Fiscal year label of a statement column (yfinance columns are period-end dates)."""
+    try:
+        return int(pd.Timestamp(column).year)
+    except Exception:
+        return None
+
+def fiscal_years(df, width=None):
+    """
+    Fiscal years covered by a statement, newest first (duplicates dropped, capped at `width`).
+    Columns that aren't dates get positional labels so histories stay usable.
+    """
+    width = settings.HISTORY_YEARS if width is None else width
+    if df.empty:
+        return []
+    labels = [_fiscal_year(c) for c in df.columns]
+    if any(label is None for label in labels):
+        return list(range(len(labels), 0, -1))[:width]
+    years = []
+    for label in labels:
+        if label not in years:
+            years.append(label)
+    return sorted(years, reverse=True)[:width]
+
+def get_aligned_history(df, mapping_keys, years):
+    """
+    Extracts a row as a float64 array aligned on `years` (NaN where the year is missing).
+    """
+    out = np.full(len(years), np.nan)
+    series = get_series_from_mapping(df, mapping_keys)
+    if series is None or not years:
+        return out
+    labels = [_fiscal_year(c) for c in series.index]
+    if any(label is None for label in labels):
+        # Positional fallback (newest first, same as the statement columns)
+        values = series.to_numpy(dtype=np.float64)[:len(years)]
+        out[:len(values)] = values
+        return out
+    position = {year: i for i, year in enumerate(years)}
+    for label, val in zip(labels, series.to_numpy(dtype=np.float64)):
+        i = position.get(label)
+        # First (newest) column wins if a year appears twice
+        if i is not None and np.isnan(out[i]):
+            out[i] = val
+    return out
+
+def process_market_data(history, info):
+    """
+    Extracts the price/market fields (the only inputs that change between statement updates).
+    Returns a dict with peg_ratio, market_cap, price_current and price_1y_ago.
+    """
+    market = {}
+    # PEG
+    market["peg_ratio"] = info.get('pegRatio', np.nan)
+    # Market Cap
+    market["market_cap"] = info.get('marketCap', np.nan)
+    if pd.isna(market["market_cap"]):
+        # Try fast info not available here, but info usually has it.
+        # Fallback: Price * Shares?
+        pass
+        
+    # Price
+    # Get latest close from history
+    if history is not None and not history.empty:
+        market["price_current"] = history['Close'].iloc[-1]
+        try:
+             # 1 year ago (approx 252 trading days)
+             # or just take the first record if we fetched 1y
+             market["price_1y_ago"] = history['Close'].iloc[0]
+        except Exception:
+             market["price_1y_ago"] = np.nan
+    else:
+        market["price_current"] = info.get('currentPrice', np.nan)
+        market["price_1y_ago"] = np.nan
+    return market
+
 def process_ticker_data(ticker, raw_data):
     """
     Extracts required fields from raw Yahoo Finance data.
@@ -75,33 +151,23 @@ def process_ticker_data(ticker, raw_data):
     # I will put logic in compute_metrics, but I need to pass the data.
     # I will add fields like "hist_revenue", "hist_net_income" to the processed dict.
     
-    revenue_series = get_series_from_mapping(financials, mapping["revenue"])
-    net_income_series = get_series_from_mapping(financials, mapping["net_income"])
-    ebit_series = get_series_from_mapping(financials, mapping["ebit"])
-    equity_series = get_series_from_mapping(balance_sheet, mapping["equity"])
-    eps_series = get_series_from_mapping(financials, mapping["eps"])
-    gross_profit_series = get_series_from_mapping(financials, mapping["gross_profit"])
-    total_assets_series = get_series_from_mapping(balance_sheet, mapping["total_assets"])
-    curr_liab_series = get_series_from_mapping(balance_sheet, mapping["current_liabilities"])
+    # Histories are float64 arrays aligned on the fiscal years of the income statement
+    # (newest first, at most settings.HISTORY_YEARS). A year missing from one statement
+    # is NaN instead of shifting that field's values against the others.
+    years = fiscal_years(financials)
+    processed["hist_years"] = np.array(years, dtype=np.int16)
     
-    # Capital Employed Series
-    cap_employed_series = None
-    if total_assets_series is not None and curr_liab_series is not None:
-        cap_employed_series = total_assets_series - curr_liab_series
-        
-    # Store these series in processed (as list or delimited string? No, just list if we stay in python)
-    # But if we save to CSV, lists are bad.
-    # Ideally, compute_metrics runs IN MEMORY before saving to CSV.
-    # The pipeline step "C. Compute Metrics" runs right after processing.
-    # So passing lists in dict is fine.
-    
-    processed["hist_revenue"] = revenue_series.tolist() if revenue_series is not None else []
-    processed["hist_net_income"] = net_income_series.tolist() if net_income_series is not None else []
-    processed["hist_ebit"] = ebit_series.tolist() if ebit_series is not None else []
-    processed["hist_equity"] = equity_series.tolist() if equity_series is not None else []
-    processed["hist_cap_employed"] = cap_employed_series.tolist() if cap_employed_series is not None else []
-    processed["hist_eps"] = eps_series.tolist() if eps_series is not None else []
-    processed["hist_gross_profit"] = gross_profit_series.tolist() if gross_profit_series is not None else []
+    processed["hist_revenue"] = get_aligned_history(financials, mapping["revenue"], years)
+    processed["hist_net_income"] = get_aligned_history(financials, mapping["net_income"], years)
+    processed["hist_ebit"] = get_aligned_history(financials, mapping["ebit"], years)
+    processed["hist_equity"] = get_aligned_history(balance_sheet, mapping["equity"], years)
+    # Capital Employed = Total Assets - Current Liabilities, per year
+    processed["hist_cap_employed"] = (
+        get_aligned_history(balance_sheet, mapping["total_assets"], years)
+        - get_aligned_history(balance_sheet, mapping["current_liabilities"], years)
+    )
+    processed["hist_eps"] = get_aligned_history(financials, mapping["eps"], years)
+    processed["hist_gross_profit"] = get_aligned_history(financials, mapping["gross_profit"], years)
     
     # --- Single Point Values (Latest) ---
     processed["net_income"] = get_value_from_mapping(financials, mapping["net_income"], 0)
@@ -145,28 +211,7 @@ def process_ticker_data(ticker, raw_data):
     processed["receivables"] = get_value_from_mapping(balance_sheet, mapping["receivables"], 0)
 
     # --- Market / Info Data ---
-    # PEG
-    processed["peg_ratio"] = info.get('pegRatio', np.nan)
-    # Market Cap
-    processed["market_cap"] = info.get('marketCap', np.nan)
-    if pd.isna(processed["market_cap"]):
-        # Try fast info not available here, but info usually has it.
-        # Fallback: Price * Shares?
-        pass
-        
-    # Price
-    # Get latest close from history
-    if not history.empty:
-        processed["price_current"] = history['Close'].iloc[-1]
-        try:
-             # 1 year ago (approx 252 trading days)
-             # or just take the first record if we fetched 1y
-             processed["price_1y_ago"] = history['Close'].iloc[0]
-        except Exception:
-             processed["price_1y_ago"] = np.nan
-    else:
-        processed["price_current"] = info.get('currentPrice', np.nan)
-        processed["price_1y_ago"] = np.nan
+    processed.update(process_market_data(history, info))
 
     # --- Growth Legacy (3Y) --- (Keeping for backward compat or other metrics)
     processed["revenue_3y_ago"] = get_value_from_mapping(financials, mapping["revenue"], 3)
@@ -0,0 +1,164 @@
+"""
+Shared rate limiting for ingestion workers.
+
+- AdaptiveRateLimiter: a token bucket whose refill rate follows AIMD (additive increase
+  on success, multiplicative decrease when the provider throttles us), so throughput
+  climbs to whatever Yahoo tolerates instead of a hard-coded worker count.
+- backoff_delay: jittered exponential backoff for retrying a ticker.
+- RetryQueue: bounded queue of tickers waiting for their backoff to expire.
+
+The limiter is thread-safe and can be shared by the thread pool and the asyncio engine
+(`acquire()` blocks, `reserve()` returns the delay to `await asyncio.sleep()` on).
+"""
+import heapq
+import random
+import threading
+import time
+
+from config import settings
+
+
+class RateLimitError(Exception):
+    """Raised when the provider signals throttling (HTTP 429 / 'Too Many Requests')."""
+
+
+def is_throttle_error(exc):
+    """
+    True if the exception looks like provider throttling.
+    yfinance raises YFRateLimitError; raw HTTP errors carry a 429 in the message.
+    """
+    if isinstance(exc, RateLimitError):
+        return True
+    name = type(exc).__name__.lower()
+    if "ratelimit" in name:
+        return True
+    msg = str(exc).lower()
+    return "429" in msg or "too many requests" in msg or "rate limit" in msg
+
+
+class AdaptiveRateLimiter:
+    """Token bucket with AIMD rate adaptation."""
+
+    def __init__(self, initial_rate=None, min_rate=None, max_rate=None, burst=None,
+                 increase=None, decrease_factor=None, cooldown=None, clock=time.monotonic):
+        self.rate = initial_rate or settings.RATE_LIMIT_INITIAL_RPS
+        self.min_rate = min_rate or settings.RATE_LIMIT_MIN_RPS
+        self.max_rate = max_rate or settings.RATE_LIMIT_MAX_RPS
+        self.burst = burst or settings.RATE_LIMIT_BURST
+        self.increase = settings.RATE_LIMIT_INCREASE_RPS if increase is None else increase
+        self.decrease_factor = decrease_factor or settings.RATE_LIMIT_DECREASE_FACTOR
+        # Many in-flight calls fail together when we get throttled; only back off once per window
+        self.cooldown = settings.RATE_LIMIT_COOLDOWN_SEC if cooldown is None else cooldown
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self._last_refill = clock()
+        self._last_decrease = None
+
+        self.successes = 0
+        self.throttles = 0
+        self.errors = 0
+        self.peak_rate = self.rate
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def reserve(self):
+        """
+        Takes one token and returns how long (seconds) the caller must wait before
+        making the request. Tokens may go negative, which queues callers fairly.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.tokens -= 1.0
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Blocking version of reserve() for thread workers."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.peak_rate = max(self.peak_rate, self.rate)
+
+    def on_error(self, exc):
+        """
+        Records a failed call. Throttling halves the rate and drains the bucket.
+
+        Returns:
+            bool: True if the error was a throttle.
+        """
+        throttled = is_throttle_error(exc)
+        with self._lock:
+            if not throttled:
+                self.errors += 1
+                return False
+            self.throttles += 1
+            now = self._clock()
+            if self._last_decrease is None or now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self.tokens = min(self.tokens, 0.0)
+                self._last_decrease = now
+        return True
+
+    def summary(self):
+        return (f"Rate limiter: current={self.rate:.1f} req/s, peak={self.peak_rate:.1f} req/s, "
+                f"ok={self.successes}, throttled={self.throttles}, errors={self.errors}")
+
+
+def backoff_delay(attempt, base=None, cap=None, rng=random):
+    """
+    Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt)).
+    `attempt` starts at 0 for the first retry.
+    """
+    base = settings.RETRY_BACKOFF_BASE_SEC if base is None else base
+    cap = settings.RETRY_BACKOFF_MAX_SEC if cap is None else cap
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RetryQueue:
+    """
+    Bounded min-heap of (ready_at, ticker, attempt).
+    push() returns False when the queue is full, so the caller can record the ticker
+    as failed instead of dropping it silently.
+    """
+
+    def __init__(self, max_size=None, clock=time.monotonic):
+        self.max_size = max_size or settings.RETRY_QUEUE_MAX_SIZE
+        self._clock = clock
+        self._heap = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, ticker, attempt, delay):
+        if len(self._heap) >= self.max_size:
+            return False
+        heapq.heappush(self._heap, (self._clock() + delay, self._seq, ticker, attempt))
+        self._seq += 1
+        return True
+
+    def pop_ready(self):
+        """Returns (ticker, attempt) whose backoff has expired, or None."""
+        if self._heap and self._heap[0][0] <= self._clock():
+            _, _, ticker, attempt = heapq.heappop(self._heap)
+            return ticker, attempt
+        return None
+
+    def next_ready_in(self):
+        """Seconds until the next item is ready (0 if one is ready, None if empty)."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self._clock())
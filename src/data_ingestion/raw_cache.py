@@ -0,0 +1,337 @@
+"""
+Persistent, content-addressed cache for raw yfinance payloads.
+
+Layout under settings.RAW_CACHE_DIR (data/raw/cache):
+
+    objects/<h[:2]>/<h>.parquet   # one blob per distinct payload, named by its sha256
+    index.json                    # "TICKER/statement_type" -> hash, fetched/accessed times
+
+Payloads are stored as Parquet (statements/history as tables, `info` as a one-row
+JSON column), so identical payloads are written once and the content hash doubles
+as a fingerprint of the raw inputs.
+
+Entries expire per statement type (settings.RAW_CACHE_TTL_DAYS, in calendar days:
+annual statements are kept for a quarter, prices/info only for the day they were
+fetched). The total blob size is bounded (settings.RAW_CACHE_MAX_BYTES) with
+least-recently-used eviction.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import settings
+
+_COLUMNS_KIND_KEY = b"nfm_columns_kind"
+_PAYLOAD_KIND_KEY = b"nfm_payload_kind"
+
+
+# ------------------------
+# Serialization helpers
+# ------------------------
+
+def serialize_payload(payload):
+    """
+    Serializes a DataFrame or dict payload into Parquet bytes.
+    The bytes are deterministic for equal payloads, so they can be content-addressed.
+    """
+    if isinstance(payload, dict):
+        frame = pd.DataFrame({"json": [json.dumps(payload, sort_keys=True, default=str)]})
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        kind, columns_kind = b"dict", b"plain"
+    else:
+        frame = payload.copy()
+        if isinstance(frame.columns, pd.DatetimeIndex):
+            columns_kind = b"datetime"
+            frame.columns = [c.isoformat() for c in frame.columns]
+        else:
+            columns_kind = b"plain"
+            frame.columns = [str(c) for c in frame.columns]
+        # Statement rows can come back as object dtype; store them as numbers
+        for col in frame.columns:
+            if frame[col].dtype == object:
+                frame[col] = pd.to_numeric(frame[col], errors="coerce")
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        kind = b"frame"
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[_PAYLOAD_KIND_KEY] = kind
+    metadata[_COLUMNS_KIND_KEY] = columns_kind
+    table = table.replace_schema_metadata(metadata)
+
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue()
+
+def deserialize_payload(data):
+    """Inverse of serialize_payload."""
+    table = pq.read_table(io.BytesIO(data))
+    metadata = table.schema.metadata or {}
+    if metadata.get(_PAYLOAD_KIND_KEY) == b"dict":
+        return json.loads(table.column("json")[0].as_py())
+
+    frame = table.to_pandas()
+    if metadata.get(_COLUMNS_KIND_KEY) == b"datetime":
+        frame.columns = pd.to_datetime(frame.columns)
+    return frame
+
+
+def is_cacheable(payload):
+    """
+    Empty statements are cached (a ticker without filings stays without them until
+    the TTL runs out), but an empty `info` dict is a failed call and is retried.
+    """
+    if payload is None:
+        return False
+    if isinstance(payload, dict):
+        return bool(payload)
+    return True
+
+
+# ------------------------
+# Cache
+# ------------------------
+
+class RawStatementCache:
+    """
+    On-disk cache of raw payloads keyed by (ticker, statement_type).
+    Safe to share between ingestion threads.
+    """
+
+    def __init__(self, cache_dir=None, ttl_days=None, max_bytes=None):
+        self.cache_dir = cache_dir or settings.RAW_CACHE_DIR
+        self.ttl_days = dict(settings.RAW_CACHE_TTL_DAYS if ttl_days is None else ttl_days)
+        self.max_bytes = settings.RAW_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.objects_dir = os.path.join(self.cache_dir, "objects")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.index = self._load_index()
+        self._refs = {}
+        self._total_bytes = 0
+        for entry in self.index.values():
+            self._add_ref(entry)
+        self.hits = {}
+        self.misses = {}
+        self.expired = {}
+        self.evictions = 0
+
+    # --- Index persistence ---
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"Warning: Raw cache index unreadable, starting empty ({self.index_path})")
+            return {}
+
+    def flush(self):
+        """Writes the index atomically (tmp file + rename)."""
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = 0
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _key(ticker, statement_type):
+        return f"{ticker}/{statement_type}"
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.parquet")
+
+    def _is_expired(self, entry, statement_type, today=None):
+        ttl = self.ttl_days.get(statement_type)
+        if ttl is None:
+            return False
+        today = today or date.today()
+        fetched = date.fromtimestamp(entry["fetched_at"])
+        return (today - fetched).days >= ttl
+
+    def _add_ref(self, entry):
+        content_hash = entry["hash"]
+        if content_hash not in self._refs:
+            self._refs[content_hash] = 0
+            self._total_bytes += entry["size"]
+        self._refs[content_hash] += 1
+
+    def _drop_ref(self, entry):
+        """Returns True when no index entry references the blob anymore."""
+        content_hash = entry["hash"]
+        self._refs[content_hash] -= 1
+        if self._refs[content_hash] == 0:
+            del self._refs[content_hash]
+            self._total_bytes -= entry["size"]
+            return True
+        return False
+
+    def _count(self, counter, statement_type):
+        counter[statement_type] = counter.get(statement_type, 0) + 1
+
+    # --- Public API ---
+
+    def lookup(self, ticker, statement_type):
+        """Returns the index entry for a fresh cached payload, or None."""
+        with self._lock:
+            entry = self.index.get(self._key(ticker, statement_type))
+            if entry is None or self._is_expired(entry, statement_type):
+                return None
+            return dict(entry)
+
+    def content_hash(self, ticker, statement_type):
+        """Hash of the fresh cached payload (without loading it), or None."""
+        entry = self.lookup(ticker, statement_type)
+        return entry["hash"] if entry else None
+
+    def get(self, ticker, statement_type):
+        """
+        Returns the cached payload, or None on a miss / expired entry.
+        Updates the hit / miss counters.
+        """
+        key = self._key(ticker, statement_type)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self._count(self.misses, statement_type)
+                return None
+            if self._is_expired(entry, statement_type):
+                self._count(self.expired, statement_type)
+                self._count(self.misses, statement_type)
+                return None
+            content_hash = entry["hash"]
+
+        try:
+            with open(self._blob_path(content_hash), "rb") as f:
+                payload = deserialize_payload(f.read())
+        except (OSError, pa.ArrowException, ValueError):
+            # Blob lost or corrupt: treat as a miss and drop the entry
+            with self._lock:
+                entry = self.index.pop(key, None)
+                if entry is not None:
+                    self._drop_ref(entry)
+                self._count(self.misses, statement_type)
+            return None
+
+        with self._lock:
+            if key in self.index:
+                self.index[key]["last_access"] = time.time()
+            self._count(self.hits, statement_type)
+        return payload
+
+    def put(self, ticker, statement_type, payload):
+        """
+        Stores a payload and returns its content hash.
+        Identical payloads share one blob on disk.
+        """
+        data = serialize_payload(payload)
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(content_hash)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        entry = {
+            "hash": content_hash,
+            "size": len(data),
+            "fetched_at": now,
+            "last_access": now
+        }
+        orphan = None
+        with self._lock:
+            key = self._key(ticker, statement_type)
+            previous = self.index.get(key)
+            self.index[key] = entry
+            self._add_ref(entry)
+            if previous is not None and self._drop_ref(previous):
+                orphan = previous["hash"]
+            self._dirty += 1
+            dirty = self._dirty
+
+        if orphan is not None:
+            self._remove_blob(orphan)
+        self._evict_if_needed()
+        if dirty >= settings.RAW_CACHE_FLUSH_EVERY:
+            self.flush()
+        return content_hash
+
+    def total_bytes(self):
+        """Size of all distinct blobs referenced by the index."""
+        return self._total_bytes
+
+    def _remove_blob(self, content_hash):
+        try:
+            os.remove(self._blob_path(content_hash))
+        except OSError:
+            pass
+
+    def _evict_if_needed(self):
+        """
+        Drops least-recently-used entries once the blobs exceed max_bytes.
+        Evicts down to 90% of the bound so a full cache doesn't re-sort on every put.
+        """
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+        low_watermark = self.max_bytes * 0.9
+        to_delete = []
+        with self._lock:
+            for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]["last_access"]):
+                if self._total_bytes <= low_watermark:
+                    break
+                del self.index[key]
+                self.evictions += 1
+                if self._drop_ref(entry):
+                    to_delete.append(entry["hash"])
+            self._dirty += 1
+
+        for content_hash in to_delete:
+            self._remove_blob(content_hash)
+
+    def stats(self):
+        """Hit/miss counters per statement type."""
+        types = sorted(set(self.hits) | set(self.misses))
+        return {
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "expired": sum(self.expired.values()),
+            "evictions": self.evictions,
+            "entries": len(self.index),
+            "bytes": self.total_bytes(),
+            "by_type": {
+                t: {"hits": self.hits.get(t, 0), "misses": self.misses.get(t, 0)}
+                for t in types
+            }
+        }
+
+    def format_summary(self):
+        """One block for the pipeline summary."""
+        s = self.stats()
+        lookups = s["hits"] + s["misses"]
+        hit_rate = s["hits"] / lookups if lookups else 0.0
+        lines = [
+            "--- Raw Statement Cache ---",
+            f"Hits: {s['hits']} | Misses: {s['misses']} (expired: {s['expired']}) | Hit rate: {hit_rate:.1%}",
+            f"Entries: {s['entries']} | Size: {s['bytes'] / 1e6:.1f} MB | Evictions: {s['evictions']}",
+        ]
+        for t, c in s["by_type"].items():
+            lines.append(f"  {t:<14} hits={c['hits']:<6} misses={c['misses']}")
+        return "\n".join(lines)
@@ -0,0 +1,326 @@
+"""
+Concurrent, rate-limited LLM explanation generator.
+
+Replaces the one-company-at-a-time loop (a call, then `time.sleep(4)`) with:
+- a bounded worker pool (LLM_MAX_CONCURRENCY requests in flight)
+- a requests-per-minute token bucket (rate_limiter.AdaptiveRateLimiter capped at
+  LLM_REQUESTS_PER_MINUTE; a 429 halves the rate, successes earn it back)
+- per-request retries with jittered exponential backoff
+- streamed results: every resolved explanation is appended to an ExplanationStream
+  (explanation_stream.py), so an interrupted run resumes without paying for the same
+  prompts twice
+- an optional ExplanationCache: prompts answered on an earlier run (same model) are
+  served from disk and never reach the LLM
+- an optional batched mode (batch_size > 1): several companies per request, answered
+  as a JSON array; invalid items fall back to single-company requests
+  (see batch_explanations.py)
+- per-request latency records and a throughput report (ExplanationStats)
+
+Clients are any object with `async def generate(prompt) -> str` (see llm_client.py).
+"""
+import asyncio
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from src.data_ingestion import rate_limiter
+from src.llm_reasoning import batch_explanations, explanation_cache
+from src.llm_reasoning.llm_client import LLMError
+
+FAILED_EXPLANATION = "Error generating explanation due to API failure."
+
+
+def make_limiter(requests_per_minute=None, burst=None):
+    """Token bucket for the LLM quota: starts at, and never exceeds, requests_per_minute."""
+    rate = (requests_per_minute or settings.LLM_REQUESTS_PER_MINUTE) / 60.0
+    return rate_limiter.AdaptiveRateLimiter(
+        initial_rate=rate,
+        min_rate=rate / 8,
+        max_rate=rate,
+        burst=burst or settings.LLM_BURST,
+        increase=rate / 10
+    )
+
+
+class ExplanationStats:
+    """Per-request latencies and outcomes for the throughput report."""
+
+    def __init__(self):
+        self.started_at = None
+        self.finished_at = None
+        self.requests = []  # one dict per ticker sent to the LLM
+        self.resumed = 0
+        self.batch_fallbacks = 0  # companies re-sent alone after a bad batch answer
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def start(self):
+        # Kept from the first call, so one stats object can span several explain_all runs
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def record(self, ticker, status, attempts, wait_sec, call_sec, total_sec, error=None, companies=1):
+        self.requests.append({
+            "ticker": ticker,            # comma separated for a batch
+            "companies": companies,
+            "status": status,
+            "attempts": attempts,
+            "wait_ms": wait_sec * 1e3,   # time spent waiting on the token bucket
+            "call_ms": call_sec * 1e3,   # last LLM call
+            "total_ms": total_sec * 1e3, # queue exit to result, retries and backoff included
+            "error": error
+        })
+
+    def to_frame(self):
+        return pd.DataFrame(self.requests, columns=["ticker", "companies", "status", "attempts", "wait_ms",
+                                                    "call_ms", "total_ms", "error"])
+
+    def report(self):
+        """
+        Returns a dict with throughput (requests/sec, requests/min) and p50/p95
+        call and end-to-end latencies in milliseconds.
+        """
+        frame = self.to_frame()
+        elapsed = self.elapsed
+
+        def pct(column, q):
+            if frame.empty:
+                return np.nan
+            return float(np.percentile(frame[column], q))
+
+        return {
+            "requests": len(frame),
+            "ok": int((frame["status"] == "ok").sum()),
+            "failed": int((frame["status"] == "failed").sum()),
+            "companies_per_request": float(frame["companies"].mean()) if not frame.empty else np.nan,
+            "batch_fallbacks": self.batch_fallbacks,
+            "resumed": self.resumed,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": (self.cache_hits / (self.cache_hits + self.cache_misses)
+                               if self.cache_hits + self.cache_misses else np.nan),
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "elapsed_sec": elapsed,
+            "requests_per_sec": len(frame) / elapsed if elapsed > 0 else np.nan,
+            "requests_per_min": len(frame) * 60 / elapsed if elapsed > 0 else np.nan,
+            "call_p50_ms": pct("call_ms", 50),
+            "call_p95_ms": pct("call_ms", 95),
+            "total_p50_ms": pct("total_ms", 50),
+            "total_p95_ms": pct("total_ms", 95),
+            "wait_sec": float(frame["wait_ms"].sum() / 1e3) if not frame.empty else 0.0
+        }
+
+    def format_report(self):
+        """Human readable throughput report (logged at the end of a run)."""
+        r = self.report()
+        return "\n".join([
+            "--- LLM Explanation Throughput Report ---",
+            f"Requests: {r['requests']} (ok={r['ok']}, failed={r['failed']}) | Resumed from the stream: {r['resumed']}",
+            f"Companies per request: {r['companies_per_request']:.1f} | Batch fallbacks: {r['batch_fallbacks']}",
+            f"Cache: {r['cache_hits']} hits, {r['cache_misses']} misses (hit rate {r['cache_hit_rate']:.0%})",
+            f"Elapsed: {r['elapsed_sec']:.1f}s | Throughput: {r['requests_per_sec']:.2f} req/s ({r['requests_per_min']:.1f} req/min)",
+            f"Call latency: p50={r['call_p50_ms']:.0f}ms p95={r['call_p95_ms']:.0f}ms",
+            f"End-to-end latency: p50={r['total_p50_ms']:.0f}ms p95={r['total_p95_ms']:.0f}ms | Rate limit wait: {r['wait_sec']:.1f}s",
+            f"Throttled calls: {r['throttled']} | Retries: {r['retries']}",
+        ])
+
+
+async def _generate_one(ticker, prompt, client, limiter, stats, max_retries, timeout, companies=1):
+    """One request with retries. Returns the explanation, or None after the last attempt fails."""
+    started = time.perf_counter()
+    wait = 0.0
+    call_sec = 0.0
+    error = None
+    for attempt in range(max_retries + 1):
+        delay = limiter.reserve()
+        if delay > 0:
+            wait += delay
+            await asyncio.sleep(delay)
+        call_started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(client.generate(prompt), timeout)
+            if not text or not text.strip():
+                raise LLMError("empty response")
+        except Exception as e:
+            call_sec = time.perf_counter() - call_started
+            error = f"{type(e).__name__}: {e}"
+            if limiter.on_error(e):
+                stats.throttled += 1
+            logging.warning(f"LLM error for {ticker} (attempt {attempt + 1}/{max_retries + 1}): {error}")
+            if attempt < max_retries:
+                stats.retries += 1
+                await asyncio.sleep(rate_limiter.backoff_delay(
+                    attempt, settings.LLM_RETRY_BACKOFF_BASE_SEC, settings.LLM_RETRY_BACKOFF_MAX_SEC))
+            continue
+        call_sec = time.perf_counter() - call_started
+        limiter.on_success()
+        stats.record(ticker, "ok", attempt + 1, wait, call_sec, time.perf_counter() - started,
+                     companies=companies)
+        return text.strip()
+
+    stats.record(ticker, "failed", max_retries + 1, wait, call_sec, time.perf_counter() - started, error,
+                 companies=companies)
+    return None
+
+
+async def explain_all(prompts, client, max_concurrency=None, limiter=None, max_retries=None,
+                      timeout=None, partial=None, cache=None, stats=None, batch_size=None,
+                      token_budget=None, batch_template=None, on_result=None):
+    """
+    Generates explanations for (ticker, prompt) pairs on a bounded worker pool.
+
+    Args:
+        prompts (list): (ticker, rendered prompt) pairs.
+        client: object with `async def generate(prompt) -> str`.
+        max_concurrency (int): requests in flight (default LLM_MAX_CONCURRENCY).
+        limiter (AdaptiveRateLimiter): shared token bucket (default make_limiter()).
+        max_retries (int): retries per request (default LLM_MAX_RETRIES).
+        timeout (float): seconds per call (default LLM_REQUEST_TIMEOUT_SEC).
+        partial (ExplanationStream): finished explanations are read from / appended to it
+            (failures too, with status "failed"; those are never resumed).
+        cache (ExplanationCache): looked up before calling the LLM, filled with new answers.
+        stats (ExplanationStats): filled in place.
+        batch_size (int): companies per request (default LLM_BATCH_SIZE; 1 = one prompt each).
+        token_budget (int): estimated prompt + answer tokens per batch (default LLM_BATCH_TOKEN_BUDGET).
+        batch_template (str): batch prompt template (default prompt_template_batch.txt).
+        on_result (callable): on_result(ticker, explanation, ok) as soon as each company
+            is resolved (resumed, cached, generated or failed), e.g. to patch outputs.
+
+    Returns:
+        dict: ticker -> explanation (FAILED_EXPLANATION when every attempt failed).
+    """
+    max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+    limiter = limiter or make_limiter()
+    max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+    timeout = timeout or settings.LLM_REQUEST_TIMEOUT_SEC
+    stats = stats if stats is not None else ExplanationStats()
+    model = getattr(client, "model_name", settings.LLM_MODEL)
+    batch_size = batch_size or settings.LLM_BATCH_SIZE
+
+    results = {}
+
+    def deliver(ticker, text, ok=True):
+        results[ticker] = text
+        if on_result is not None:
+            on_result(ticker, text, ok)
+
+    pending = []
+    for ticker, prompt in prompts:
+        sha = explanation_cache.cache_key(prompt, model)  # a new model never resumes another's text
+        cached = cache.get(prompt, model) if cache is not None else None
+        if cached is not None:
+            if partial is not None and partial.get(ticker, sha) is None:
+                partial.add(ticker, sha, cached)
+            deliver(ticker, cached)
+            stats.cache_hits += 1
+            continue
+        if cache is not None:
+            stats.cache_misses += 1
+        # Streamed by a run that was killed before its cache was flushed
+        resumed = partial.get(ticker, sha) if partial is not None else None
+        if resumed is not None:
+            if cache is not None:
+                cache.put(prompt, model, resumed, ticker=ticker)
+            deliver(ticker, resumed)
+            stats.resumed += 1
+            continue
+        pending.append((ticker, prompt, sha))
+
+    # A job is a list of (ticker, prompt, sha): one company, or a batch
+    queue = asyncio.Queue()
+    if batch_size > 1 and len(pending) > 1:
+        batch_template = batch_template or batch_explanations.load_batch_template()
+        overhead = batch_explanations.estimate_tokens(batch_template)
+        for job in batch_explanations.make_batches(pending, batch_size, token_budget, overhead_tokens=overhead):
+            queue.put_nowait(job)
+    else:
+        for item in pending:
+            queue.put_nowait([item])
+
+    def give_up(ticker, sha):
+        if partial is not None:
+            partial.add(ticker, sha, FAILED_EXPLANATION, status="failed")
+        deliver(ticker, FAILED_EXPLANATION, ok=False)
+
+    def finish(ticker, prompt, sha, text):
+        if partial is not None:
+            partial.add(ticker, sha, text)
+        if cache is not None:
+            cache.put(prompt, model, text, ticker=ticker)
+        logging.info(f"Generated explanation for {ticker}")
+        deliver(ticker, text)
+
+    async def run_job(job):
+        if len(job) == 1:
+            ticker, prompt, sha = job[0]
+            text = await _generate_one(ticker, prompt, client, limiter, stats, max_retries, timeout)
+            if text is None:
+                give_up(ticker, sha)
+            else:
+                finish(ticker, prompt, sha, text)
+            return
+
+        tickers = [ticker for ticker, _, _ in job]
+        batch_prompt = batch_explanations.render_batch_prompt(batch_template, [prompt for _, prompt, _ in job])
+        text = await _generate_one(",".join(tickers), batch_prompt, client, limiter, stats, max_retries,
+                                   timeout, companies=len(job))
+        if text is None:
+            # The request itself failed after every retry; don't multiply the calls
+            for ticker, _, sha in job:
+                give_up(ticker, sha)
+            return
+        parsed = batch_explanations.parse_batch_response(text, tickers)
+        for ticker, prompt, sha in job:
+            if ticker in parsed:
+                finish(ticker, prompt, sha, parsed[ticker])
+            else:
+                stats.batch_fallbacks += 1
+                queue.put_nowait([(ticker, prompt, sha)])
+        if len(parsed) < len(job):
+            logging.warning(f"Batch answer invalid for {len(job) - len(parsed)}/{len(job)} companies; "
+                            f"retrying them one by one")
+
+    async def worker():
+        # Runs until cancelled: a batch can queue single-company fallbacks at any time
+        while True:
+            job = await queue.get()
+            try:
+                await run_job(job)
+            except Exception as e:
+                logging.error(f"Explanation job failed for {[ticker for ticker, _, _ in job]}: {e}")
+                for ticker, _, _ in job:
+                    results.setdefault(ticker, FAILED_EXPLANATION)
+            finally:
+                queue.task_done()
+
+    stats.start()
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, min(max_concurrency, len(pending))))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        stats.stop()
+    return results
+
+
+def run_explanations(prompts, client, **kwargs):
+    """Synchronous entry point for `explain_all` (used by generate_explanations)."""
+    return asyncio.run(explain_all(prompts, client, **kwargs))
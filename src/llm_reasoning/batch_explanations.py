@@ -0,0 +1,132 @@
+"""
+Batched prompting: several companies per LLM request.
+
+The per-company prompts (prompt_template.txt) are still rendered first, because they
+are what the explanation cache and the partial-results file are keyed on. Batching
+only changes the transport: the "Inputs:" section of each prompt is packed into
+prompt_template_batch.txt, which asks for a JSON array of {ticker, explanation}.
+
+Batches are bounded by a company count (LLM_BATCH_SIZE) and by an estimated token
+budget covering both the prompt and the expected answers (LLM_BATCH_TOKEN_BUDGET).
+parse_batch_response validates every item; companies whose item is missing or
+malformed are retried as single-company prompts by async_explanations.
+"""
+import json
+import os
+import re
+
+from config import settings
+
+BATCH_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompt_template_batch.txt')
+# The brief reads the verdict out of every explanation
+REQUIRED_SECTION = "Overall Verdict"
+
+_INPUTS_START = "Inputs:"
+_INPUTS_END = "Output format"
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def estimate_tokens(text):
+    """Rough token count (LLM_CHARS_PER_TOKEN characters per token)."""
+    return len(text) // settings.LLM_CHARS_PER_TOKEN + 1
+
+
+def company_block(prompt):
+    """
+    The company-specific part of a rendered single-company prompt: the lines between
+    "Inputs:" and "Output format". A template without those markers is used whole.
+    """
+    start = prompt.find(_INPUTS_START)
+    end = prompt.find(_INPUTS_END, start)
+    if start == -1 or end == -1:
+        return prompt.strip()
+    return prompt[start + len(_INPUTS_START):end].strip()
+
+
+def render_batch_prompt(template, prompts):
+    """
+    Args:
+        template (str): prompt_template_batch.txt contents ({count}, {companies}).
+        prompts (list): rendered single-company prompts.
+
+    Returns:
+        str: One prompt covering every company.
+    """
+    blocks = [f"Company {i}:\n{company_block(prompt)}" for i, prompt in enumerate(prompts, 1)]
+    return template.format(count=len(prompts), companies="\n\n".join(blocks))
+
+
+def make_batches(jobs, batch_size=None, token_budget=None, output_tokens=None, overhead_tokens=0):
+    """
+    Greedily packs jobs (in order) into batches.
+
+    Args:
+        jobs (list): (ticker, prompt, ...) tuples.
+        batch_size (int): max companies per batch (default LLM_BATCH_SIZE).
+        token_budget (int): max estimated prompt + answer tokens (default LLM_BATCH_TOKEN_BUDGET).
+        output_tokens (int): expected answer tokens per company (default LLM_BATCH_OUTPUT_TOKENS).
+        overhead_tokens (int): the batch template's own tokens.
+
+    Returns:
+        list: lists of jobs. A company over the budget on its own gets a batch of one.
+    """
+    batch_size = batch_size or settings.LLM_BATCH_SIZE
+    token_budget = token_budget or settings.LLM_BATCH_TOKEN_BUDGET
+    output_tokens = settings.LLM_BATCH_OUTPUT_TOKENS if output_tokens is None else output_tokens
+
+    batches = []
+    current, used = [], overhead_tokens
+    for job in jobs:
+        cost = estimate_tokens(company_block(job[1])) + output_tokens
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], overhead_tokens
+        current.append(job)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(text, tickers):
+    """
+    Parses and validates a batch answer.
+
+    Args:
+        text (str): raw LLM output, expected to be a JSON array (code fences tolerated).
+        tickers (list): the tickers of the batch.
+
+    Returns:
+        dict: ticker -> explanation for every valid item. Items with an unknown or
+        duplicate ticker, or without a non-empty explanation containing the verdict
+        section, are dropped; so is everything when the output isn't a JSON array.
+    """
+    cleaned = _FENCE.sub("", text.strip())
+    start, end = cleaned.find("["), cleaned.rfind("]")
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(cleaned[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    expected = set(tickers)
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        ticker = item.get("ticker")
+        explanation = item.get("explanation")
+        if not isinstance(ticker, str) or ticker not in expected or ticker in parsed:
+            continue
+        if not isinstance(explanation, str) or REQUIRED_SECTION not in explanation:
+            continue
+        parsed[ticker] = explanation.strip()
+    return parsed
+
+
+def load_batch_template(path=None):
+    with open(path or BATCH_TEMPLATE_PATH, 'r') as f:
+        return f.read()
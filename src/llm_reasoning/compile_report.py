@@ -6,8 +6,91 @@ import sys
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.llm_reasoning import explanation_stream
+
+MISSING_EXPLANATION = "Explanation not available yet."
+
+def _write_header(f):
+    # Title
+    f.write("# Top 50 Fundamental Equity Analysis Report\n\n")
+
+    # Methodology Note
+    f.write("## Methodology Note\n")
+    f.write("This report presents LLM-generated fundamental explanations for the Top 50 ranked Indian companies. ")
+    f.write("Rankings are based on a weighted composite score derived from profitability, growth, balance sheet strength, ")
+    f.write("valuation, and stability metrics. The explanations aim to provide human-readable justification for model decisions.\n\n")
+
+    # Chart
+    f.write("## Score Distribution Snapshot\n")
+    f.write("![Top 50 Composite Scores](assets/top50_scores.png)\n\n")
+
+def _write_section(f, rank, ticker, text):
+    f.write(f"## Rank {rank} – {ticker}\n\n")
+    f.write(text)
+    f.write("\n\n")
+
+class ReportBuilder:
+    """
+    Builds top_50_analysis.md from an ExplanationStream while the stream is written.
+
+    update() appends the section of every company whose explanation has arrived, as
+    long as every higher ranked one is already in the file (sections stay in rank
+    order). The file is only rewritten when the stream starts a new run or a section
+    already written gets a new explanation.
+    """
+
+    def __init__(self, stream, output_file):
+        self.stream = stream
+        self.output_file = output_file
+        self._run_id = None
+        self._written = {}  # ticker -> stream offset of the text in its section (None: placeholder)
+
+    def update(self, final=False):
+        """
+        Args:
+            final (bool): also write the companies still missing (as MISSING_EXPLANATION).
+
+        Returns:
+            int: sections written by this call.
+        """
+        self.stream.refresh()
+        rebuild = self._run_id is None or self._run_id != self.stream.run_id or \
+            any(self.stream.offset(ticker) != offset for ticker, offset in self._written.items())
+        if rebuild:
+            self._run_id = self.stream.run_id
+            self._written = {}
+
+        tickers = self.stream.tickers
+        written = 0
+        with open(self.output_file, 'w' if rebuild else 'a') as f:
+            if rebuild:
+                _write_header(f)
+            for rank in range(len(self._written) + 1, len(tickers) + 1):
+                ticker = tickers[rank - 1]
+                record = self.stream.lookup(ticker)
+                if record is None and not final:
+                    break
+                _write_section(f, rank, ticker, record['explanation'] if record else MISSING_EXPLANATION)
+                self._written[ticker] = self.stream.offset(ticker)
+                written += 1
+        return written
+
 def compile_report(explanations_file, output_file):
     logging.info(f"Loading explanations from {explanations_file}")
+    if explanations_file.endswith(".ndjson"):
+        # Streamed explanations: works mid-run too (missing companies get a placeholder)
+        if not os.path.exists(explanations_file):
+            logging.error(f"Explanations file not found: {explanations_file}")
+            sys.exit(1)
+        stream = explanation_stream.ExplanationStream(explanations_file)
+        logging.info(f"Compiling report for {len(stream.tickers)} companies...")
+        ReportBuilder(stream, output_file).update(final=True)
+        stream.close()
+        logging.info(f"Report compiled successfully at {output_file}")
+        return
+
     try:
         with open(explanations_file, 'r') as f:
             explanations = json.load(f)
@@ -16,36 +99,21 @@ def compile_report(explanations_file, output_file):
         sys.exit(1)
 
     logging.info(f"Compiling report for {len(explanations)} companies...")
-    
+
     with open(output_file, 'w') as f:
-        # Title
-        f.write("# Top 50 Fundamental Equity Analysis Report\n\n")
-        
-        # Methodology Note
-        f.write("## Methodology Note\n")
-        f.write("This report presents LLM-generated fundamental explanations for the Top 50 ranked Indian companies. ")
-        f.write("Rankings are based on a weighted composite score derived from profitability, growth, balance sheet strength, ")
-        f.write("valuation, and stability metrics. The explanations aim to provide human-readable justification for model decisions.\n\n")
-        
-        # Chart
-        f.write("## Score Distribution Snapshot\n")
-        f.write("![Top 50 Composite Scores](assets/top50_scores.png)\n\n")
-        
+        _write_header(f)
+
         # Compile each company
         for idx, item in enumerate(explanations):
-            rank = idx + 1
-            ticker = item['ticker']
-            text = item['explanation']
-            
-            f.write(f"## Rank {rank} – {ticker}\n\n")
-            f.write(text)
-            f.write("\n\n")
-            
+            _write_section(f, idx + 1, item['ticker'], item['explanation'])
+
     logging.info(f"Report compiled successfully at {output_file}")
 
 if __name__ == "__main__":
     from config import settings
-    INPUT = os.path.join(settings.DATA_DIR, 'reports', 'llm_explanations.json')
+    INPUT = explanation_stream.stream_path(os.path.join(settings.DATA_DIR, 'reports', 'llm_explanations.json'))
+    if not os.path.exists(INPUT):
+        INPUT = os.path.join(settings.DATA_DIR, 'reports', 'llm_explanations.json')
     OUTPUT = os.path.join(settings.DATA_DIR, 'reports', 'top_50_analysis.md')
-    
+
     compile_report(INPUT, OUTPUT)
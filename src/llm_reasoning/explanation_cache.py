@@ -0,0 +1,123 @@
+"""
+Persistent cache of LLM explanations, reused across daily runs.
+
+Entries are keyed on sha256(model name + rendered prompt). The prompt carries every
+metric the LLM sees (rounded the way the template prints them), so a company whose
+inputs haven't moved hits the cache, while new entrants and companies whose metrics
+changed miss it and go to the LLM. Switching models invalidates everything.
+
+Stored as one JSON file (settings.LLM_CACHE_PATH, default data/processed/llm_cache.json):
+
+    {key: {"ticker", "model", "text", "created_at", "last_access"}}
+
+Entries older than LLM_CACHE_MAX_AGE_DAYS are expired so the wording is refreshed
+every now and then even for unchanged companies; beyond LLM_CACHE_MAX_ENTRIES the
+least-recently-used entries are evicted.
+"""
+import hashlib
+import json
+import os
+import time
+
+from config import settings
+
+
+def default_path():
+    """settings.LLM_CACHE_PATH, or llm_cache.json under the current settings.DATA_DIR."""
+    return settings.LLM_CACHE_PATH or os.path.join(settings.DATA_DIR, 'processed', 'llm_cache.json')
+
+
+def cache_key(prompt, model):
+    """sha256 hex digest of the model name and the rendered prompt."""
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """On-disk prompt-hash -> explanation cache with age and size eviction."""
+
+    def __init__(self, path=None, max_age_days=None, max_entries=None, clock=time.time):
+        self.path = path or default_path()
+        self.max_age_days = settings.LLM_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._clock = clock
+        self.entries = self._load()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"Warning: Explanation cache unreadable, starting empty ({self.path})")
+            return {}
+
+    def flush(self):
+        """Drops expired / excess entries and writes the file atomically (tmp file + rename)."""
+        self.evict()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _is_expired(self, entry, now):
+        return bool(self.max_age_days) and now - entry["created_at"] >= self.max_age_days * 86400
+
+    def get(self, prompt, model):
+        """Returns the cached explanation, or None on a miss / expired entry."""
+        key = cache_key(prompt, model)
+        entry = self.entries.get(key)
+        now = self._clock()
+        if entry is not None and self._is_expired(entry, now):
+            del self.entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        entry["last_access"] = now
+        self.hits += 1
+        return entry["text"]
+
+    def put(self, prompt, model, text, ticker=None):
+        now = self._clock()
+        self.entries[cache_key(prompt, model)] = {
+            "ticker": ticker,
+            "model": model,
+            "text": text,
+            "created_at": now,
+            "last_access": now
+        }
+
+    def evict(self):
+        """Removes expired entries, then least-recently-used ones beyond max_entries."""
+        now = self._clock()
+        for key in [k for k, entry in self.entries.items() if self._is_expired(entry, now)]:
+            del self.entries[key]
+            self.expired += 1
+        if self.max_entries and len(self.entries) > self.max_entries:
+            by_access = sorted(self.entries, key=lambda k: self.entries[k]["last_access"])
+            for key in by_access[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": len(self.entries)
+        }
+
+    def format_summary(self):
+        s = self.stats()
+        return (f"Explanation cache: {s['hits']}/{s['hits'] + s['misses']} hits ({s['hit_rate']:.0%}) | "
+                f"entries={s['entries']} expired={s['expired']} evicted={s['evictions']}")
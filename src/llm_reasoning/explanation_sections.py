@@ -0,0 +1,64 @@
+"""
+Structured fields of an LLM explanation.
+
+prompt_template.txt asks for four numbered sections; parse_sections turns the answer
+into fields once, when the explanation is written to the stream (explanation_stream.py
+stores them next to the text). The brief, the worker's patches and the dashboard read
+the fields instead of searching the free text again.
+
+Headings are matched leniently: markdown bold or `#` prefixes, an echoed "(1 line)"
+and text on the heading line itself ("4. Overall Verdict: Buy") are all accepted.
+"""
+import re
+
+SECTIONS = {
+    "summary": "Business Strength Summary",
+    "strengths": "Key Fundamental Strengths",
+    "risks": "Potential Risks to Monitor",
+    "verdict": "Overall Verdict",
+}
+LIST_FIELDS = ["strengths", "risks"]
+
+_FIELDS = {title.lower(): field for field, title in SECTIONS.items()}
+_HEADING = re.compile(r"^[#*\s]*[1-4]\.\s*\**\s*(" + "|".join(re.escape(t) for t in SECTIONS.values()) + r")(.*)$",
+                      re.M | re.I)
+_HEADING_TAIL = re.compile(r"^\s*(\([^)]*\))?\s*\**\s*:?\s*\**")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+
+def _lines(body):
+    lines = []
+    for raw in body.splitlines():
+        line = _BULLET.sub("", raw).replace("**", "").strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def parse_sections(text):
+    """
+    Splits an explanation into its four sections.
+
+    Args:
+        text (str): LLM explanation.
+
+    Returns:
+        dict: summary (str), strengths (list), risks (list) and verdict (str, the
+        first line of the section); None for a section the text doesn't have.
+    """
+    sections = {field: None for field in SECTIONS}
+    text = text or ""
+    matches = list(_HEADING.finditer(text))
+    for i, match in enumerate(matches):
+        field = _FIELDS[match.group(1).lower()]
+        if sections[field] is not None:
+            continue  # A repeated heading: the first one wins
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        lines = _lines(_HEADING_TAIL.sub("", match.group(2)) + "\n" + text[match.end():end])
+        if field in LIST_FIELDS:
+            sections[field] = lines
+        elif field == "verdict":
+            sections[field] = lines[0] if lines else None
+        else:
+            sections[field] = " ".join(lines) if lines else None
+    return sections
@@ -0,0 +1,207 @@
+"""
+Append-only NDJSON stream of LLM explanations (`llm_explanations.ndjson`).
+
+Each explanation is appended (and flushed) as soon as it is resolved, so a crash at
+company 49 keeps the first 48 and readers (compile_report, the daily brief, the
+explanation worker) can follow a run while it is in progress. One object per line:
+
+    {"type": "run", "tickers": [...], "started_at": ...}    the run's list, in rank order
+    {"type": "explanation", "ticker", "prompt_sha", "status", "explanation", "sections"}
+
+status is ok, failed or skipped (no LLM configured); the last record of a ticker wins.
+`sections` are the explanation's fields (explanation_sections.parse_sections), parsed
+once when the record is added. An in-memory index (ticker -> byte offset of its last
+record, and its verdict) makes verdict() a dict lookup and lookup() one seek, and
+refresh() only reads the bytes appended since the previous call, whichever process
+wrote them.
+
+begin() starts a run by rewriting the file as the run header plus the earlier ok
+records whose prompt is unchanged: a rerun after a crash resumes from them, nothing
+of an older run shows through, and the file stays about one run long.
+"""
+import json
+import os
+import time
+
+from src.llm_reasoning import explanation_sections
+
+RUN = "run"
+EXPLANATION = "explanation"
+STATUSES = ["ok", "failed", "skipped"]
+
+
+def stream_path(output_file):
+    """The stream next to a JSON output: llm_explanations.json -> llm_explanations.ndjson."""
+    return os.path.splitext(output_file)[0] + ".ndjson"
+
+
+def _with_sections(record):
+    # Records streamed before sections were stored are parsed when read
+    if record.get("type") != RUN and "sections" not in record:
+        ok = record.get("status", "ok") == "ok"
+        record["sections"] = explanation_sections.parse_sections(record["explanation"]) if ok else None
+    return record
+
+
+class ExplanationStream:
+    """Explanations of the current run, indexed by ticker."""
+
+    def __init__(self, path):
+        self.path = path
+        self._inode = None
+        self._reader = None
+        self._writer = None
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        self.close()
+        self.tickers = []    # current run, in rank order
+        self.run_id = None   # started_at of the current run header
+        self._index = {}     # ticker -> (offset, prompt_sha, status, verdict)
+        self._scanned = 0    # bytes indexed so far
+
+    def refresh(self):
+        """
+        Indexes the records appended since the last call (by this or another process).
+
+        Returns:
+            list: tickers with a new record.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._scanned:
+                self._reset()
+            return []
+        if st.st_ino != self._inode or st.st_size < self._scanned:
+            # Rewritten by begin() (possibly in another process): index it again
+            self._reset()
+            self._inode = st.st_ino
+        if st.st_size == self._scanned:
+            return []
+
+        changed = []
+        offset = self._scanned
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written, or torn by a killed run
+                self._index_line(offset, line, changed)
+                offset += len(line)
+        self._scanned = offset
+        return changed
+
+    def _index_line(self, offset, line, changed):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return  # Torn line, completed by the next writer's newline
+        if record.get("type") == RUN:
+            self.tickers = list(record["tickers"])
+            self.run_id = record["started_at"]
+        else:
+            sections = _with_sections(record)["sections"]
+            verdict = sections["verdict"] if sections else None
+            self._index[record["ticker"]] = (offset, record.get("prompt_sha"), record.get("status", "ok"), verdict)
+            changed.append(record["ticker"])
+
+    def _read(self, offset):
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        return _with_sections(json.loads(self._reader.readline()))
+
+    def begin(self, prompts):
+        """
+        Starts a run over (ticker, prompt_sha) pairs in rank order.
+
+        Returns:
+            int: ok records carried over from the previous contents (same prompt).
+        """
+        self.refresh()
+        kept = []
+        for ticker, sha in prompts:
+            entry = self._index.get(ticker)
+            if entry is not None and entry[2] == "ok" and entry[1] == sha:
+                kept.append(self._read(entry[0]))
+        header = {"type": RUN, "tickers": [ticker for ticker, _ in prompts], "started_at": time.time()}
+
+        self._reset()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            for record in [header] + kept:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+        os.replace(tmp_path, self.path)
+        self._inode = None
+        self.refresh()
+        return len(kept)
+
+    def add(self, ticker, sha, explanation, status="ok"):
+        """Appends one explanation and its parsed sections; on disk (and indexed) when this returns."""
+        if self._writer is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Unbuffered: every record goes out in a single append
+            self._writer = open(self.path, 'ab', buffering=0)
+            if self._writer.tell() > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._writer.write(b"\n")  # Terminate a torn last line
+        record = {"type": EXPLANATION, "ticker": ticker, "prompt_sha": sha, "status": status,
+                  "explanation": explanation,
+                  "sections": explanation_sections.parse_sections(explanation) if status == "ok" else None}
+        self._writer.write((json.dumps(record) + "\n").encode("utf-8"))
+        self.refresh()
+
+    def get(self, ticker, sha):
+        """The ok explanation of `ticker` for this exact prompt, or None (resume lookup)."""
+        entry = self._index.get(ticker)
+        if entry is None or entry[2] != "ok" or entry[1] != sha:
+            return None
+        return self._read(entry[0])["explanation"]
+
+    def lookup(self, ticker):
+        """Latest record of `ticker` (dict), or None."""
+        entry = self._index.get(ticker)
+        return self._read(entry[0]) if entry is not None else None
+
+    def verdict(self, ticker):
+        """Overall verdict of `ticker` from the index (no I/O), or None (missing, failed, no verdict)."""
+        entry = self._index.get(ticker)
+        return entry[3] if entry is not None else None
+
+    def verdicts(self):
+        """ticker -> verdict for the current run (None where there is none)."""
+        return {ticker: self.verdict(ticker) for ticker in self.tickers}
+
+    def sections(self, ticker):
+        """Parsed sections of `ticker` (see explanation_sections), or None."""
+        record = self.lookup(ticker)
+        return record.get("sections") if record is not None else None
+
+    def offset(self, ticker):
+        """Byte offset of the latest record of `ticker` (changes whenever it is replaced)."""
+        entry = self._index.get(ticker)
+        return entry[0] if entry is not None else None
+
+    def explanations(self, missing=None):
+        """
+        The current run as [{ticker, explanation, sections}] in rank order (the
+        llm_explanations.json layout); tickers without a record get `missing`.
+        """
+        results = []
+        for ticker in self.tickers:
+            record = self.lookup(ticker)
+            results.append({'ticker': ticker, 'explanation': record['explanation'] if record else missing,
+                            'sections': record.get('sections') if record else None})
+        return results
+
+    def close(self):
+        for handle in (self._reader, self._writer):
+            if handle is not None:
+                handle.close()
+        self._reader = None
+        self._writer = None
@@ -0,0 +1,247 @@
+"""
+LLM explanations off the monitoring critical path.
+
+generate_daily_brief calls prepare_explanations, which serves cached explanations at
+once and queues the rest in the SQLite job queue (job_queue.py); the brief is written
+immediately with pending verdicts. This module's worker (run_worker, or
+`python src/llm_reasoning/explanation_worker.py`) drains the queue in the background:
+each result is appended to the explanation stream (explanation_stream.py) and patched
+into the brief's verdict line as it arrives, and llm_explanations.json is rewritten
+from the stream after every claimed batch.
+
+Verdict lines in the brief end with an HTML comment marker (`<!-- verdict:TICKER -->`,
+invisible when rendered) so they can be found and rewritten.
+"""
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from src.llm_reasoning import async_explanations, explanation_cache, generate_explanations, job_queue, llm_client
+from src.llm_reasoning import compile_report, explanation_stream
+
+PENDING_EXPLANATION = "Explanation pending (queued for background generation)."
+PENDING_VERDICT = "⏳ Pending (explanation queued)"
+NO_VERDICT = "No AI verdict available."
+
+
+def verdict_marker(ticker):
+    return f"<!-- verdict:{ticker} -->"
+
+
+def verdict_line(ticker, verdict):
+    """The brief's verdict line for one company (patchable by the worker)."""
+    return f"  > *AI Verdict*: {verdict} {verdict_marker(ticker)}"
+
+
+def _atomic_write(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def patch_brief(path, verdicts):
+    """
+    Rewrites the verdict lines of a published brief.
+
+    Args:
+        path (str): daily_brief.md.
+        verdicts (dict): ticker -> verdict.
+
+    Returns:
+        int: lines patched.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    patched = 0
+    for ticker, verdict in verdicts.items():
+        pattern = re.compile(r"^  > \*AI Verdict\*: .*" + re.escape(" " + verdict_marker(ticker)) + "$", re.M)
+        text, n = pattern.subn(lambda _: verdict_line(ticker, verdict), text)
+        patched += n
+    if patched:
+        _atomic_write(path, text)
+    return patched
+
+
+def prepare_explanations(input_file, prompt_file, output_file, run_date, cache=None, queue=None, model=None):
+    """
+    Non-blocking replacement for generate_explanations in the daily brief.
+
+    Cached explanations are used as is; every other company is queued for the
+    background worker and written to `output_file` as PENDING_EXPLANATION.
+    Without a configured LLM this falls back to generate_explanations' placeholders.
+
+    Args:
+        input_file (str): Top N CSV.
+        prompt_file (str): prompt template.
+        output_file (str): llm_explanations.json.
+        run_date (str): snapshot date the jobs belong to.
+        cache (ExplanationCache): explanation cache (flushed here).
+        queue (JobQueue): default JobQueue().
+        model (str): model name the cache is keyed on (default LLM_MODEL).
+
+    Returns:
+        dict: explanations (ticker -> text), pending (set of queued tickers),
+        cache_hits, cache_misses and depth (queue depth after enqueueing).
+    """
+    stream = explanation_stream.ExplanationStream(explanation_stream.stream_path(output_file))
+    if not llm_client.is_configured():
+        generate_explanations.generate_explanations(input_file, prompt_file, output_file, cache=cache)
+        stream.refresh()
+        explanations = {item['ticker']: item['explanation'] for item in stream.explanations()}
+        stream.close()
+        return {"explanations": explanations, "pending": set(), "cache_hits": 0, "cache_misses": 0, "depth": None}
+
+    model = model or settings.LLM_MODEL
+    _, company_prompts = generate_explanations.load_company_prompts(input_file, prompt_file)
+    shas = {ticker: explanation_cache.cache_key(prompt, model) for ticker, prompt in company_prompts}
+    # Explanations an interrupted worker already streamed for these prompts are kept
+    stream.begin([(ticker, shas[ticker]) for ticker, _ in company_prompts])
+    missing = []
+    hits = 0
+    for ticker, prompt in company_prompts:
+        if stream.get(ticker, shas[ticker]) is not None:
+            continue
+        cached = cache.get(prompt, model) if cache is not None else None
+        if cached is not None:
+            stream.add(ticker, shas[ticker], cached)
+            hits += 1
+        else:
+            missing.append((ticker, prompt))
+    if cache is not None:
+        cache.flush()
+
+    queue = queue or job_queue.JobQueue()
+    if missing:
+        queue.enqueue(run_date, missing, model)
+    results = stream.explanations(missing=PENDING_EXPLANATION)
+    generate_explanations.write_json(output_file, results)
+    stream.close()
+    return {
+        "explanations": {item['ticker']: item['explanation'] for item in results},
+        "pending": {ticker for ticker, _ in missing},
+        "cache_hits": hits,
+        "cache_misses": len(missing),
+        "depth": queue.depth(run_date)
+    }
+
+
+def run_worker(queue=None, client=None, cache=None, brief_path=None, output_path=None, report_path=None,
+               wait=False, poll_sec=None, **kwargs):
+    """
+    Claims and runs explanation jobs until the queue is empty. Results are streamed
+    and patched into the brief one by one; the JSON is rewritten after each batch.
+
+    Args:
+        queue (JobQueue): default JobQueue().
+        client: LLM client (default llm_client.make_client()).
+        cache (ExplanationCache): filled with the new explanations.
+        brief_path (str): brief to patch (default data/reports/daily_brief.md).
+        output_path (str): JSON to rewrite (default data/reports/llm_explanations.json);
+            the stream is the `.ndjson` next to it.
+        report_path (str): top_50_analysis.md to build as the results arrive (optional).
+        wait (bool): once nothing is left to claim, also wait for jobs other workers
+            are still running.
+        **kwargs: passed to async_explanations.explain_all (max_concurrency, batch_size, ...).
+
+    Returns:
+        ExplanationStats, or None without a configured LLM.
+    """
+    queue = queue or job_queue.JobQueue()
+    client = client or llm_client.make_client()
+    if client is None:
+        logging.warning("No LLM configured; leaving explanation jobs queued.")
+        return None
+    reports = os.path.join(settings.DATA_DIR, 'reports')
+    brief_path = brief_path or os.path.join(reports, 'daily_brief.md')
+    output_path = output_path or os.path.join(reports, 'llm_explanations.json')
+    poll_sec = poll_sec or settings.LLM_WORKER_POLL_SEC
+    stream = explanation_stream.ExplanationStream(explanation_stream.stream_path(output_path))
+    report = compile_report.ReportBuilder(stream, report_path) if report_path else None
+    stats = async_explanations.ExplanationStats()
+    # One token bucket across claim rounds
+    kwargs.setdefault("limiter", async_explanations.make_limiter())
+
+    while True:
+        jobs = queue.claim()
+        if not jobs:
+            if wait and queue.depth()["running"]:
+                time.sleep(poll_sec)
+                continue
+            break
+        by_ticker = {job['ticker']: job for job in jobs}
+        finished = set()
+
+        def on_result(ticker, text, ok):
+            job = by_ticker[ticker]
+            if ok:
+                queue.complete(job['id'], text)
+            else:
+                queue.fail(job['id'], text)
+            finished.add(job['id'])
+            # Parsed when explain_all streamed the result: no text to search here
+            patch_brief(brief_path, {ticker: stream.verdict(ticker) or NO_VERDICT})
+            if report is not None:
+                report.update()
+
+        logging.info(f"Claimed {len(jobs)} explanation jobs ({jobs[0]['run_date']})")
+        try:
+            async_explanations.run_explanations([(job['ticker'], job['prompt']) for job in jobs], client,
+                                                partial=stream, cache=cache, stats=stats, on_result=on_result,
+                                                **kwargs)
+        finally:
+            queue.release([job['id'] for job in jobs if job['id'] not in finished])
+            generate_explanations.write_json(output_path, stream.explanations(missing=PENDING_EXPLANATION))
+            if cache is not None:
+                cache.flush()
+
+    stream.close()
+    stats.stop()
+    logging.info(stats.format_report())
+    logging.info(queue.format_summary())
+    queue.purge()
+    return stats
+
+
+def start_background_worker(log_path=None):
+    """
+    Starts `python explanation_worker.py` detached from the current process, on the
+    current settings.DATA_DIR (queue, cache and reports).
+
+    Returns:
+        int: the worker's pid.
+    """
+    log_path = log_path or os.path.join(settings.DATA_DIR, 'reports', 'llm_worker.log')
+    with open(log_path, 'a') as log:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--data-dir", settings.DATA_DIR],
+                                   cwd=settings.BASE_DIR,
+                                   stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    return process.pid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued LLM explanation jobs.")
+    parser.add_argument("--wait", action="store_true", help="also wait for jobs running in other workers")
+    parser.add_argument("--status", action="store_true", help="print queue depth and job latency, then exit")
+    parser.add_argument("--data-dir", help="data directory (default settings.DATA_DIR)")
+    args = parser.parse_args()
+    if args.data_dir:
+        settings.DATA_DIR = args.data_dir
+
+    if args.status:
+        print(job_queue.JobQueue().format_summary())
+    else:
+        cache = explanation_cache.ExplanationCache() if settings.LLM_CACHE_ENABLED else None
+        run_worker(cache=cache, wait=args.wait)
@@ -3,8 +3,6 @@ import sys
 import os
 import json
 import logging
-import time
-import google.generativeai as genai
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -13,9 +11,53 @@ logging.basicConfig(level=logging.INFO, format='%(message)s')
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(base_dir)
 
-from src.llm_reasoning import prompts
+from config import settings
+from src.llm_reasoning import prompts, llm_client, async_explanations, explanation_cache
+from src.llm_reasoning import explanation_stream, compile_report
 
-def generate_explanations(input_file, prompt_file, output_file):
+SKIPPED_EXPLANATION = "LLM explanation skipped (Missing API Key)."
+
+def render_prompt(template, row):
+    """
+    Fills the prompt template from one company row.
+
+    Args:
+        template (str): prompt_template.txt contents.
+        row (pd.Series or dict): company metrics, `sector` and `alerts`.
+
+    Returns:
+        str: The rendered prompt.
+    """
+    # Handle potential NaN values safely for formatting
+    def safe_float(val):
+        return float(val) if pd.notnull(val) else 0.0
+
+    return template.format(
+        ticker=row.get('ticker', 'Unknown'),
+        sector=row.get('sector', 'N/A'),
+        final_score=f"{safe_float(row.get('final_score')):.2f}",
+        roe=safe_float(row.get('roe')),
+        roce=safe_float(row.get('roce')),
+        net_margin=safe_float(row.get('net_margin')),
+        revenue_cagr=safe_float(row.get('revenue_cagr')),
+        profit_cagr=safe_float(row.get('profit_cagr')),
+        debt_to_equity=safe_float(row.get('debt_to_equity')),
+        interest_coverage=safe_float(row.get('interest_coverage')),
+        asset_turnover=safe_float(row.get('asset_turnover')),
+        alerts=row.get('alerts', 'None')
+    )
+
+def load_company_prompts(input_file, prompt_file):
+    """
+    Reads the Top N CSV and renders one prompt per company.
+
+    Args:
+        input_file (str): Top N CSV.
+        prompt_file (str): prompt template.
+
+    Returns:
+        tuple: (every ticker of the CSV, [(ticker, prompt)] for the rows that rendered).
+    """
     logging.info(f"Loading data from {input_file}")
     try:
         df = pd.read_csv(input_file)
@@ -41,71 +83,97 @@ def generate_explanations(input_file, prompt_file, output_file):
     if 'alerts' not in df.columns:
         df['alerts'] = 'None'
 
-    results = []
+    company_prompts = []
+    for _, row in df.iterrows():
+        try:
+            company_prompts.append((row['ticker'], render_prompt(template, row)))
+        except Exception as e:
+            logging.error(f"Error processing {row.get('ticker')}: {e}")
+    return list(df['ticker']), company_prompts
+
+def write_json(path, data):
+    # Readers (brief, dashboard) never see a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def generate_explanations(input_file, prompt_file, output_file, client=None, cache=None, report_file=None,
+                          **kwargs):
+    """
+    Generates one LLM explanation per company of `input_file` (see async_explanations).
+
+    Every explanation is appended to the NDJSON stream next to the output
+    (`<output stem>.ndjson`, see explanation_stream) as it arrives, so a rerun after a
+    crash only calls the LLM for the remaining companies; `output_file` is written from
+    the stream at the end. With a `cache`, companies whose prompt is unchanged since an
+    earlier run reuse the cached text. Per-request latencies are saved next to the
+    output as `<output stem>_requests.csv`.
+
+    Args:
+        input_file (str): Top N CSV.
+        prompt_file (str): prompt template.
+        output_file (str): JSON list of {ticker, explanation}.
+        client: LLM client (default llm_client.make_client(); None skips generation).
+        cache (ExplanationCache): persistent explanation cache, flushed at the end.
+        report_file (str): top_50_analysis.md to build while the explanations arrive.
+        **kwargs: passed to async_explanations.explain_all (max_concurrency, limiter, ...).
 
-    logging.info(f"Generating explanations for {len(df)} companies...")
+    Returns:
+        ExplanationStats, or None when generation was skipped.
+    """
+    tickers, company_prompts = load_company_prompts(input_file, prompt_file)
 
-    # Configure Gemini
-    # Configure Gemini
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    logging.info(f"Generating explanations for {len(tickers)} companies...")
+
+    client = client or llm_client.make_client()
+    model = getattr(client, "model_name", settings.LLM_MODEL)
+    shas = {ticker: explanation_cache.cache_key(prompt, model) for ticker, prompt in company_prompts}
+    stream = explanation_stream.ExplanationStream(explanation_stream.stream_path(output_file))
+    report = compile_report.ReportBuilder(stream, report_file) if report_file else None
+    if client is None:
         logging.warning("GEMINI_API_KEY not found. Skipping LLM generation and using placeholders.")
         # Create dummy results for all rows
-        results = [{'ticker': row.get('ticker'), 'explanation': "LLM explanation skipped (Missing API Key)."} for _, row in df.iterrows()]
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
-        return
-    
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    
-    for idx, row in df.iterrows():
-        # Format the prompt
-        try:
-            # Handle potential NaN values safely for formatting
-            def safe_float(val):
-                return float(val) if pd.notnull(val) else 0.0
-            
-            prompt = template.format(
-                ticker=row.get('ticker', 'Unknown'),
-                sector=row.get('sector', 'N/A'),
-                final_score=f"{safe_float(row.get('final_score')):.2f}",
-                roe=safe_float(row.get('roe')),
-                roce=safe_float(row.get('roce')),
-                net_margin=safe_float(row.get('net_margin')),
-                revenue_cagr=safe_float(row.get('revenue_cagr')),
-                profit_cagr=safe_float(row.get('profit_cagr')),
-                debt_to_equity=safe_float(row.get('debt_to_equity')),
-                interest_coverage=safe_float(row.get('interest_coverage')),
-                asset_turnover=safe_float(row.get('asset_turnover')),
-                alerts=row.get('alerts', 'None')
-            )
-            
-            # Call Gemini API
-            try:
-                response = model.generate_content(prompt)
-                llm_response = response.text
-                logging.info(f"Generated explanation for {row.get('ticker')}")
-                # Rate limit handling (Free tier is approx 15 RPM = 1 request every 4s)
-                time.sleep(4) 
-            except Exception as api_err:
-                logging.error(f"Gemini API Error for {row.get('ticker')}: {api_err}")
-                llm_response = "Error generating explanation due to API failure."
-                time.sleep(10) # Backoff on error
-            results.append({
-                'ticker': row['ticker'],
-                'explanation': llm_response.strip()
-            })
-            
-        except Exception as e:
-            logging.error(f"Error processing {row.get('ticker')}: {e}")
-            
-    # Save results
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
-        
+        stream.begin([(ticker, shas.get(ticker)) for ticker in tickers])
+        for ticker in tickers:
+            stream.add(ticker, shas.get(ticker), SKIPPED_EXPLANATION, status="skipped")
+        write_json(output_file, stream.explanations())
+        if report is not None:
+            report.update(final=True)
+        stream.close()
+        if cache is not None:
+            cache.flush()  # Still expire old entries (and create the file on a first run)
+        return None
+
+    stream.begin([(ticker, shas[ticker]) for ticker, _ in company_prompts])
+    if report is not None:
+        callback = kwargs.pop('on_result', None)
+
+        def on_result(ticker, text, ok):
+            if callback is not None:
+                callback(ticker, text, ok)
+            report.update()
+        kwargs['on_result'] = on_result
+
+    stats = async_explanations.ExplanationStats()
+    try:
+        async_explanations.run_explanations(company_prompts, client, partial=stream, cache=cache, stats=stats,
+                                            **kwargs)
+    finally:
+        if cache is not None:
+            cache.flush()
+
+    # Save results (input order, whatever order the requests finished in)
+    results = stream.explanations(missing=async_explanations.FAILED_EXPLANATION)
+    write_json(output_file, results)
+    if report is not None:
+        report.update(final=True)
+    stream.close()
+    stats.to_frame().to_csv(os.path.splitext(output_file)[0] + "_requests.csv", index=False)
+
     logging.info(f"Saved {len(results)} explanations to {output_file}")
+    logging.info(stats.format_report())
+    return stats
 
 
 if __name__ == "__main__":
@@ -115,5 +183,7 @@ if __name__ == "__main__":
     INPUT = os.path.join(settings.DATA_DIR, 'reports', 'top_50.csv')
     TEMPLATE = os.path.join(BASE, 'src', 'llm_reasoning', 'prompt_template.txt')
     OUTPUT = os.path.join(settings.DATA_DIR, 'reports', 'llm_explanations.json')
+    REPORT = os.path.join(settings.DATA_DIR, 'reports', 'top_50_analysis.md')
     
-    generate_explanations(INPUT, TEMPLATE, OUTPUT)
+    cache = explanation_cache.ExplanationCache() if settings.LLM_CACHE_ENABLED else None
+    generate_explanations(INPUT, TEMPLATE, OUTPUT, cache=cache, report_file=REPORT)
@@ -0,0 +1,193 @@
+"""
+SQLite-backed job queue for LLM explanations.
+
+The daily brief enqueues one job per company whose explanation isn't cached and
+publishes right away with pending verdicts; explanation_worker claims the jobs in the
+background and patches the outputs as results arrive. Any number of workers can share
+the queue: claiming is a single IMMEDIATE transaction.
+
+Table `jobs` (settings.LLM_JOB_QUEUE_PATH, default data/processed/llm_jobs.sqlite), one
+row per (run_date, ticker):
+
+    status: pending -> running -> done | failed
+            pending / running -> cancelled (a newer run_date was enqueued)
+    enqueued_at / started_at / finished_at (unix seconds) give queue wait and run time.
+
+Only the latest run date is claimed. A job stuck in `running` for LLM_JOB_STALE_SEC
+(its worker died) is claimed again.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from config import settings
+
+STATUSES = ["pending", "running", "done", "failed", "cancelled"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    prompt_sha TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (run_date, ticker)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+def default_path():
+    """settings.LLM_JOB_QUEUE_PATH, or llm_jobs.sqlite under the current settings.DATA_DIR."""
+    return settings.LLM_JOB_QUEUE_PATH or os.path.join(settings.DATA_DIR, 'processed', 'llm_jobs.sqlite')
+
+
+class JobQueue:
+    """Explanation jobs in one SQLite file (WAL mode, safe across processes)."""
+
+    def __init__(self, path=None, stale_sec=None, clock=time.time):
+        self.path = path or default_path()
+        self.stale_sec = settings.LLM_JOB_STALE_SEC if stale_sec is None else stale_sec
+        self._clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def enqueue(self, run_date, prompts, model=None):
+        """
+        Queues (ticker, prompt) pairs for `run_date`. A job that is already done with
+        the same prompt is left alone; unfinished jobs of older run dates are cancelled.
+
+        Returns:
+            int: jobs now pending for run_date.
+        """
+        model = model or settings.LLM_MODEL
+        now = self._clock()
+        rows = [(run_date, ticker, model, prompt, hashlib.sha256(prompt.encode("utf-8")).hexdigest(), now)
+                for ticker, prompt in prompts]
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                               "WHERE status IN ('pending', 'running') AND run_date < ?", (now, run_date))
+            self._conn.executemany("""
+                INSERT INTO jobs (run_date, ticker, model, prompt, prompt_sha, status, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                ON CONFLICT (run_date, ticker) DO UPDATE SET
+                    model = excluded.model, prompt = excluded.prompt, prompt_sha = excluded.prompt_sha,
+                    status = 'pending', attempts = 0, enqueued_at = excluded.enqueued_at,
+                    started_at = NULL, finished_at = NULL, result = NULL, error = NULL
+                WHERE jobs.status IN ('failed', 'cancelled')
+                   OR jobs.prompt_sha != excluded.prompt_sha
+                   OR jobs.model != excluded.model
+            """, rows)
+        return self.depth(run_date).get("pending", 0)
+
+    def claim(self, limit=None):
+        """
+        Marks up to `limit` pending (or stale running) jobs as running and returns them.
+
+        Returns:
+            list: dicts with id, run_date, ticker, model, prompt, attempts, enqueued_at.
+        """
+        limit = limit or settings.LLM_WORKER_CLAIM_SIZE
+        now = self._clock()
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute("""
+                SELECT id, run_date, ticker, model, prompt, attempts, enqueued_at FROM jobs
+                WHERE (status = 'pending' OR (status = 'running' AND started_at < ?))
+                  AND run_date = (SELECT MAX(run_date) FROM jobs)
+                ORDER BY id LIMIT ?
+            """, (now - self.stale_sec, limit)).fetchall()
+            self._conn.executemany("UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                                   "WHERE id = ?", [(now, row["id"]) for row in rows])
+        return [dict(row) for row in rows]
+
+    def complete(self, job_id, result):
+        self._conn.execute("UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL WHERE id = ?",
+                           (self._clock(), result, job_id))
+
+    def fail(self, job_id, error):
+        self._conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                           (self._clock(), error, job_id))
+
+    def release(self, job_ids):
+        """Puts claimed jobs back (e.g. the worker is shutting down)."""
+        self._conn.executemany("UPDATE jobs SET status = 'pending', started_at = NULL WHERE id = ? "
+                               "AND status = 'running'", [(job_id,) for job_id in job_ids])
+
+    def depth(self, run_date=None):
+        """Job count per status (optionally for one run date)."""
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = ()
+        if run_date is not None:
+            query += " WHERE run_date = ?"
+            params = (run_date,)
+        counts = dict(self._conn.execute(query + " GROUP BY status", params).fetchall())
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    def results(self, run_date):
+        """ticker -> (status, result) for every job of run_date."""
+        rows = self._conn.execute("SELECT ticker, status, result FROM jobs WHERE run_date = ?", (run_date,))
+        return {ticker: (status, result) for ticker, status, result in rows}
+
+    def latency(self, run_date=None):
+        """
+        Job latency in seconds over finished jobs: queue wait (enqueued -> started),
+        run time (started -> finished) and end to end, as p50/p95.
+        """
+        query = ("SELECT started_at - enqueued_at, finished_at - started_at, finished_at - enqueued_at "
+                 "FROM jobs WHERE status IN ('done', 'failed')")
+        params = ()
+        if run_date is not None:
+            query += " AND run_date = ?"
+            params = (run_date,)
+        values = np.array(self._conn.execute(query, params).fetchall(), dtype=np.float64).reshape(-1, 3)
+
+        def pct(column, q):
+            return float(np.percentile(values[:, column], q)) if len(values) else np.nan
+
+        return {
+            "finished": len(values),
+            "wait_p50_sec": pct(0, 50),
+            "wait_p95_sec": pct(0, 95),
+            "run_p50_sec": pct(1, 50),
+            "run_p95_sec": pct(1, 95),
+            "total_p50_sec": pct(2, 50),
+            "total_p95_sec": pct(2, 95)
+        }
+
+    def purge(self, older_than_days=None):
+        """Deletes finished / cancelled jobs enqueued more than older_than_days ago."""
+        days = settings.LLM_JOB_RETENTION_DAYS if older_than_days is None else older_than_days
+        cursor = self._conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') "
+                                    "AND enqueued_at < ?", (self._clock() - days * 86400,))
+        return cursor.rowcount
+
+    def format_summary(self, run_date=None):
+        d = self.depth(run_date)
+        l = self.latency(run_date)
+        return "\n".join([
+            "--- Explanation Job Queue ---",
+            "Depth: " + ", ".join(f"{status}={d[status]}" for status in STATUSES),
+            f"Latency ({l['finished']} finished): wait p50={l['wait_p50_sec']:.1f}s p95={l['wait_p95_sec']:.1f}s | "
+            f"run p50={l['run_p50_sec']:.1f}s p95={l['run_p95_sec']:.1f}s | "
+            f"end-to-end p50={l['total_p50_sec']:.1f}s p95={l['total_p95_sec']:.1f}s",
+        ])
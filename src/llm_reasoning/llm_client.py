@@ -0,0 +1,84 @@
+"""
+LLM clients used by the explanation generator.
+
+A client is any object with `async def generate(prompt) -> str`:
+- GeminiClient: google-generativeai (imported lazily, so the rest of the package
+  works without it installed).
+- HTTPClient: a plain JSON endpoint (POST {"model", "prompt"} -> {"text"}), e.g. the
+  local fake server in benchmarks/fake_llm.py or a self-hosted model.
+
+Throttling (HTTP 429) is raised as rate_limiter.RateLimitError so the shared token
+bucket can back off.
+"""
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.request
+
+from config import settings
+from src.data_ingestion.rate_limiter import RateLimitError
+
+
+class LLMError(Exception):
+    """Raised when the LLM endpoint fails or returns an unusable response."""
+
+
+class GeminiClient:
+    """Google Gemini via google-generativeai."""
+
+    def __init__(self, api_key, model_name=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name or settings.LLM_MODEL
+        self._model = genai.GenerativeModel(self.model_name)
+
+    async def generate(self, prompt):
+        response = await self._model.generate_content_async(prompt)
+        return response.text
+
+
+class HTTPClient:
+    """JSON-over-HTTP endpoint. The blocking urllib call runs on the default executor."""
+
+    def __init__(self, base_url, model_name=None, timeout=None):
+        self.url = base_url.rstrip("/") + "/generate"
+        self.model_name = model_name or settings.LLM_MODEL
+        self.timeout = timeout or settings.LLM_REQUEST_TIMEOUT_SEC
+
+    def _post(self, prompt):
+        body = json.dumps({"model": self.model_name, "prompt": prompt}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimitError(f"HTTP 429 from {self.url}") from e
+            raise LLMError(f"HTTP {e.code} from {self.url}") from e
+        if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+            raise LLMError(f"Malformed response from {self.url}: {payload!r}")
+        return payload["text"]
+
+    async def generate(self, prompt):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._post, prompt)
+
+
+def is_configured():
+    """True when make_client() would return a client."""
+    return bool(settings.LLM_BASE_URL or os.getenv("GEMINI_API_KEY"))
+
+
+def make_client():
+    """
+    Client from the environment: LLM_BASE_URL if set, else Gemini if GEMINI_API_KEY
+    is set, else None (explanations are skipped).
+    """
+    if settings.LLM_BASE_URL:
+        return HTTPClient(settings.LLM_BASE_URL)
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        return GeminiClient(api_key)
+    return None
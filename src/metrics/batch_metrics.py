@@ -0,0 +1,305 @@
+"""
+Vectorized (columnar) metric engine for NFM Equity Research.
+
+Computes the same metrics as compute_metrics.compute_all_metrics, but for the whole
+universe in one pass with NumPy array operations instead of one Python dict per ticker.
+
+Inputs:
+- a DataFrame of scalar fields (one row per ticker: price_current, eps, cfo, ...)
+- padded history matrices: {field: (n_tickers, width) float64, NaN-padded} plus the
+  original list length per ticker ({field: (n_tickers,) int}). Lengths matter because
+  the scalar CAGRs use the *last list element* as the start value even when it is NaN.
+  A HistoryBlock already holds these matrices; its year mask gives the lengths.
+
+Results match the scalar functions (up to floating point summation order).
+"""
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.history_block import HISTORY_FIELDS, HistoryBlock
+
+# Output columns, in the same order as compute_all_metrics
+METRIC_NAMES = [
+    "pe_ratio",
+    "fcf_to_net_profit",
+    "revenue_growth_latest",
+    "revenue_growth_10y",
+    "profit_growth_10y",
+    "roce_latest",
+    "roce_10y",
+    "roe_10y",
+    "eps_10y_avg",
+    "eps_growth",
+    "fcf_to_revenue",
+    "inv_cf_to_op_cf",
+    "gp_margin_10y",
+    "np_margin_10y",
+    "debt_to_equity",
+    "capex_to_net_earnings",
+    "price_growth_1y",
+    "peg_ratio",
+    "m_score",
+    "sh_to_liability",
+    "coc_roce_check",
+    "mkt_retained_growth",
+    "net_rec_sales_comparison",
+    "mkt_cap_retained_val",
+    "market_share"
+]
+
+# Inputs that come from prices/info (refreshed daily) and the metrics that depend only on
+# them plus carried-forward statement fields. Used by incremental runs when a ticker's
+# statements are unchanged.
+MARKET_INPUTS = ["price_current", "price_1y_ago", "market_cap", "peg_ratio"]
+MARKET_METRICS = ["pe_ratio", "price_growth_1y", "peg_ratio"]
+
+# Ratios of the original features.csv (roe, revenue CAGR, ...), still read by the scoring
+# printout, prompts, dashboard and alert rules. Derived from the scalar inputs only.
+LEGACY_RATIOS = ["roe", "revenue_cagr", "interest_coverage", "fcf_margin"]
+
+# ------------------------
+# Array helpers (vector versions of the scalar helpers)
+# ------------------------
+
+def vec_safe_div(numerator, denominator):
+    """Element-wise safe_div: NaN where the denominator is 0/NaN or the numerator is NaN."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = numerator / denominator
+    invalid = (denominator == 0) | np.isnan(denominator) | np.isnan(numerator)
+    return np.where(invalid, np.nan, out)
+
+def vec_cagr(start_val, end_val, years):
+    """Element-wise calculate_cagr."""
+    start_val = np.asarray(start_val, dtype=np.float64)
+    end_val = np.asarray(end_val, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    # NaN compares False, so this also covers the isna checks
+    valid = (years > 0) & (start_val > 0) & (end_val > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.power(end_val / start_val, 1.0 / years) - 1
+    return np.where(valid, out, np.nan)
+
+def vec_growth(current, previous):
+    """Element-wise (current - previous) / previous, NaN if either is NaN or previous is 0."""
+    current = np.asarray(current, dtype=np.float64)
+    previous = np.asarray(previous, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (current - previous) / previous
+    invalid = np.isnan(current) | np.isnan(previous) | (previous == 0)
+    return np.where(invalid, np.nan, out)
+
+def row_nanmean(matrix):
+    """Row-wise list_avg: mean of non-NaN values, NaN if there are none."""
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    totals = np.where(valid, matrix, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+def _hist_cagr(values, lengths):
+    """CAGR from the newest (index 0) to the oldest (index len-1) list element."""
+    n = values.shape[0]
+    if values.shape[1] == 0:
+        return np.full(n, np.nan)
+    last = np.clip(lengths - 1, 0, values.shape[1] - 1)
+    start = values[np.arange(n), last]
+    end = values[:, 0]
+    out = vec_cagr(start, end, lengths - 1)
+    return np.where(lengths >= 2, out, np.nan)
+
+def _element(values, lengths, idx):
+    """values[:, idx] where the list is long enough, NaN otherwise."""
+    if values.shape[1] <= idx:
+        return np.full(values.shape[0], np.nan)
+    return np.where(lengths > idx, values[:, idx], np.nan)
+
+def _paired_ratio(num, den):
+    """Per-year safe_div over two padded histories (zip semantics: padding -> NaN)."""
+    width = min(num.shape[1], den.shape[1])
+    return vec_safe_div(num[:, :width], den[:, :width])
+
+# ------------------------
+# Building padded inputs
+# ------------------------
+
+def pad_histories(rows, fields=None, width=None):
+    """
+    Packs list histories from processed rows into NaN-padded matrices.
+
+    Args:
+        rows (list of dict): processed rows with list-like hist_* values.
+        fields (list): history fields to pack (default HISTORY_FIELDS).
+        width (int): matrix width (default: longest list).
+
+    Returns:
+        (dict, dict): {field: (n, width) float64}, {field: (n,) int64 lengths}
+    """
+    fields = fields or HISTORY_FIELDS
+    values, lengths = {}, {}
+    n = len(rows)
+    for field in fields:
+        hists = [row.get(field) for row in rows]
+        lens = np.array([len(h) if h is not None else 0 for h in hists], dtype=np.int64)
+        w = width if width is not None else (int(lens.max()) if n else 0)
+        matrix = np.full((n, w), np.nan)
+        for i, h in enumerate(hists):
+            k = min(lens[i], w)
+            if k:
+                matrix[i, :k] = np.asarray(h[:k], dtype=np.float64)
+        values[field] = matrix
+        lengths[field] = np.minimum(lens, w)
+    return values, lengths
+
+def _column(frame, name, default=np.nan):
+    if name in frame.columns:
+        return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64)
+    return np.full(len(frame), default, dtype=np.float64)
+
+# ------------------------
+# Master function
+# ------------------------
+
+def compute_all_metrics_batch(frame, hist_values=None, hist_lengths=None):
+    """
+    Compute all metrics for every ticker at once.
+
+    Args:
+        frame (pd.DataFrame): one row per ticker with the scalar fields.
+        hist_values (dict): {hist_field: (n, width) NaN-padded float64}.
+        hist_lengths (dict): {hist_field: (n,) list lengths}.
+
+    Returns:
+        pd.DataFrame: METRIC_NAMES columns, same index as `frame`.
+    """
+    n = len(frame)
+    hist_values = hist_values or {}
+    hist_lengths = hist_lengths or {}
+
+    def hist(field):
+        values = hist_values.get(field)
+        if values is None:
+            return np.full((n, 0), np.nan), np.zeros(n, dtype=np.int64)
+        lengths = hist_lengths.get(field)
+        if lengths is None:
+            lengths = np.full(n, values.shape[1], dtype=np.int64)
+        return np.asarray(values, dtype=np.float64), np.asarray(lengths)
+
+    # Base Values
+    p_curr = _column(frame, "price_current")
+    p_old = _column(frame, "price_1y_ago")
+    eps = _column(frame, "eps")
+    ni = _column(frame, "net_income")
+    rev = _column(frame, "revenue")
+    cfo = _column(frame, "cfo")
+    cfi = _column(frame, "cfi")
+    capex = _column(frame, "capex")
+    # FCF = CFO - Capex; like row.get(..., 0), a missing column counts as 0
+    fcf = _column(frame, "cfo", 0.0) - _column(frame, "capex", 0.0)
+    equity = _column(frame, "equity")
+    debt = _column(frame, "total_debt")
+    ebit = _column(frame, "ebit")
+    ce = _column(frame, "capital_employed")
+    liab = _column(frame, "total_liabilities")
+    peg = _column(frame, "peg_ratio")
+
+    # Histories
+    h_rev, l_rev = hist("hist_revenue")
+    h_ni, l_ni = hist("hist_net_income")
+    h_ebit, l_ebit = hist("hist_ebit")
+    h_eq, l_eq = hist("hist_equity")
+    h_ce, l_ce = hist("hist_cap_employed")
+    h_eps, l_eps = hist("hist_eps")
+    h_gp, l_gp = hist("hist_gross_profit")
+
+    roce_by_year = _paired_ratio(h_ebit, h_ce)
+    valid_roce = ~np.isnan(roce_by_year)
+    n_valid_roce = valid_roce.sum(axis=1)
+    n_high_roce = (roce_by_year > 0.30).sum(axis=1)
+
+    nan_col = np.full(n, np.nan)
+    metrics = {
+        "pe_ratio": vec_safe_div(p_curr, eps),
+        "fcf_to_net_profit": vec_safe_div(fcf, ni),
+        "revenue_growth_latest": vec_growth(rev, _element(h_rev, l_rev, 1)),
+        "revenue_growth_10y": _hist_cagr(h_rev, l_rev),
+        "profit_growth_10y": _hist_cagr(h_ni, l_ni),
+        "roce_latest": vec_safe_div(ebit, ce),
+        "roce_10y": row_nanmean(roce_by_year),
+        "roe_10y": row_nanmean(_paired_ratio(h_ni, h_eq)),
+        "eps_10y_avg": row_nanmean(h_eps),
+        "eps_growth": _hist_cagr(h_eps, l_eps),
+        "fcf_to_revenue": vec_safe_div(fcf, rev),
+        "inv_cf_to_op_cf": vec_safe_div(cfi, cfo),
+        "gp_margin_10y": row_nanmean(_paired_ratio(h_gp, h_rev)),
+        "np_margin_10y": row_nanmean(_paired_ratio(h_ni, h_rev)),
+        "debt_to_equity": vec_safe_div(debt, equity),
+        "capex_to_net_earnings": vec_safe_div(capex, ni),
+        "price_growth_1y": vec_growth(p_curr, p_old),
+        "peg_ratio": peg,
+        "m_score": nan_col.copy(),
+        "sh_to_liability": vec_safe_div(equity, liab),
+        # All valid years above 30% ROCE -> 1.0, else (or no valid years) 0.0
+        "coc_roce_check": np.where((n_valid_roce > 0) & (n_high_roce == n_valid_roce), 1.0, 0.0),
+        # Placeholders for undefined/impossible items
+        "mkt_retained_growth": nan_col.copy(),
+        "net_rec_sales_comparison": nan_col.copy(),
+        "mkt_cap_retained_val": nan_col.copy(),
+        "market_share": nan_col.copy()
+    }
+    return pd.DataFrame(metrics, index=frame.index, columns=METRIC_NAMES)
+
+def compute_market_metrics(frame):
+    """
+    Recomputes only MARKET_METRICS from a frame holding fresh price/info fields and the
+    (unchanged) statement fields they need (eps). Same formulas as compute_all_metrics_batch.
+    """
+    p_curr = _column(frame, "price_current")
+    metrics = {
+        "pe_ratio": vec_safe_div(p_curr, _column(frame, "eps")),
+        "price_growth_1y": vec_growth(p_curr, _column(frame, "price_1y_ago")),
+        "peg_ratio": _column(frame, "peg_ratio")
+    }
+    return pd.DataFrame(metrics, index=frame.index, columns=MARKET_METRICS)
+
+def compute_legacy_ratios(frame):
+    """
+    LEGACY_RATIOS from a frame of scalar inputs (net_income, equity, revenue,
+    revenue_3y_ago, ebit, interest_expense, cfo, capex).
+
+    Returns:
+        pd.DataFrame: LEGACY_RATIOS columns, same index as `frame`.
+    """
+    revenue = _column(frame, "revenue")
+    ratios = {
+        "roe": vec_safe_div(_column(frame, "net_income"), _column(frame, "equity")),
+        "revenue_cagr": vec_cagr(_column(frame, "revenue_3y_ago"), revenue, 3),
+        "interest_coverage": vec_safe_div(_column(frame, "ebit"), _column(frame, "interest_expense")),
+        # Same FCF as the metrics: a missing cfo/capex counts as 0
+        "fcf_margin": vec_safe_div(_column(frame, "cfo", 0.0) - _column(frame, "capex", 0.0), revenue)
+    }
+    return pd.DataFrame(ratios, index=frame.index, columns=LEGACY_RATIOS)
+
+def compute_metrics_for_block(frame, block):
+    """
+    Compute all metrics from a scalar frame and the HistoryBlock of the same tickers
+    (row i of the block belongs to row i of the frame).
+    """
+    lengths = block.lengths()
+    hist_lengths = {field: lengths for field in block.values}
+    return compute_all_metrics_batch(frame, block.values, hist_lengths)
+
+def compute_metrics_for_rows(rows):
+    """
+    Convenience wrapper: list of processed dicts -> metrics DataFrame (one row per input).
+    Rows from process_ticker_data (with `hist_years`) are stacked into a HistoryBlock;
+    legacy rows with plain lists are padded field by field.
+    """
+    skip = set(HISTORY_FIELDS) | {"hist_years"}
+    scalar_rows = [{k: v for k, v in row.items() if k not in skip} for row in rows]
+    frame = pd.DataFrame(scalar_rows)
+    if rows and all("hist_years" in row for row in rows):
+        return compute_metrics_for_block(frame, HistoryBlock.from_rows(rows))
+    hist_values, hist_lengths = pad_histories(rows)
+    return compute_all_metrics_batch(frame, hist_values, hist_lengths)
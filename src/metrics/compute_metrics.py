@@ -2,7 +2,7 @@
 Metric computation module for NFM Equity Research.
 
 All metrics are pure functions.
-They take primitive numeric inputs (scalar or list) and return floats.
+They take primitive numeric inputs (scalar, list or 1-D array) and return floats.
 Missing / invalid inputs are handled safely.
 
 """
@@ -27,9 +27,13 @@ def calculate_cagr(start_val, end_val, years):
         return np.nan
     return (end_val / start_val) ** (1 / years) - 1
 
+def is_empty(values):
+    """True for None or a zero-length list/array (numpy arrays have no truth value)."""
+    return values is None or len(values) == 0
+
 def list_avg(data_list):
     """Computes average of a list, handling NaNs/empty."""
-    if not data_list:
+    if is_empty(data_list):
         return np.nan
     clean = [x for x in data_list if not pd.isna(x)]
     if not clean:
@@ -60,7 +64,7 @@ def revenue_growth_latest(rev_current, rev_prev):
 def revenue_cagr_10y(hist_revenue):
     # Expects list of [Current, -1Y, -2Y, ... -NY] or yfinance often gives [Current, -1Y, -2Y, -3Y]
     # We will use max available span.
-    if not hist_revenue or len(hist_revenue) < 2:
+    if is_empty(hist_revenue) or len(hist_revenue) < 2:
         return np.nan
     start_val = hist_revenue[-1] # Oldest
     end_val = hist_revenue[0]    # Newest
@@ -69,7 +73,7 @@ def revenue_cagr_10y(hist_revenue):
 
 # 5. 10Y Compounded Growth (Assumed Profit CAGR)
 def profit_cagr_10y(hist_profit):
-    if not hist_profit or len(hist_profit) < 2:
+    if is_empty(hist_profit) or len(hist_profit) < 2:
         return np.nan
     start_val = hist_profit[-1]
     end_val = hist_profit[0]
@@ -85,7 +89,7 @@ def roce(ebit, capital_employed):
 
 # 7. 10Y ROCE (Avg)
 def roce_10y_avg(hist_ebit, hist_cap_employed):
-    if not hist_ebit or not hist_cap_employed:
+    if is_empty(hist_ebit) or is_empty(hist_cap_employed):
         return np.nan
     # Compute per year then avg
     roces = []
@@ -98,7 +102,7 @@ def roce_10y_avg(hist_ebit, hist_cap_employed):
 
 # 8. 10Y ROE (Avg)
 def roe_10y_avg(hist_net_income, hist_equity):
-    if not hist_net_income or not hist_equity:
+    if is_empty(hist_net_income) or is_empty(hist_equity):
         return np.nan
     roes = []
     for n, e in zip(hist_net_income, hist_equity):
@@ -113,7 +117,7 @@ def eps_10y_avg(hist_eps):
 
 # 10. EPS Growth Rate (CAGR or YoY Avg? Assumed CAGR)
 def eps_growth(hist_eps):
-    if not hist_eps or len(hist_eps) < 2:
+    if is_empty(hist_eps) or len(hist_eps) < 2:
         return np.nan
     start = hist_eps[-1]
     end = hist_eps[0]
@@ -138,7 +142,7 @@ def inv_cf_to_op_cf(cfi, cfo):
 
 # 13. 10Y Avg GP Margin
 def gp_margin_10y_avg(hist_gp, hist_rev):
-    if not hist_gp or not hist_rev:
+    if is_empty(hist_gp) or is_empty(hist_rev):
         return np.nan
     margins = []
     for g, r in zip(hist_gp, hist_rev):
@@ -149,7 +153,7 @@ def gp_margin_10y_avg(hist_gp, hist_rev):
 
 # 14. 10Y Avg NP Margin
 def np_margin_10y_avg(hist_ni, hist_rev):
-    if not hist_ni or not hist_rev:
+    if is_empty(hist_ni) or is_empty(hist_rev):
         return np.nan
     margins = []
     for n, r in zip(hist_ni, hist_rev):
@@ -196,7 +200,7 @@ def coc_roce_check(hist_ebit, hist_cap_employed):
     # Check if ROCE > 30% for ALL years (or most?)
     # "yes no" implies boolean.
     # We'll return 1.0 (Yes) or 0.0 (No).
-    if not hist_ebit or not hist_cap_employed:
+    if is_empty(hist_ebit) or is_empty(hist_cap_employed):
         return 0.0
     
     count = 0
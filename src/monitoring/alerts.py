@@ -1,3 +1,101 @@
+"""
+Monitoring alerts, evaluated over the whole universe at once.
+
+evaluate_alerts_frame joins the current and previous snapshots on ticker and runs the
+compiled rule registry (settings.ALERT_RULES, see rules.py) over the joined frame, one
+NumPy pass per rule, returning one typed alert table. Two kinds of rules:
+
+- change rules ("vs_previous" / "relative") compare a ticker with its previous
+  snapshot (score drop, debt spike, cash flow collapse); tickers without a previous
+  row never trigger them.
+- level rules ("absolute") look at the current snapshot only (high debt, negative
+  FCF, low score, low profitability, negative growth, solvency risk).
+
+A rule whose metric column is missing from the snapshot is skipped.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.monitoring import rules as alert_rules
+from src.monitoring.rules import SEVERITIES
+
+ALERT_COLUMNS = ["ticker", "type", "severity", "value", "previous", "message"]
+
+def join_snapshots(curr, prev):
+    """Current snapshot with the previous one's columns (suffixed `_prev`) joined on ticker."""
+    if prev is None:
+        return curr.reset_index(drop=True)
+    prev = prev.drop_duplicates("ticker").set_index("ticker").add_suffix(alert_rules.PREVIOUS_SUFFIX)
+    return curr.reset_index(drop=True).join(prev, on="ticker")
+
+
+def empty_alerts(types=()):
+    return pd.DataFrame({
+        "ticker": pd.Series(dtype=object),
+        "type": pd.Categorical([], categories=list(types)),
+        "severity": pd.Categorical([], categories=SEVERITIES, ordered=True),
+        "value": pd.Series(dtype=np.float64),
+        "previous": pd.Series(dtype=np.float64),
+        "message": pd.Series(dtype=object)
+    })
+
+
+def evaluate_alerts_frame(curr, prev=None, level_rules=True, rules=None):
+    """
+    Evaluates every alert rule over a whole snapshot.
+
+    Args:
+        curr (pd.DataFrame): current snapshot (`ticker` + metric columns).
+        prev (pd.DataFrame): previous snapshot, None to run the level rules only.
+        level_rules (bool): include the rules on the current values.
+        rules (RuleSet): compiled rules (default: settings.ALERT_RULES, see rules.default_rules).
+
+    Returns:
+        pd.DataFrame: one row per triggered alert: ticker, type (category),
+            severity (ordered category HIGH < MEDIUM < LOW), value, previous (NaN
+            for level rules) and message; sorted by severity, ticker and rule order.
+    """
+    rules = rules or alert_rules.default_rules()
+    joined = join_snapshots(curr, prev)
+    tickers = joined["ticker"].to_numpy()
+
+    def col(name):
+        if name not in joined.columns:
+            return None
+        return pd.to_numeric(joined[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    frames = []
+    for rule in rules.rules:
+        if (rule.needs_previous and prev is None) or (not rule.needs_previous and not level_rules):
+            continue
+        hits = rule.evaluate(col)
+        if hits is None or not len(hits["idx"]):
+            continue
+        frames.append(pd.DataFrame({
+            "ticker": tickers[hits["idx"]],
+            "type": rule.type,
+            "severity": hits["severity"],
+            "value": hits["value"],
+            "previous": hits["previous"],
+            "message": hits["message"],
+            "_order": rule.order
+        }))
+    if not frames:
+        return empty_alerts(rules.types)
+
+    table = pd.concat(frames, ignore_index=True)
+    table["type"] = pd.Categorical(table["type"], categories=rules.types)
+    table["severity"] = pd.Categorical(table["severity"], categories=SEVERITIES, ordered=True)
+    table = table.sort_values(["severity", "ticker", "_order"], kind="stable")
+    return table.drop(columns="_order").reset_index(drop=True)[ALERT_COLUMNS]
+
+
 def evaluate_alerts(company_data, prev_company_data):
     """
     Evaluates monitoring rules against current and previous company data.
@@ -9,55 +107,19 @@ def evaluate_alerts(company_data, prev_company_data):
     Returns:
         list: List of triggered alerts (dicts). Each alert has type, severity, message.
     """
-    alerts = []
-    
     if prev_company_data is None:
-        return alerts
+        return []
 
-    # --- Rule 1: Score Drop % ---
-    current_score = company_data.get('final_score', 0)
-    prev_score = prev_company_data.get('final_score', 0)
-    
-    if prev_score > 0:
-        score_change_pct = (current_score - prev_score) / prev_score
-        
-        # Threshold: > 15% drop triggers alert
-        if score_change_pct < -0.15: 
-            alerts.append({
-                "type": "SCORE_DROP",
-                "severity": "HIGH",
-                "message": f"Composite score dropped by {abs(score_change_pct):.1%}"
-            })
-
-    # --- Rule 2: Debt Spike ---
-    current_de = company_data.get('debt_to_equity', 0)
-    prev_de = prev_company_data.get('debt_to_equity', 0)
-    
-    # Threshold: Debt/Equity increased by > 0.5 absolute or > 50% relative if meaningful
-    if current_de > prev_de:
-        if (current_de - prev_de) > 0.5:
-            alerts.append({
-                "type": "DEBT_SPIKE",
-                "severity": "MEDIUM",
-                "message": f"Debt/Equity ratio spiked from {prev_de:.2f} to {current_de:.2f}"
-            })
-
-    # --- Rule 3: Cash Flow Collapse ---
-    current_cfo = company_data.get('cfo', 0)
-    prev_cfo = prev_company_data.get('cfo', 0)
-    
-    # Logic: CFO was positive, now significantly lower or negative
-    # Threshold: Drop > 50%
-    if prev_cfo > 0:
-        cfo_change_pct = (current_cfo - prev_cfo) / prev_cfo
-        if cfo_change_pct < -0.50:
-             alerts.append({
-                "type": "CASH_FLOW_COLLAPSE",
-                "severity": "HIGH",
-                "message": f"Operating Cash Flow collapsed by {abs(cfo_change_pct):.1%}"
-            })
-            
-    return alerts
+    # Same change rules as the universe-wide engine, on a one-row frame (missing metrics count as 0)
+    metrics = {rule.metric for rule in alert_rules.default_rules().rules if rule.needs_previous}
+
+    def frame(data):
+        return pd.DataFrame([{"ticker": "", **{m: data.get(m, 0) for m in metrics}}])
+
+    table = evaluate_alerts_frame(frame(company_data), frame(prev_company_data), level_rules=False)
+    table = table.sort_values("type", kind="stable")  # registry order
+    return [{"type": row["type"], "severity": row["severity"], "message": row["message"]}
+            for row in table.to_dict("records")]
 
 if __name__ == "__main__":
     # Dummy Test
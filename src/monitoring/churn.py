@@ -1,3 +1,29 @@
+"""
+Churn decisions: which tickers enter and leave the Top 50 portfolio.
+
+decide_churn is the original single-ticker rule (rank <= 50 stays). The batch engine
+decides for every ticker at once, with hysteresis so a stock oscillating around rank
+50 doesn't trade every day:
+
+- entry band: buy when ranked within CHURN_ENTRY_RANK (40),
+- exit band: sell when ranked beyond CHURN_EXIT_RANK (60), once the position has been
+  held CHURN_MIN_HOLD_DAYS snapshots,
+- alert-forced exits: CHURN_FORCED_EXIT_ALERTS sell regardless of rank or holding period.
+
+churn_step decides one date with NumPy masks over the universe; replay_churn runs it
+over the snapshot history store and returns the decision table and turnover.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+
 def decide_churn(rank, alerts):
     """
     Determines churn action based on rank and alerts.
@@ -57,6 +83,195 @@ def generate_churn_report(company_name, rank, alerts, decision):
     
     return "\n".join(report)
 
+ACTIONS = np.array(["", "ADD", "KEEP", "REMOVE"], dtype=object)
+NONE, ADD, KEEP, REMOVE = range(4)
+REASONS = np.array([
+    "",
+    "Ranked within entry band",
+    "Ranked within exit band",
+    "Beyond exit band, held less than the minimum holding period",
+    "Not ranked today",
+    "Ranked beyond exit band",
+    "Alert-forced exit"
+], dtype=object)
+
+
+def churn_step(ranks, held, held_days, forced_exit=None, eligible=None,
+               entry_rank=None, exit_rank=None, min_hold=None):
+    """
+    One churn decision for every ticker of the universe.
+
+    Args:
+        ranks (np.ndarray): 1-based ranks, 0 where the ticker isn't ranked today.
+        held (np.ndarray): bool, tickers currently held.
+        held_days (np.ndarray): int, decisions each holding has survived since it was bought.
+        forced_exit (np.ndarray): bool, tickers with an alert that forces an exit.
+        eligible (np.ndarray): bool, tickers that may be bought (default: all).
+        entry_rank / exit_rank / min_hold: bands and holding period (default settings.CHURN_*).
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray): action codes (index into
+        ACTIONS), reason codes (index into REASONS), new held mask, new held_days.
+    """
+    entry_rank = entry_rank or settings.CHURN_ENTRY_RANK
+    exit_rank = exit_rank or settings.CHURN_EXIT_RANK
+    min_hold = settings.CHURN_MIN_HOLD_DAYS if min_hold is None else min_hold
+    forced = np.zeros(len(ranks), dtype=bool) if forced_exit is None else forced_exit
+    ranked = ranks > 0
+    beyond = ranked & (ranks > exit_rank)
+
+    # Holdings: a forced exit beats everything, a rank exit waits for the holding period.
+    # Unranked holdings (no data today) are kept.
+    forced_out = held & forced
+    rank_out = held & ~forced & beyond & (held_days >= min_hold)
+    keep = held & ~forced_out & ~rank_out
+    add = ~held & ranked & (ranks <= entry_rank) & ~forced
+    if eligible is not None:
+        add &= eligible
+
+    actions = np.zeros(len(ranks), dtype=np.int8)
+    reasons = np.zeros(len(ranks), dtype=np.int8)
+    actions[keep], reasons[keep] = KEEP, 2
+    reasons[keep & beyond] = 3
+    reasons[keep & ~ranked] = 4
+    actions[rank_out], reasons[rank_out] = REMOVE, 5
+    actions[forced_out], reasons[forced_out] = REMOVE, 6
+    actions[add], reasons[add] = ADD, 1
+
+    new_days = np.where(keep, held_days + 1, 0)
+    new_days[add] = 1
+    return actions, reasons, keep | add, new_days
+
+
+def _panel_axes(panel):
+    """Sorted date / ticker axes of a long snapshot frame and each row's position on them."""
+    date_idx, dates = pd.factorize(panel["date"], sort=True)
+    ticker_idx, tickers = pd.factorize(panel["ticker"], sort=True)
+    return list(dates), np.asarray(tickers, dtype=object), date_idx, ticker_idx
+
+
+def rank_matrix(panel):
+    """
+    (dates, tickers) rank matrix of a long snapshot frame (date, ticker, rank).
+
+    Returns:
+        (list, np.ndarray, np.ndarray): dates, tickers, int ranks with 0 where unranked.
+    """
+    dates, tickers, date_idx, ticker_idx = _panel_axes(panel)
+    ranks = np.zeros((len(dates), len(tickers)), dtype=np.int64)
+    ranks[date_idx, ticker_idx] = panel["rank"].to_numpy()
+    return dates, tickers, ranks
+
+
+def forced_exit_matrix(panel, alert_types=None):
+    """
+    (dates, tickers) bool matrix of alert-forced exits: the forced alert rules evaluated
+    on every snapshot against the one before it.
+
+    The metrics are laid out as (dates, tickers) matrices once, and each compiled rule
+    runs a single time over all consecutive date pairs (current = rows 1.., previous =
+    rows ..-1, flattened); tickers missing on either date are NaN and never trigger.
+    """
+    from src.monitoring import rules
+
+    alert_types = settings.CHURN_FORCED_EXIT_ALERTS if alert_types is None else alert_types
+    dates, tickers, date_idx, ticker_idx = _panel_axes(panel)
+    forced = np.zeros((len(dates), len(tickers)), dtype=bool)
+    registry = [rule for rule in settings.ALERT_RULES if rule["type"] in alert_types]
+    if not registry or len(dates) < 2:
+        return forced
+
+    matrices = {}
+    for metric in {rule["metric"] for rule in registry}:
+        if metric in panel.columns:
+            values = np.full((len(dates), len(tickers)), np.nan)
+            values[date_idx, ticker_idx] = pd.to_numeric(panel[metric], errors="coerce").to_numpy(
+                dtype=np.float64, na_value=np.nan)
+            matrices[metric] = values[1:].ravel()
+            matrices[metric + rules.PREVIOUS_SUFFIX] = values[:-1].ravel()
+
+    hits = forced[1:].reshape(-1)
+    for rule in rules.compile_rules(registry).rules:
+        result = rule.evaluate(matrices.get)
+        if result is not None:
+            hits[result["idx"]] = True
+    return forced
+
+
+def replay_churn(store=None, dates=None, entry_rank=None, exit_rank=None, min_hold=None,
+                 forced_alerts=None):
+    """
+    Replays the churn engine over the snapshot history, starting from an empty portfolio.
+
+    Args:
+        store (SnapshotStore): history (default: settings.SNAPSHOT_STORE_DIR).
+        dates (list): snapshot dates to replay (default: all).
+        forced_alerts (list): alert types that force an exit (default settings.CHURN_FORCED_EXIT_ALERTS,
+            [] to disable).
+
+    Returns:
+        dict: {
+            "decisions": pd.DataFrame (date, ticker, rank, action, reason) of every ADD / REMOVE,
+            "latest": pd.DataFrame of the last date's holdings, entrants and exits,
+            "turnover": pd.DataFrame per date: adds, removes, holdings, turnover (one-way),
+            "summary": dict
+        }
+    """
+    from src.storage import snapshot_store
+
+    store = store or snapshot_store.SnapshotStore()
+    dates = dates or store.dates()
+    alert_types = settings.CHURN_FORCED_EXIT_ALERTS if forced_alerts is None else forced_alerts
+    registry = [rule for rule in settings.ALERT_RULES if rule["type"] in alert_types]
+    metrics = sorted({rule["metric"] for rule in registry})
+    panel = store.snapshots(dates, columns=metrics)
+    dates, tickers, ranks = rank_matrix(panel)
+    forced = forced_exit_matrix(panel, alert_types) if registry else None
+
+    held = np.zeros(len(tickers), dtype=bool)
+    held_days = np.zeros(len(tickers), dtype=np.int64)
+    decisions, stats = [], []
+    for d, date in enumerate(dates):
+        actions, reasons, new_held, held_days = churn_step(
+            ranks[d], held, held_days, None if forced is None else forced[d],
+            entry_rank=entry_rank, exit_rank=exit_rank, min_hold=min_hold)
+        traded = np.flatnonzero((actions == ADD) | (actions == REMOVE))
+        decisions.append(pd.DataFrame({
+            "date": date, "ticker": tickers[traded], "rank": ranks[d, traded],
+            "action": ACTIONS[actions[traded]], "reason": REASONS[reasons[traded]]
+        }))
+        adds, removes = int((actions == ADD).sum()), int((actions == REMOVE).sum())
+        holdings = int(new_held.sum())
+        # The first date builds the portfolio; it isn't churn
+        turnover = (adds + removes) / (2 * max(holdings, 1)) if d else 0.0
+        stats.append({"date": date, "adds": adds, "removes": removes, "holdings": holdings, "turnover": turnover})
+        if d == len(dates) - 1:
+            rows = np.flatnonzero(actions != NONE)
+            latest = pd.DataFrame({
+                "ticker": tickers[rows], "rank": ranks[d, rows],
+                "action": ACTIONS[actions[rows]], "reason": REASONS[reasons[rows]]
+            }).sort_values(["action", "rank"], kind="stable").reset_index(drop=True)
+        held = new_held
+
+    turnover = pd.DataFrame(stats, columns=["date", "adds", "removes", "holdings", "turnover"])
+    churn_days = turnover["turnover"].iloc[1:]
+    summary = {
+        "dates": len(dates),
+        "tickers": len(tickers),
+        "trades": int(turnover["adds"].iloc[1:].sum() + turnover["removes"].iloc[1:].sum()),
+        "avg_holdings": float(turnover["holdings"].mean()) if len(turnover) else 0.0,
+        "avg_turnover": float(churn_days.mean()) if len(churn_days) else 0.0,
+        "forced_exits": int(sum((df["reason"] == REASONS[6]).sum() for df in decisions))
+    }
+    return {
+        "decisions": pd.concat(decisions, ignore_index=True) if decisions else pd.DataFrame(
+            columns=["date", "ticker", "rank", "action", "reason"]),
+        "latest": latest if dates else pd.DataFrame(columns=["ticker", "rank", "action", "reason"]),
+        "turnover": turnover,
+        "summary": summary
+    }
+
+
 if __name__ == "__main__":
     print("Testing Churn Logic...")
     
@@ -0,0 +1,87 @@
+"""
+Rank diff between two snapshots: entrants, exits and movers of a Top N list.
+
+Both snapshots are joined on ticker once (an outer merge of ticker -> rank), and
+every category is a boolean mask over the joined frame, so the cost is O(n) in the
+snapshot size whether the list is the Top 50, the Top 500 or the full universe.
+Snapshots can hold more rows than the list (e.g. the full ranked universe from the
+snapshot store): exits then also report where the ticker ranks now.
+"""
+import numpy as np
+import pandas as pd
+
+
+class RankDiff:
+    """
+    Structured diff of a Top N list between two dates.
+
+    Attributes:
+        entrants (pd.DataFrame): ticker, rank, prev_rank (NaN if unranked before), by rank.
+        exits (pd.DataFrame): ticker, prev_rank, rank (NaN if unranked now), by prev_rank.
+        movers (pd.DataFrame): ticker, rank, prev_rank, change (positive = climbed),
+            biggest climbers first.
+    """
+
+    def __init__(self, date, previous_date, top_n, entrants, exits, movers):
+        self.date = date
+        self.previous_date = previous_date
+        self.top_n = top_n
+        self.entrants = entrants
+        self.exits = exits
+        self.movers = movers
+
+    def to_dict(self):
+        """JSON-serializable form (integer ranks, None where unranked), e.g. for the dashboard."""
+        def records(df):
+            return [{k: (None if pd.isna(v) else v if k == "ticker" else int(v)) for k, v in row.items()}
+                    for row in df.to_dict("records")]
+        return {
+            "date": self.date,
+            "previous_date": self.previous_date,
+            "top_n": self.top_n,
+            "entrants": records(self.entrants),
+            "exits": records(self.exits),
+            "movers": records(self.movers)
+        }
+
+
+def _ranks(df):
+    """ticker -> rank; rank is row order when the snapshot has no `rank` column."""
+    ranks = df["rank"].to_numpy(dtype=np.float64) if "rank" in df.columns else np.arange(1, len(df) + 1, dtype=np.float64)
+    return pd.DataFrame({"ticker": df["ticker"].to_numpy(), "rank": ranks})
+
+
+def diff_ranks(curr, prev, top_n=50, min_move=3, date=None, previous_date=None):
+    """
+    Compares two ranked snapshots.
+
+    Args:
+        curr (pd.DataFrame): latest snapshot (`ticker`, optional `rank`).
+        prev (pd.DataFrame): previous snapshot.
+        top_n (int): list size (None = every ranked ticker).
+        min_move (int): smallest rank change reported as a mover.
+
+    Returns:
+        RankDiff
+    """
+    joined = pd.merge(_ranks(curr), _ranks(prev), on="ticker", how="outer", suffixes=("", "_prev"))
+    joined = joined.rename(columns={"rank_prev": "prev_rank"})
+    rank = joined["rank"].to_numpy()
+    prev_rank = joined["prev_rank"].to_numpy()
+    limit = np.inf if top_n is None else top_n
+    # NaN compares False: unranked tickers are outside every list
+    in_curr = rank <= limit
+    in_prev = prev_rank <= limit
+
+    entrants = joined.loc[in_curr & ~in_prev, ["ticker", "rank", "prev_rank"]]
+    exits = joined.loc[in_prev & ~in_curr, ["ticker", "prev_rank", "rank"]]
+    movers = joined.loc[in_curr & in_prev, ["ticker", "rank", "prev_rank"]]
+    movers = movers.assign(change=(movers["prev_rank"] - movers["rank"]).astype(np.int64))
+    movers = movers[movers["change"].abs() >= min_move]
+
+    return RankDiff(
+        date, previous_date, top_n,
+        entrants.sort_values("rank", kind="stable").reset_index(drop=True),
+        exits.sort_values("prev_rank", kind="stable").reset_index(drop=True),
+        movers.sort_values(["change", "rank"], ascending=[False, True], kind="stable").reset_index(drop=True)
+    )
@@ -0,0 +1,201 @@
+"""
+Alert rule registry: settings.ALERT_RULES compiled into vectorized evaluators.
+
+Each rule is plain config (metric, comparison, op, threshold, severity, message; see
+config/settings.py). compile_rules validates the rules once and turns each into a
+CompiledRule whose evaluate() is a few NumPy column expressions over the joined
+current/previous snapshot. Adding a rule is a config change, not a new Python loop.
+
+Every CompiledRule keeps instrumentation across calls (evaluations, seconds, hits, and
+evaluations skipped because the snapshot lacked the rule's metric), reported by
+RuleSet.stats(); RuleSet.skipped() lists the rules that never saw their metric.
+"""
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+SEVERITIES = ["HIGH", "MEDIUM", "LOW"]
+COMPARISONS = ["absolute", "vs_previous", "relative"]
+MESSAGE_FIELDS = {"value", "previous", "change", "pct", "abs_pct"}
+PREVIOUS_SUFFIX = "_prev"
+
+_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal
+}
+
+
+class RuleError(ValueError):
+    """Raised when an alert rule in the registry is malformed."""
+
+
+def _compare(values, op, threshold):
+    if op == "between":
+        low, high = threshold
+        return (values > low) & (values < high)
+    return _OPS[op](values, threshold)
+
+
+def _check_condition(rule_type, op, threshold):
+    if op == "between":
+        if not (isinstance(threshold, (list, tuple)) and len(threshold) == 2):
+            raise RuleError(f"{rule_type}: 'between' needs threshold [low, high], got {threshold!r}")
+    elif op not in _OPS:
+        raise RuleError(f"{rule_type}: unknown op {op!r} (use one of {list(_OPS) + ['between']})")
+    elif not isinstance(threshold, (int, float)):
+        raise RuleError(f"{rule_type}: threshold must be a number, got {threshold!r}")
+
+
+class CompiledRule:
+    """One validated rule plus its instrumentation."""
+
+    def __init__(self, rule, order=0):
+        missing = [k for k in ("type", "metric", "comparison", "op", "threshold", "severity", "message") if k not in rule]
+        if missing:
+            raise RuleError(f"{rule.get('type', rule)}: missing {missing}")
+        self.type = rule["type"]
+        self.metric = rule["metric"]
+        self.comparison = rule["comparison"]
+        self.op = rule["op"]
+        self.threshold = rule["threshold"]
+        self.severity = rule["severity"]
+        self.escalate = rule.get("escalate")
+        self.scale = rule.get("scale", 1.0)
+        self.message = rule["message"]
+        self.order = order
+
+        if self.comparison not in COMPARISONS:
+            raise RuleError(f"{self.type}: unknown comparison {self.comparison!r} (use one of {COMPARISONS})")
+        _check_condition(self.type, self.op, self.threshold)
+        if not isinstance(self.scale, (int, float)) or self.scale <= 0:
+            raise RuleError(f"{self.type}: scale must be a positive number, got {self.scale!r}")
+        if "scale" in rule and self.comparison != "absolute":
+            raise RuleError(f"{self.type}: scale only applies to 'absolute' rules")
+        severities = [self.severity] + ([self.escalate.get("severity")] if self.escalate else [])
+        if any(s not in SEVERITIES for s in severities):
+            raise RuleError(f"{self.type}: severity must be one of {SEVERITIES}, got {severities}")
+        if self.escalate:
+            _check_condition(self.type, self.escalate.get("op"), self.escalate.get("threshold"))
+        fields = {f[1].split(".")[0].split("[")[0] for f in string.Formatter().parse(self.message) if f[1]}
+        if fields - MESSAGE_FIELDS:
+            raise RuleError(f"{self.type}: unknown message fields {sorted(fields - MESSAGE_FIELDS)}")
+
+        self.calls = 0
+        self.seconds = 0.0
+        self.hits = 0
+        self.skipped = 0
+
+    @property
+    def needs_previous(self):
+        return self.comparison != "absolute"
+
+    def evaluate(self, col):
+        """
+        Args:
+            col (callable): column name -> float64 array of the joined snapshot, None if missing.
+
+        Returns:
+            dict: idx (hit positions), severity, value, previous and message arrays of the
+            hits; None when the rule's columns aren't in the snapshot.
+        """
+        started = time.perf_counter()
+        value = col(self.metric)
+        previous = col(self.metric + PREVIOUS_SUFFIX) if self.needs_previous else None
+        if value is None or (self.needs_previous and previous is None):
+            self.skipped += 1
+            return None
+
+        if self.comparison == "absolute":
+            compared = value / self.scale
+            hits = _compare(compared, self.op, self.threshold)
+        elif self.comparison == "vs_previous":
+            compared = value - previous
+            hits = _compare(compared, self.op, self.threshold)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                compared = (value - previous) / previous
+            hits = (previous > 0) & _compare(compared, self.op, self.threshold)
+
+        idx = np.flatnonzero(hits)
+        severity = np.full(len(idx), self.severity, dtype=object)
+        if self.escalate:
+            severity[_compare(compared[idx], self.escalate["op"], self.escalate["threshold"])] = self.escalate["severity"]
+        value = value[idx]
+        previous = previous[idx] if previous is not None else np.full(len(idx), np.nan)
+        # Only the hits are formatted
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = value - previous
+            pct = change / previous
+        messages = [self.message.format(value=v, previous=p, change=c, pct=r, abs_pct=abs(r))
+                    for v, p, c, r in zip(value, previous, change, pct)]
+
+        self.calls += 1
+        self.hits += len(idx)
+        self.seconds += time.perf_counter() - started
+        return {"idx": idx, "severity": severity, "value": value, "previous": previous, "message": messages}
+
+
+class RuleSet:
+    """Compiled rules in registry order."""
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    @property
+    def types(self):
+        return list(dict.fromkeys(rule.type for rule in self.rules))
+
+    def stats(self):
+        """Per-rule instrumentation: evaluations, total/mean milliseconds, hits and skipped evaluations."""
+        return pd.DataFrame([{
+            "type": rule.type,
+            "metric": rule.metric,
+            "comparison": rule.comparison,
+            "calls": rule.calls,
+            "total_ms": rule.seconds * 1e3,
+            "mean_ms": rule.seconds * 1e3 / rule.calls if rule.calls else np.nan,
+            "hits": rule.hits,
+            "skipped": rule.skipped
+        } for rule in self.rules])
+
+    def skipped(self):
+        """Types of the rules skipped at least once because their metric was missing."""
+        return [rule.type for rule in self.rules if rule.skipped]
+
+    def reset_stats(self):
+        for rule in self.rules:
+            rule.calls, rule.seconds, rule.hits, rule.skipped = 0, 0.0, 0, 0
+
+
+def compile_rules(rules=None):
+    """
+    Validates and compiles an alert rule registry.
+
+    Args:
+        rules (list): rule dicts (default settings.ALERT_RULES).
+
+    Returns:
+        RuleSet
+
+    Raises:
+        RuleError: on a malformed rule.
+    """
+    rules = settings.ALERT_RULES if rules is None else rules
+    return RuleSet([CompiledRule(rule, order) for order, rule in enumerate(rules)])
+
+
+_default = None
+
+
+def default_rules():
+    """settings.ALERT_RULES, compiled on first use."""
+    global _default
+    if _default is None:
+        _default = compile_rules()
+    return _default
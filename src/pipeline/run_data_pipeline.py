@@ -2,6 +2,12 @@
 import pandas as pd
 import os
 import sys
+import time
+import queue
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
 from tqdm import tqdm
 import nselib
 from nselib import capital_market
@@ -10,8 +16,12 @@ from nselib import capital_market
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from config import settings
-from src.data_ingestion import fetcher, processor
-from src.metrics import compute_metrics
+from src.data_ingestion import fetcher, processor, async_ingestion, raw_cache, rate_limiter, history_block, checkpoint
+from src.data_ingestion import incremental
+from src.storage import feature_store
+from src.pipeline import stages
+from src.backtest import pit_archive
+from src.metrics import compute_metrics, batch_metrics
 
 def get_all_nse_tickers():
     """
@@ -29,7 +39,15 @@ def get_all_nse_tickers():
         print(f"Error fetching NSE ticker list: {e}")
         return []
 
-def run():
+def run(mode=None, incremental_mode=None):
+    """
+    Runs ingestion for the full NSE universe.
+    
+    Args:
+        mode (str): 'async', 'staged' or 'threads'. Defaults to settings.INGESTION_MODE.
+        incremental_mode (bool): reuse the previous run's rows for unchanged tickers.
+            Defaults to settings.INCREMENTAL_MODE.
+    """
     print("Starting Data Pipeline for Full Universe...")
     
     # 1. Get Tickers
@@ -41,20 +59,16 @@ def run():
     print(f"Total tickers found: {len(all_tickers)}")
     
     # 2. Resumability Logic
-    output_path = settings.PROCESSED_DATA_PATH
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # The checkpoint journal says which tickers are done: finished today, or without
+    # data and not yet due for a recheck. Failed tickers are retried.
+    store = feature_store.FeatureStore()
+    run_date = feature_store.today_str()
+    journal = checkpoint.CheckpointLog()
     
-    processed_tickers = set()
-    if os.path.exists(output_path):
-        try:
-            existing_df = pd.read_csv(output_path)
-            processed_tickers = set(existing_df['ticker'].tolist())
-            print(f"Resuming... {len(processed_tickers)} tickers already processed.")
-        except Exception:
-            print("Could not read existing file. Starting from scratch.")
-            
-    # Remove processed from todo
-    tickers_to_process = [t for t in all_tickers if t not in processed_tickers]
+    tickers_to_process = journal.pending(all_tickers, run_date)
+    skipped = len(all_tickers) - len(tickers_to_process)
+    if skipped:
+        print(f"Resuming... {skipped} tickers already done or without data. {journal.format_summary(run_date)}")
     
     print(f"Tickers remaining to process: {len(tickers_to_process)}")
     
@@ -62,96 +76,539 @@ def run():
         print("All tickers processed!")
         return
 
+    # Incremental: compare fingerprints against the last completed run
+    if incremental_mode is None:
+        incremental_mode = settings.INCREMENTAL_MODE
+    previous = None
+    if incremental_mode:
+        previous = incremental.PreviousRun(store, store.previous_run_date(run_date))
+        if previous.run_date:
+            print(f"Incremental mode: comparing against run {previous.run_date} ({len(previous)} tickers)")
+
     # 3. Processing Loop (Parallelized)
+    mode = mode or settings.INGESTION_MODE
+    cache = raw_cache.RawStatementCache() if settings.RAW_CACHE_ENABLED else None
+    # One limiter shared by every worker: the request rate adapts to throttling
+    limiter = rate_limiter.AdaptiveRateLimiter()
+    
+    try:
+        if mode == "staged":
+            run_staged(tickers_to_process, store, cache=cache, limiter=limiter, run_date=run_date,
+                       journal=journal, previous=previous)
+        elif mode == "async":
+            run_async(tickers_to_process, store, cache=cache, limiter=limiter, run_date=run_date,
+                      journal=journal, previous=previous)
+        else:
+            run_threaded(tickers_to_process, store, cache=cache, limiter=limiter, run_date=run_date,
+                         journal=journal, previous=previous)
+        if previous is not None and previous.run_date:
+            carried = carry_forward_missing(store, previous.run_date, run_date, all_tickers, journal)
+            if carried:
+                print(f"Carried forward {carried} tickers that could not be refreshed today.")
+        if settings.PIT_ARCHIVE_ENABLED:
+            # Point-in-time copy for backtests (the feature store itself is pruned)
+            archived = pit_archive.PITArchive().archive_feature_run(store, run_date)
+            if archived:
+                print(f"Archived run {archived} to {settings.PIT_ARCHIVE_DIR}")
+    finally:
+        print(limiter.summary())
+        if cache is not None:
+            cache.flush()
+            print(cache.format_summary())
+        # Merge the run's batch files into one sorted file and drop expired runs
+        store.compact(run_date)
+        pruned = store.prune()
+        if pruned:
+            print(f"Pruned feature store runs: {', '.join(pruned)}")
+        print(journal.format_summary(run_date))
+        
+    print("Pipeline completed.")
+
+def carry_forward_missing(store, previous_run_date, run_date, universe, journal):
+    """
+    Keeps today's run a complete snapshot: tickers from the previous run that weren't
+    written today (e.g. failed after retries) are copied over unchanged.
+    Tickers that now have no data are dropped.
+    
+    Returns:
+        int: number of rows carried forward.
+    """
+    written = store.tickers(run_date=run_date)
+    missing = []
+    for ticker in universe:
+        entry = journal.get(ticker)
+        if ticker not in written and not (entry and entry["status"] == checkpoint.STATUS_NO_DATA):
+            missing.append(ticker)
+    return store.carry_forward(missing, previous_run_date, run_date)
+
+def build_feature_row(ticker, raw_data, previous=None, cache=None):
+    """
+    Runs processing on fetched raw data (metrics are added per batch, see add_metrics).
+    With `previous` (incremental.PreviousRun), tickers whose inputs are unchanged reuse
+    the previous run's row instead of being reprocessed.
+    """
+    if not raw_data:
+        return None
+        
+    # B. Process
+    return incremental.build_row(ticker, raw_data, previous=previous, cache=cache)
+
+def _full_metrics(processed_rows, block=None):
+    """All metrics for `processed_rows` as a list of dicts (batch engine, scalar fallback)."""
+    try:
+        if block is None:
+            metrics = batch_metrics.compute_metrics_for_rows(processed_rows)
+        else:
+            frame = pd.DataFrame([strip_histories(row) for row in processed_rows])
+            metrics = batch_metrics.compute_metrics_for_block(frame, block)
+        return metrics.to_dict('records')
+    except Exception as e:
+        print(f"Warning: batch metric computation failed ({e}), falling back to per-row.")
+        metrics = []
+        for row in processed_rows:
+            try:
+                metrics.append(compute_metrics.compute_all_metrics(row))
+            except Exception:
+                metrics.append({})
+        return metrics
+
+def add_metrics(processed_rows, block=None):
+    """
+    C. Compute Metrics for a whole batch with the vectorized engine.
+    Falls back to the scalar per-row functions if the batch fails.
+    Incremental rows only get what changed: "market" rows recompute MARKET_METRICS,
+    "carried" rows keep their previous metrics.
+    
+    Args:
+        processed_rows (list): rows from process_ticker_data / incremental.build_row.
+        block (HistoryBlock): the rows' histories, if already stacked.
+    """
+    kinds = [row.get(incremental.REFRESH_KEY, incremental.REFRESH_FULL) for row in processed_rows]
+    out = list(processed_rows)
+    
+    full_idx = [i for i, kind in enumerate(kinds) if kind == incremental.REFRESH_FULL]
+    if full_idx:
+        rows = [processed_rows[i] for i in full_idx]
+        sub_block = None
+        if block is not None:
+            sub_block = block if len(full_idx) == len(processed_rows) else block.take(full_idx)
+        for i, m in zip(full_idx, _full_metrics(rows, sub_block)):
+            out[i] = {**processed_rows[i], **m}
+            
+    market_idx = [i for i, kind in enumerate(kinds) if kind == incremental.REFRESH_MARKET]
+    if market_idx:
+        frame = pd.DataFrame([strip_histories(processed_rows[i]) for i in market_idx])
+        market = batch_metrics.compute_market_metrics(frame).to_dict('records')
+        for i, m in zip(market_idx, market):
+            out[i] = {**processed_rows[i], **m}
+    return out
+
+def strip_histories(row):
+    """Scalar part of a processed row (histories travel in a HistoryBlock)."""
+    return {k: v for k, v in row.items() if k not in history_block.HISTORY_FIELDS and k != "hist_years"}
+
+def flush_batch(batch_data, store, run_date=None, journal=None):
+    """
+    Adds metrics to a batch of processed rows and appends it to the feature store
+    (scalar columns + typed history columns, one part file per batch).
+    Tickers are checkpointed as ok only once their batch is on disk.
+    
+    Returns:
+        dict: rows per refresh kind (full / market / carried).
+    """
+    block = history_block.HistoryBlock.from_rows(batch_data)
+    rows = add_metrics(batch_data, block)
+    return write_rows(rows, store, block, run_date, journal)
+
+def write_rows(rows, store, block=None, run_date=None, journal=None):
+    """Appends rows that already have metrics and checkpoints them as ok."""
+    store.append(rows, block, run_date=run_date)
+    if journal is not None:
+        journal.record_many([(row["ticker"], checkpoint.STATUS_OK, None) for row in rows], run_date=run_date)
+    return incremental.refresh_counts(rows)
+
+def _add_counts(totals, counts):
+    for kind, n in counts.items():
+        totals[kind] = totals.get(kind, 0) + n
+
+def format_refresh_counts(counts):
+    return (f"Recomputed: {counts.get(incremental.REFRESH_FULL, 0)} full, "
+            f"{counts.get(incremental.REFRESH_MARKET, 0)} price-only | "
+            f"Carried forward unchanged: {counts.get(incremental.REFRESH_CARRIED, 0)}")
+
+def process_one_ticker(ticker, cache=None, limiter=None, previous=None):
+    """
+    Helper to run the full chain for one ticker.
+    Fetch errors propagate (so the ticker can be retried); processing errors don't.
+    
+    Returns:
+        (dict, str): processed row (None if no data or processing failed), processing error.
+    """
+    # A. Fetch
+    raw_data = fetcher.fetch_raw_data(ticker, cache=cache, limiter=limiter)
+    try:
+        return build_feature_row(ticker, raw_data, previous, cache), None
+    except Exception as e:
+        print(f"Error processing {ticker}: {e}")
+        return None, f"processing: {e}"
+
+def run_threaded(tickers_to_process, store, cache=None, limiter=None, run_date=None, journal=None,
+                 previous=None):
+    """
+    Thread pool mode: each worker makes one ticker's calls in sequence.
+    The shared limiter sets the actual request rate; failed tickers are retried
+    with jittered exponential backoff instead of being dropped.
+    
+    Returns:
+        dict: ticker -> failure reason for tickers that exhausted their retries.
+    """
     batch_data = []
     BATCH_SIZE = 10 
-    MAX_WORKERS = 2 # Increased slightly, but keeping low to avoid rate limits
+    MAX_WORKERS = settings.INGESTION_MAX_WORKERS
     
     import concurrent.futures
+    from collections import deque
     
     print(f"Starting parallel processing with {MAX_WORKERS} workers...")
     
-    def process_one_ticker(ticker):
-        """Helper to run the full chain for one ticker"""
-        # A. Fetch
-        raw_data = fetcher.fetch_financials(ticker)
-        if not raw_data:
-            return None
-            
-        # B. Process
-        processed_data = processor.process_ticker_data(ticker, raw_data)
-        if not processed_data:
-            return None
-            
-        # C. Compute Metrics
-        try:
-            metrics = compute_metrics.compute_all_metrics(processed_data)
-        except Exception:
-            metrics = {}
-            
-        return {**processed_data, **metrics}
+    pending = deque((t, 0) for t in tickers_to_process)
+    retry_queue = rate_limiter.RetryQueue()
+    failures = {}
+    retries = 0
+    refreshed = {}
 
     # Use tqdm for progress bar
+    progress_bar = tqdm(total=len(tickers_to_process), desc="Processing Stocks", unit="ticker")
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks
-        future_to_ticker = {executor.submit(process_one_ticker, t): t for t in tickers_to_process}
-        
-        # Process as they complete
-        progress_bar = tqdm(concurrent.futures.as_completed(future_to_ticker), total=len(tickers_to_process), desc="Processing Stocks", unit="ticker")
+        in_flight = {}
         
-        for future in progress_bar:
-            ticker = future_to_ticker[future]
-            try:
-                result = future.result()
+        while pending or in_flight or len(retry_queue):
+            # Keep the pool busy: ready retries first, then fresh tickers
+            while len(in_flight) < MAX_WORKERS * 2:
+                item = retry_queue.pop_ready()
+                if item is None and pending:
+                    item = pending.popleft()
+                if item is None:
+                    break
+                in_flight[executor.submit(process_one_ticker, item[0], cache, limiter, previous)] = item
+                
+            if not in_flight:
+                # Only backoffs left: wait for the next one to expire
+                time.sleep(retry_queue.next_ready_in() or 0)
+                continue
+                
+            done, _ = concurrent.futures.wait(
+                in_flight, timeout=retry_queue.next_ready_in(),
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            
+            for future in done:
+                ticker, attempt = in_flight.pop(future)
+                try:
+                    result, error = future.result()
+                except Exception as e:
+                    reason = str(e)
+                    if attempt < settings.INGESTION_MAX_RETRIES:
+                        if retry_queue.push(ticker, attempt + 1, rate_limiter.backoff_delay(attempt)):
+                            retries += 1
+                            continue
+                        reason = f"retry queue full: {reason}"
+                    print(f"Error fetching {ticker} after {attempt + 1} attempt(s): {reason}")
+                    failures[ticker] = reason
+                    result, error = None, reason
+                    
+                progress_bar.update(1)
                 if result:
                     batch_data.append(result)
-            except Exception as e:
-                # Log error but don't stop
-                pass
+                elif journal is not None:
+                    status = checkpoint.STATUS_ERROR if error else checkpoint.STATUS_NO_DATA
+                    journal.record(ticker, status, error, run_date=run_date)
             
-            # D. Batch Save (Thread-safe because we are in the main thread consuming results)
-            if len(batch_data) >= BATCH_SIZE:
-                save_batch(batch_data, output_path)
-                batch_data = [] # Clear buffer
+                # D. Batch Save (Thread-safe because we are in the main thread consuming results)
+                if len(batch_data) >= BATCH_SIZE:
+                    _add_counts(refreshed, flush_batch(batch_data, store, run_date, journal))
+                    batch_data = [] # Clear buffer
+    progress_bar.close()
 
     # Save remaining
     if batch_data:
-        save_batch(batch_data, output_path)
+        _add_counts(refreshed, flush_batch(batch_data, store, run_date, journal))
         
-    print("Pipeline completed.")
+    print(f"Ticker retries: {retries} | Failed after retries: {len(failures)}")
+    print(format_refresh_counts(refreshed))
+    return failures
 
-def save_batch(new_data, path):
+def run_async(tickers_to_process, store, provider=None, cache=None, limiter=None, run_date=None,
+              journal=None, previous=None):
     """
-    Appends a batch of data to the CSV file.
-    Reads existing headers if file exists to ensure column order.
+    Async mode: payloads are fetched concurrently under global/per-endpoint budgets
+    and every completed ticker streams straight into processing + metrics.
+    Processing, metrics and batch writes run on one worker thread (in arrival order),
+    so the event loop keeps the other fetches going while a batch is written.
+    
+    Returns:
+        IngestionStats for the run (throughput report is printed at the end).
     """
-    if not new_data:
-        return
+    batch_data = []
+    BATCH_SIZE = 10
+    stats = async_ingestion.IngestionStats()
+    refreshed = {}
+    
+    print(f"Starting async ingestion (max {settings.INGESTION_MAX_CONCURRENCY} concurrent calls)...")
+    progress_bar = tqdm(total=len(tickers_to_process), desc="Processing Stocks", unit="ticker")
+    
+    processing = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    
+    def handle(ticker, raw_data):
+        nonlocal batch_data
+        progress_bar.update(1)
+        result = None
+        # Fetch failures were recorded in stats before the callback
+        error = stats.failures.get(ticker)
+        try:
+            result = build_feature_row(ticker, raw_data, previous, cache)
+            if result:
+                batch_data.append(result)
+        except Exception as e:
+            print(f"Error processing {ticker}: {e}")
+            error = f"processing: {e}"
+        if not result and journal is not None:
+            status = checkpoint.STATUS_ERROR if error else checkpoint.STATUS_NO_DATA
+            journal.record(ticker, status, error, run_date=run_date)
+            
+        # D. Batch Save (handle runs on the single processing thread, one ticker at a time)
+        if len(batch_data) >= BATCH_SIZE:
+            _add_counts(refreshed, flush_batch(batch_data, store, run_date, journal))
+            batch_data = []
+    
+    async def on_result(ticker, raw_data):
+        # Only this ingestion worker waits for the processing thread
+        await asyncio.get_running_loop().run_in_executor(processing, handle, ticker, raw_data)
+    
+    try:
+        async_ingestion.run_ingestion(
+            tickers_to_process, on_result=on_result, provider=provider, cache=cache, limiter=limiter,
+            stats=stats
+        )
+    finally:
+        processing.shutdown(wait=True)
+    progress_bar.close()
+    
+    # Save remaining
+    if batch_data:
+        _add_counts(refreshed, flush_batch(batch_data, store, run_date, journal))
+        
+    print(stats.format_report())
+    print(format_refresh_counts(refreshed))
+    return stats
+
+def process_chunk(items, previous_rows=None):
+    """
+    CPU stage of run_staged (runs in a worker process): processing, fingerprints and
+    metrics for a chunk of fetched tickers.
+    
+    Args:
+        items (list): (ticker, raw_data, hashes) tuples, hashes from incremental.cached_hashes.
+        previous_rows (dict): previous run's rows for these tickers (incremental mode).
+        
+    Returns:
+        (list, HistoryBlock, list, float): rows with metrics, their histories,
+        (ticker, processing error or None for no data) for tickers without a row,
+        and the seconds spent.
+    """
+    start = time.perf_counter()
+    processed, missing = [], []
+    for ticker, raw_data, hashes in items:
+        try:
+            row = incremental.build_row(ticker, raw_data, previous_rows, hashes=hashes)
+        except Exception as e:
+            print(f"Error processing {ticker}: {e}")
+            missing.append((ticker, f"processing: {e}"))
+            continue
+        if row:
+            processed.append(row)
+        else:
+            missing.append((ticker, None))
+    block = history_block.HistoryBlock.from_rows(processed)
+    rows = add_metrics(processed, block) if processed else []
+    return rows, block, missing, time.perf_counter() - start
+
+def make_cpu_executor(workers=None):
+    """Process pool for the CPU stage ("spawn": workers never inherit the I/O thread's locks)."""
+    workers = workers or settings.PIPELINE_CPU_WORKERS or os.cpu_count() or 1
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+def run_staged(tickers_to_process, store, provider=None, cache=None, limiter=None, run_date=None,
+               journal=None, previous=None, executor=None, queue_size=None, chunk_size=None):
+    """
+    Staged mode: I/O and CPU work run side by side instead of taking turns.
+    
+    - io:    async ingestion on a background thread; every fetched ticker is put on a
+             bounded queue, so fetching waits (backpressure) when processing falls behind.
+             The put runs off the event loop: only the worker holding the ticker waits,
+             in-flight fetches and rate-limiter timers keep going.
+    - cpu:   chunks of fetched tickers are parsed + scored in a process pool, with at most
+             PIPELINE_MAX_INFLIGHT_CHUNKS per worker submitted at once.
+    - write: finished chunks are appended to the feature store and checkpointed here.
+    
+    Memory stays flat: at most queue_size raw payloads plus the in-flight chunks are held.
+    
+    Args:
+        executor (concurrent.futures.Executor): CPU stage pool (default: make_cpu_executor()).
+        queue_size (int): raw payload queue bound (default: settings.PIPELINE_QUEUE_SIZE).
+        chunk_size (int): tickers per CPU task (default: settings.PIPELINE_CHUNK_SIZE).
         
-    df_batch = pd.DataFrame(new_data)
-    
-    # Standardize columns order based on existing file or settings
-    # If file exists, align columns
-    if os.path.exists(path):
-        # We append mode='a', no header
-        # Need to ensure columns match the existing file's order
-        existing_header = pd.read_csv(path, nrows=0).columns.tolist()
+    Returns:
+        (IngestionStats, PipelineStats): fetch throughput and per-stage utilization.
+    """
+    queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+    chunk_size = chunk_size or settings.PIPELINE_CHUNK_SIZE
+    own_executor = executor is None
+    if own_executor:
+        executor = make_cpu_executor()
+    cpu_workers = getattr(executor, "_max_workers", 1)
+    max_in_flight = settings.PIPELINE_MAX_INFLIGHT_CHUNKS * cpu_workers
+    
+    stats = async_ingestion.IngestionStats()
+    pipeline_stats = stages.PipelineStats(workers={"cpu": cpu_workers})
+    pipeline_stats.queue_size = queue_size
+    raw_queue = queue.Queue(maxsize=queue_size)
+    done_marker = object()
+    stop = threading.Event()  # Set when the consumer stops early (error, Ctrl-C)
+    waiting = {"puts": 0, "since": 0.0}  # hand-overs blocked on the full queue (loop thread only)
+    ingest_errors = []
+    refreshed = {}
+    
+    print(f"Starting staged pipeline (max {settings.INGESTION_MAX_CONCURRENCY} concurrent calls, "
+          f"{cpu_workers} CPU workers, queue {queue_size})...")
+    progress_bar = tqdm(total=len(tickers_to_process), desc="Processing Stocks", unit="ticker")
+    
+    async def on_result(ticker, raw_data):
+        if stop.is_set():
+            return
+        # Cache lookups stay in this process; workers only get the hashes
+        hashes = incremental.cached_hashes(ticker, cache) if raw_data else None
+        # A blocking put on a helper thread: this worker waits, the event loop doesn't.
+        # Blocked time is wall time with at least one put waiting (workers overlap).
+        if not waiting["puts"]:
+            waiting["since"] = time.perf_counter()
+        waiting["puts"] += 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, raw_queue.put, (ticker, raw_data, hashes))
+        finally:
+            waiting["puts"] -= 1
+            if not waiting["puts"]:
+                pipeline_stats.stage("io").add_blocked(time.perf_counter() - waiting["since"])
         
-        # Add missing cols to batch with NaN
-        for col in existing_header:
-            if col not in df_batch.columns:
-                df_batch[col] = pd.NA
+    def ingest():
+        try:
+            async_ingestion.run_ingestion(
+                tickers_to_process, on_result=on_result, provider=provider, cache=cache,
+                limiter=limiter, stats=stats, stop=stop
+            )
+        except Exception as e:
+            ingest_errors.append(e)
+        finally:
+            raw_queue.put(done_marker)
+            
+    def record_missing(missing):
+        if journal is None or not missing:
+            return
+        records = []
+        for ticker, error in missing:
+            # Fetch failures were recorded in stats before the callback
+            error = error or stats.failures.get(ticker)
+            status = checkpoint.STATUS_ERROR if error else checkpoint.STATUS_NO_DATA
+            records.append((ticker, status, error))
+        journal.record_many(records, run_date=run_date)
+        
+    def write(future):
+        rows, block, missing, busy = future.result()
+        pipeline_stats.stage("cpu").add_busy(busy, items=len(rows) + len(missing))
+        start = time.perf_counter()
+        record_missing(missing)
+        if rows:
+            _add_counts(refreshed, write_rows(rows, store, block, run_date, journal))
+        pipeline_stats.stage("write").add_busy(time.perf_counter() - start, items=len(rows))
+        progress_bar.update(len(rows) + len(missing))
+        
+    def submit(chunk):
+        prev = None
+        if previous is not None:
+            prev = {t: previous.get(t) for t, _, _ in chunk if previous.get(t) is not None}
+        return executor.submit(process_chunk, chunk, prev)
+    
+    pipeline_stats.start()
+    producer = threading.Thread(target=ingest, name="staged-io", daemon=True)
+    producer.start()
+    
+    chunk = []
+    in_flight = set()
+    ingest_done = False
+    try:
+        while not ingest_done or chunk or in_flight:
+            # Bound the CPU stage: wait for a chunk to finish before taking more input
+            if len(in_flight) >= max_in_flight or (ingest_done and not chunk):
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    write(future)
+                continue
+                
+            idle = False
+            if not ingest_done:
+                try:
+                    item = raw_queue.get(timeout=0.1)
+                except queue.Empty:
+                    item, idle = None, True
+                pipeline_stats.sample_queue(raw_queue.qsize())
+                if item is done_marker:
+                    ingest_done = True
+                elif item is not None:
+                    if item[1]:
+                        chunk.append(item)
+                    else:
+                        # No data or fetch failed: nothing for the CPU stage to do
+                        record_missing([(item[0], None)])
+                        progress_bar.update(1)
+                        
+            # Partial chunks go out when input stalls, so workers don't sit idle
+            if chunk and (len(chunk) >= chunk_size or ingest_done or idle):
+                in_flight.add(submit(chunk))
+                chunk = []
                 
-        # Reorder batch to match existing
-        df_batch = df_batch[existing_header]
+            finished = [f for f in in_flight if f.done()]
+            for future in finished:
+                in_flight.discard(future)
+                write(future)
+    finally:
+        progress_bar.close()
+        # Stopped early: the I/O thread takes no new tickers; drain only until the
+        # tickers in flight are handed over and it exits
+        stop.set()
+        while producer.is_alive():
+            try:
+                raw_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+        if own_executor:
+            executor.shutdown()
+        pipeline_stats.stop()
+        
+    if ingest_errors:
+        raise ingest_errors[0]
         
-        df_batch.to_csv(path, mode='a', header=False, index=False)
-    else:
-        # New file
-        # Put ticker first
-        cols = ['ticker'] + [c for c in df_batch.columns if c != 'ticker']
-        df_batch = df_batch[cols]
-        df_batch.to_csv(path, mode='w', header=True, index=False)
+    io = pipeline_stats.stage("io")
+    io.add_busy(max(stats.elapsed - io.blocked_sec, 0.0), items=stats.tickers_done)
+    
+    print(stats.format_report())
+    print(pipeline_stats.format_report())
+    print(format_refresh_counts(refreshed))
+    return stats, pipeline_stats
 
 if __name__ == "__main__":
     run()
@@ -1,134 +1,186 @@
 
 import pandas as pd
 import os
-import glob
 import sys
 
 # Add project root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.monitoring import churn, alerts
-from src.llm_reasoning import generate_explanations
+from src.monitoring import churn, alerts, rank_diff
+from src.monitoring import rules as alert_rules
+from src.llm_reasoning import generate_explanations, explanation_cache, explanation_worker, explanation_stream
+from src.storage import snapshot_store
 from config import settings
 import json
 
-def get_latest_two_snapshots(report_dir):
+def get_latest_two_snapshots(store, columns=None):
     """
-    Finds the two most recent CSV files in report_dir.
-    Returns (latest_file, previous_file).
+    Reads the two most recent ranked snapshots from the snapshot store (one indexed read).
+    Returns ((latest_date, latest_df), (previous_date, previous_df)); either can be None.
     """
-    files = glob.glob(os.path.join(report_dir, 'top_50_*.csv'))
-    # Sort by filename (Date string YYYY-MM-DD handles alphabetic sort correctly)
-    files.sort(reverse=True)
-    
-    if len(files) < 2:
-        return files[0] if files else None, None
-    return files[0], files[1]
+    snapshots = store.latest(2, columns=columns)
+    latest = snapshots[0] if snapshots else None
+    previous = snapshots[1] if len(snapshots) > 1 else None
+    return latest, previous
 
-def generate_daily_brief():
+def generate_daily_brief(top_n=50, start_worker=False):
     """
     Compares the latest two snapshots and generates a Churn/Trend report.
+    
+    Args:
+        top_n (int): size of the list the brief tracks (None = full universe).
+        start_worker (bool): spawn a background worker for the queued explanations
+            (entry points pass settings.LLM_WORKER_AUTOSTART).
     """
     history_dir = os.path.join(settings.DATA_DIR, 'reports', 'history')
-    latest_file, prev_file = get_latest_two_snapshots(history_dir)
+    store = snapshot_store.SnapshotStore()
+    if not store.dates():
+        # One-time migration of the legacy top_50_*.csv history
+        imported = store.import_csv_history(history_dir)
+        if imported:
+            print(f"Imported {imported} CSV snapshots into {store.root}")
+    latest, previous = get_latest_two_snapshots(store)
     
-    if not latest_file:
-        print("No history files found.")
+    if not latest:
+        print("No history snapshots found.")
         return
         
-    print(f"Comparing Latest ({os.path.basename(latest_file)}) vs Previous ({os.path.basename(prev_file) if prev_file else 'None'})")
-    
-    df_curr = pd.read_csv(latest_file)
-    curr_tickers = set(df_curr['ticker'])
+    latest_date, df_curr = latest
+    print(f"Comparing Latest ({latest_date}) vs Previous ({previous[0] if previous else 'None'})")
     
     report_lines = []
     report_lines.append("# Daily NFM Model Brief")
-    report_lines.append(f"Date: {os.path.basename(latest_file).replace('top_50_', '').replace('.csv', '')}\n")
+    report_lines.append(f"Date: {latest_date}\n")
 
     # --- INTEGRATION: Generate Explanations ---
     print(">>> Generating AI Explanations for the latest snapshot...")
     prompt_path = os.path.join(settings.BASE_DIR, 'src', 'llm_reasoning', 'prompt_template.txt')
     output_path = os.path.join(settings.DATA_DIR, 'reports', 'llm_explanations.json')
+    # The explanation prompts need every metric column, which only the CSV snapshot has
+    latest_file = os.path.join(history_dir, f'top_50_{latest_date}.csv')
+    if not os.path.exists(latest_file):
+        latest_file = os.path.join(settings.DATA_DIR, 'reports', 'top_50.csv')
     
+    # Companies whose prompt (metrics, alerts) is unchanged reuse the cached explanation
+    cache = explanation_cache.ExplanationCache() if settings.LLM_CACHE_ENABLED else None
+    llm_stats = None
+    queued = None
     try:
-        generate_explanations.generate_explanations(latest_file, prompt_path, output_path)
+        if settings.LLM_ASYNC_EXPLANATIONS:
+            # Cache misses go to the background job queue; the brief doesn't wait for the LLM
+            queued = explanation_worker.prepare_explanations(latest_file, prompt_path, output_path,
+                                                             latest_date, cache=cache)
+        else:
+            llm_stats = generate_explanations.generate_explanations(latest_file, prompt_path, output_path, cache=cache)
     except Exception as e:
         print(f"Warning: AI Explanation Generation Failed: {e}")
+    pending = queued['pending'] if queued else set()
     
-    # Load Explanations for Lookup
-    explanations_map = {}
-    if os.path.exists(output_path):
-        try:
-            with open(output_path, 'r') as f:
-                data = json.load(f)
-                for item in data:
-                    explanations_map[item['ticker']] = item.get('explanation', '')
-        except Exception as e:
-            print(f"Warning: Could not load explanations: {e}")
+    # Verdicts were parsed when the explanations were streamed; the stream's index
+    # maps ticker -> verdict in memory
+    stream = explanation_stream.ExplanationStream(explanation_stream.stream_path(output_path))
 
-    # Helper to extract Verdict
+    # Helper to render a Verdict line (the worker patches pending ones in place)
     def get_verdict(ticker):
-        text = explanations_map.get(ticker, "")
-        if "4. Overall Verdict" in text:
-            return text.split("4. Overall Verdict")[1].strip().split('\n')[0]
-        return "No AI verdict available."
+        if ticker in pending:
+            verdict = explanation_worker.PENDING_VERDICT
+        else:
+            verdict = stream.verdict(ticker) or explanation_worker.NO_VERDICT
+        return explanation_worker.verdict_line(ticker, verdict)
     
-    if prev_file:
-        df_prev = pd.read_csv(prev_file)
-        prev_tickers = set(df_prev['ticker'])
+    if previous:
+        diff = rank_diff.diff_ranks(df_curr, previous[1], top_n=top_n, date=latest_date, previous_date=previous[0])
+        list_name = f"Top {top_n}" if top_n else "Universe"
         
-        # 1. Churn Analysis
-        new_entrants = curr_tickers - prev_tickers
-        dropped_tickers = prev_tickers - curr_tickers
+        # Alerts for the current list, every rule in one pass over the joined snapshots
+        listed = df_curr if top_n is None else df_curr[df_curr['rank'] <= top_n]
+        rule_set = alert_rules.default_rules()
+        rule_set.reset_stats()
+        alert_table = alerts.evaluate_alerts_frame(listed, previous[1], rules=rule_set)
+        rule_stats = rule_set.stats()
+        print(f"Evaluated {len(rule_stats)} alert rules over {len(listed)} companies in "
+              f"{rule_stats['total_ms'].sum():.1f} ms ({len(alert_table)} alerts)")
+        if rule_set.skipped():
+            print(f"Warning: alert rules skipped, metric missing from the snapshot: {', '.join(rule_set.skipped())}")
+        alerts_by_ticker = {t: group[['type', 'severity', 'message']].astype(str).to_dict('records')
+                            for t, group in alert_table.groupby('ticker', sort=False)}
         
-        if new_entrants:
-            report_lines.append("## 🟢 New Entrants (Added to Top 50)")
-            for t in new_entrants:
-                row = df_curr[df_curr['ticker'] == t].iloc[0]
-                rank = list(df_curr['ticker']).index(t) + 1
-                decision = churn.decide_churn(rank, []) # No alerts for new entry usually
-                verdict = get_verdict(t)
+        # 1. Churn Analysis
+        if len(diff.entrants):
+            report_lines.append(f"## 🟢 New Entrants (Added to {list_name})")
+            for t, rank in zip(diff.entrants['ticker'], diff.entrants['rank'].astype(int)):
+                decision = churn.decide_churn(rank, alerts_by_ticker.get(t, []))
                 report_lines.append(f"- **{t}** (Rank #{rank}): {decision['reason']}")
-                report_lines.append(f"  > *AI Verdict*: {verdict}")
+                report_lines.append(get_verdict(t))
             report_lines.append("")
                 
-        if dropped_tickers:
-            report_lines.append("## 🔴 Dropped Companies (Exited Top 50)")
-            for t in dropped_tickers:
-                try:
-                    row = df_prev[df_prev['ticker'] == t].iloc[0]
-                    prev_rank = list(df_prev['ticker']).index(t) + 1
-                except IndexError:
-                    row = {}
-                    prev_rank = "N/A"
-                    
-                report_lines.append(f"- **{t}** (Prev Rank #{prev_rank})")
+        if len(diff.exits):
+            report_lines.append(f"## 🔴 Dropped Companies (Exited {list_name})")
+            for t, prev_rank, rank in zip(diff.exits['ticker'], diff.exits['prev_rank'].astype(int), diff.exits['rank']):
+                now = f", now #{int(rank)}" if pd.notna(rank) else ""
+                report_lines.append(f"- **{t}** (Prev Rank #{prev_rank}{now})")
             report_lines.append("")
             
-        # 2. Rank Movers (within Top 50)
-        common = curr_tickers.intersection(prev_tickers)
-        movers = []
-        for t in common:
-            rank_curr = list(df_curr['ticker']).index(t) + 1
-            rank_prev = list(df_prev['ticker']).index(t) + 1
-            diff = rank_prev - rank_curr # Positive means improved rank (e.g. 10 -> 5 = +5)
-            if abs(diff) >= 3: # Only noticeable moves
-                movers.append((t, diff, rank_curr))
-        
-        movers.sort(key=lambda x: x[1], reverse=True) # Biggest climbers first
-        
-        if movers:
+        # 2. Rank Movers (within the list, moves of 3+ positions; biggest climbers first)
+        if len(diff.movers):
             report_lines.append("## 🚀 Significant Rank Movers")
-            for t, diff, r in movers:
-                icon = "🔼" if diff > 0 else "🔻"
-                verdict = get_verdict(t)
-                report_lines.append(f"- {icon} **{t}**: {diff:+} positions (Now #{r})")
-                report_lines.append(f"  > *AI Verdict*: {verdict}")
+            for t, change, r in zip(diff.movers['ticker'], diff.movers['change'], diff.movers['rank'].astype(int)):
+                icon = "🔼" if change > 0 else "🔻"
+                report_lines.append(f"- {icon} **{t}**: {change:+} positions (Now #{r})")
+                report_lines.append(get_verdict(t))
             report_lines.append("")
 
+        # 3. Alerts (highest severity first)
+        if len(alert_table):
+            report_lines.append("## ⚠️ Alerts")
+            for t, severity, message in zip(alert_table['ticker'], alert_table['severity'].astype(str), alert_table['message']):
+                report_lines.append(f"- **{t}** [{severity}]: {message}")
+            report_lines.append("")
+        alert_table.to_csv(os.path.join(settings.DATA_DIR, 'reports', 'alerts.csv'), index=False)
+
+        # 4. Portfolio churn: hysteresis bands + minimum holding period, replayed over the history
+        replay = churn.replay_churn(store)
+        today = replay["latest"]
+        trades = today[today['action'].isin(['ADD', 'REMOVE'])]
+        report_lines.append(f"## 🔁 Portfolio Churn (enter ≤{settings.CHURN_ENTRY_RANK}, exit >{settings.CHURN_EXIT_RANK})")
+        if len(trades):
+            for t, action, rank, reason in zip(trades['ticker'], trades['action'], trades['rank'], trades['reason']):
+                rank_text = f"#{rank}" if rank else "unranked"
+                report_lines.append(f"- {action} **{t}** ({rank_text}): {reason}")
+        else:
+            report_lines.append("- No trades today.")
+        report_lines.append(f"Holdings: {int((today['action'] != 'REMOVE').sum())} | "
+                            f"Avg turnover: {replay['summary']['avg_turnover']:.1%} per snapshot")
+        report_lines.append("")
+        today.to_csv(os.path.join(settings.DATA_DIR, 'reports', 'churn_decisions.csv'), index=False)
+
+        # Structured diff for the dashboard
+        diff_path = os.path.join(settings.DATA_DIR, 'reports', 'rank_diff.json')
+        with open(diff_path, 'w') as f:
+            json.dump(diff.to_dict(), f, indent=2)
+
     else:
         report_lines.append("First run. No previous history to compare.")
+        report_lines.append("")
+
+    # 5. LLM stage: cache reuse, and either the calls that were made or the queued jobs
+    # (queued['depth'] is None when no LLM is configured and placeholders were written)
+    if llm_stats is not None or (queued is not None and queued['depth'] is not None):
+        r = llm_stats.report() if llm_stats is not None else queued
+        lookups = r['cache_hits'] + r['cache_misses']
+        report_lines.append("## 🤖 AI Explanations")
+        if lookups:
+            report_lines.append(f"- Cache: {r['cache_hits']}/{lookups} reused ({r['cache_hits'] / lookups:.0%} hit rate)")
+        if llm_stats is not None:
+            report_lines.append(f"- LLM calls: {r['requests']} (ok={r['ok']}, failed={r['failed']}) in {r['elapsed_sec']:.1f}s")
+        else:
+            depth = queued['depth']
+            report_lines.append(f"- Background jobs: {len(pending)} queued | Queue depth: "
+                                f"pending={depth['pending']}, running={depth['running']}, failed={depth['failed']}")
+        report_lines.append("")
         
+    stream.close()
+
     # Output
     report_text = "\n".join(report_lines)
     print(report_text)
@@ -139,5 +191,10 @@ def generate_daily_brief():
         f.write(report_text)
     print(f"\nBrief saved to {brief_path}")
 
+    # Published with pending verdicts; the worker patches the brief and the JSON as results arrive
+    if pending and start_worker:
+        pid = explanation_worker.start_background_worker()
+        print(f"Started background explanation worker (pid {pid}) for {len(pending)} queued companies")
+
 if __name__ == "__main__":
-    generate_daily_brief()
+    generate_daily_brief(start_worker=settings.LLM_WORKER_AUTOSTART)
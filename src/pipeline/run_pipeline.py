@@ -8,6 +8,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from src.pipeline import run_data_pipeline
 from src.pipeline import run_scoring
 from src.pipeline import run_monitoring
+from config import settings
 
 def main():
     print("==========================================")
@@ -39,7 +40,7 @@ def main():
     # Step 3: Monitoring
     print(">>> STEP 3: MONITORING & REPORTING")
     try:
-        run_monitoring.generate_daily_brief()
+        run_monitoring.generate_daily_brief(start_worker=settings.LLM_WORKER_AUTOSTART)
     except Exception as e:
         print(f"!!! CRITICAL FAILURE IN STEP 3: {e}")
         sys.exit(1)
@@ -9,20 +9,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from config import settings
 from src.scoring import scorer
 from src.llm_reasoning import prompts
+from src.storage import feature_store, snapshot_store
 
 def run():
     print("Starting Scoring Pipeline...")
     
-    # 1. Load Data
-    input_path = settings.PROCESSED_DATA_PATH
-    if not os.path.exists(input_path):
-        print(f"Error: Processed data not found at {input_path}")
-        return
-        
-    df = pd.read_csv(input_path)
+    # 1. Load Data (latest run in the feature store; scalar columns only, no histories)
+    df = feature_store.load_features()
     print(f"Loaded {len(df)} companies.")
     
     if df.empty:
+        print(f"Error: No processed data in {settings.FEATURE_STORE_DIR}")
         return
 
     # 2. Score
@@ -36,7 +33,8 @@ def run():
         return
         
     print("Top 5 Scored Companies:")
-    print(top_50[['ticker', 'final_score', 'roe', 'revenue_cagr']].head())
+    summary_cols = [c for c in ['ticker', 'final_score', 'roe', 'revenue_cagr'] if c in top_50.columns]
+    print(top_50[summary_cols].head())
     
     # 4. Generate Prompts (Sample for top 5)
     print("\nGenerating Prompts for Top 5...")
@@ -60,6 +58,7 @@ def run():
     
     # Save Full Scored List (All Companies)
     full_output_path = os.path.join(settings.DATA_DIR, 'reports', 'all_companies_scores.csv')
+    os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
     cols_to_save_full = [c for c in scored_df.columns if c != 'llm_prompt']
     scored_df[cols_to_save_full].to_csv(full_output_path, index=False)
     print(f"Full scored list saved to {full_output_path} ({len(scored_df)} companies)")
@@ -77,8 +76,11 @@ def run():
     os.makedirs(os.path.dirname(history_path), exist_ok=True)
     top_50[cols_to_save].to_csv(history_path, index=False)
     
+    # Ranked universe for monitoring (run_monitoring reads the store, not the CSVs)
+    snapshot_store.SnapshotStore().append(today_str, scored_df)
+    
     print(f"Top 50 list saved to {output_path}")
-    print(f"History snapshot saved to {history_path}")
+    print(f"History snapshot saved to {history_path} and {settings.SNAPSHOT_STORE_DIR}")
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,117 @@
+"""
+Per-stage utilization stats for the staged data pipeline.
+
+The staged pipeline (run_data_pipeline.run_staged) splits a run into three stages
+connected by bounded buffers:
+
+    io     -> async fetching (event loop thread), pushes raw payloads into a bounded queue
+    cpu    -> parsing + metrics in a process pool, a few chunks in flight at most
+    write  -> feature store appends + checkpoint journal (main thread)
+
+Each stage reports busy time relative to the wall time it had available
+(utilization = busy / (wall * workers)). The io stage also reports how long it was
+blocked on a full queue: that is backpressure from the cpu stage, and the stage with
+the highest utilization is the bottleneck.
+"""
+import threading
+import time
+
+
+class StageStats:
+    """Busy / blocked time and item count for one stage."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy_sec = 0.0
+        self.blocked_sec = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add_busy(self, seconds, items=1):
+        with self._lock:
+            self.busy_sec += seconds
+            self.items += items
+
+    def add_blocked(self, seconds):
+        with self._lock:
+            self.blocked_sec += seconds
+
+
+class PipelineStats:
+    """Stage stats plus queue depth samples for one staged run."""
+
+    def __init__(self, workers=None):
+        workers = workers or {}
+        self.stages = {name: StageStats(name, workers.get(name, 1)) for name in ("io", "cpu", "write")}
+        self.queue_depths = []
+        self.queue_size = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    def stage(self, name):
+        return self.stages[name]
+
+    def sample_queue(self, depth):
+        self.queue_depths.append(depth)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def utilization(self, name):
+        stage = self.stages[name]
+        capacity = self.elapsed * stage.workers
+        return min(stage.busy_sec / capacity, 1.0) if capacity > 0 else 0.0
+
+    def bottleneck(self):
+        """Name of the stage with the highest utilization."""
+        return max(self.stages, key=self.utilization)
+
+    def report(self):
+        """
+        Returns a dict with per-stage busy/blocked seconds, utilization, and queue depth
+        (max and mean of the samples taken by the cpu stage).
+        """
+        depths = self.queue_depths
+        return {
+            "elapsed_sec": self.elapsed,
+            "bottleneck": self.bottleneck(),
+            "queue_size": self.queue_size,
+            "queue_max": max(depths) if depths else 0,
+            "queue_mean": sum(depths) / len(depths) if depths else 0.0,
+            "stages": {
+                name: {
+                    "workers": stage.workers,
+                    "items": stage.items,
+                    "busy_sec": stage.busy_sec,
+                    "blocked_sec": stage.blocked_sec,
+                    "utilization": self.utilization(name)
+                }
+                for name, stage in self.stages.items()
+            }
+        }
+
+    def format_report(self):
+        """Human readable stage report (printed at the end of a staged run)."""
+        r = self.report()
+        lines = [
+            "--- Pipeline Stage Report ---",
+            f"Elapsed: {r['elapsed_sec']:.1f}s | Bottleneck: {r['bottleneck']}",
+            f"Raw queue depth: max={r['queue_max']}/{r['queue_size']} mean={r['queue_mean']:.1f}",
+        ]
+        for name, s in r["stages"].items():
+            lines.append(
+                f"  {name:<6} workers={s['workers']:<3} items={s['items']:<6} busy={s['busy_sec']:.1f}s "
+                f"blocked={s['blocked_sec']:.1f}s utilization={s['utilization']:.0%}"
+            )
+        return "\n".join(lines)
@@ -7,14 +7,22 @@ This dashboard provides an interactive interface to explore:
 - Company scores and metrics
 - Alert monitoring
 - Churn analysis
+- AI explanations (verdict and sections, parsed once when they were generated)
 """
 
 import streamlit as st
 import pandas as pd
 import os
+import sys
 from pathlib import Path
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.monitoring import alerts
+from src.llm_reasoning import explanation_stream
+from src.storage import snapshot_store
 
 
 # ============================================================================
@@ -42,7 +50,7 @@ def load_top_50_data():
         df = pd.read_csv(data_path)
         
         # Process data for display
-        df_display = process_top_50_data(df)
+        df_display = process_top_50_data(df, load_previous_snapshot())
         
         return df_display
     
@@ -51,12 +59,55 @@ def load_top_50_data():
         return pd.DataFrame()
 
 
-def process_top_50_data(df):
+def load_previous_snapshot():
+    """
+    Load the previous scoring run from the snapshot store, for the change rules
+    (score drop, debt spike, cash flow collapse) the daily brief also evaluates.
+    
+    Returns:
+        pd.DataFrame: previous snapshot; None before the second run
+    """
+    snapshots = snapshot_store.SnapshotStore().latest(2)
+    return snapshots[1][1] if len(snapshots) > 1 else None
+
+
+def load_ai_explanations():
+    """
+    Load the structured AI explanations from the explanation stream.
+    
+    The background worker keeps appending verdicts after the brief is published, so
+    the cache is keyed on the stream file's modification time and size: a rerun after
+    the file changed reloads it.
+    
+    Returns:
+        dict: ticker -> sections (summary, strengths, risks, verdict); empty if none
+    """
+    base_path = Path(__file__).parent.parent.parent
+    stream_file = base_path / "data" / "reports" / "llm_explanations.ndjson"
+    
+    if not stream_file.exists():
+        return {}
+    
+    stat = stream_file.stat()
+    return _load_ai_explanations(str(stream_file), stat.st_mtime, stat.st_size)
+
+
+@st.cache_data
+def _load_ai_explanations(stream_file, mtime, size):
+    # mtime and size are only part of the cache key
+    stream = explanation_stream.ExplanationStream(stream_file)
+    table = {ticker: stream.sections(ticker) for ticker in stream.tickers}
+    stream.close()
+    return {ticker: sections for ticker, sections in table.items() if sections}
+
+
+def process_top_50_data(df, prev_df=None):
     """
     Process raw Top-50 data into display format.
     
     Args:
         df: Raw dataframe from CSV
+        prev_df: Previous snapshot (optional), for the change rules in the alert count
         
     Returns:
         pd.DataFrame: Processed dataframe ready for display
@@ -76,9 +127,9 @@ def process_top_50_data(df):
     # Key strengths - derive from top scoring metrics
     display_df['Key Strengths'] = df.head(50).apply(identify_strengths, axis=1)
     
-    # Alert count - for now, simulate based on debt and score
-    # In production, this would come from actual alert evaluation
-    display_df['Alert Count'] = df.head(50).apply(calculate_alert_count, axis=1)
+    # Alert count - same rules as the alert log
+    counts = alerts.evaluate_alerts_frame(df.head(50), prev_df)['ticker'].value_counts()
+    display_df['Alert Count'] = df['ticker'].head(50).map(counts).fillna(0).astype(int).to_numpy()
     
     # Add alert status (Yes/No)
     display_df['Has Alerts'] = display_df['Alert Count'].apply(lambda x: '⚠️ Yes' if x > 0 else '✅ No')
@@ -119,142 +170,28 @@ def identify_strengths(row):
     return ', '.join(strengths[:3]) if strengths else 'Balanced Profile'
 
 
-def calculate_alert_count(row):
+def generate_alerts_from_data(df, prev_df=None):
     """
-    Calculate number of alerts for a company.
-    This is a simplified version - in production, use actual alert evaluation.
-    
-    Args:
-        row: DataFrame row with company metrics
-        
-    Returns:
-        int: Number of alerts
-    """
-    alert_count = 0
-    
-    # High debt alert
-    if row.get('debt_to_equity', 0) > 1.0:
-        alert_count += 1
-    
-    # Low score alert (if in top 50 but score is relatively low)
-    # Score is on 0-5 scale
-    if row.get('final_score', 5.0) < 3.0:
-        alert_count += 1
-    
-    # Negative FCF alert
-    if row.get('fcf_margin', 0) < 0:
-        alert_count += 1
-        
-    # Negative Growth alert
-    if row.get('revenue_cagr', 0) < 0:
-        alert_count += 1
-    
-    return alert_count
-
-
-def generate_alerts_from_data(df):
-    """
-    Generate alert log from Top 50 data.
-    This simulates what would come from Phase 3 alert monitoring.
+    Generate alert log from Top 50 data with the universe-wide alert engine
+    (src/monitoring/alerts.py), so the dashboard shows the same alerts as monitoring.
     
     Args:
         df: DataFrame with Top 50 data and raw metrics
+        prev_df: Previous snapshot (optional); enables the change rules (score drop, debt spike, CFO collapse)
         
     Returns:
         pd.DataFrame: Alert log with Company, Alert Type, Severity, Date, Message
     """
-    alerts_list = []
-    
-    # Get current date for alerts
-    current_date = datetime.now()
-    
-    for idx, row in df.iterrows():
-        company = row['ticker']
-        
-        # Alert 1: High Debt
-        debt_ratio = row.get('debt_to_equity', 0)
-        if debt_ratio > 1.0:
-            severity = 'HIGH' if debt_ratio > 2.0 else 'MEDIUM'
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'DEBT_SPIKE',
-                'Severity': severity,
-                'Date': (current_date - timedelta(days=random.randint(0, 7))).strftime('%Y-%m-%d'),
-                'Message': f'Debt/Equity ratio at {debt_ratio:.2f}'
-            })
-        
-        # Alert 2: Negative FCF
-        fcf_margin = row.get('fcf_margin', 0)
-        if fcf_margin < 0:
-            # Severity depends on how negative
-            severity = 'HIGH' if fcf_margin < -0.10 else 'MEDIUM'
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'NEGATIVE_FCF',
-                'Severity': severity,
-                'Date': (current_date - timedelta(days=random.randint(0, 5))).strftime('%Y-%m-%d'),
-                'Message': f'Free Cash Flow margin is negative ({fcf_margin:.1%})'
-            })
-        
-        # Alert 3: Low Score (relative to Top 50)
-        # Note: Scores are on 0-5 scale based on weighted percentile ranking
-        score = row.get('final_score', 5.0)
-        if score < 3.0:  # Below 3.0 on 0-5 scale indicates weakness
-            severity = 'HIGH' if score < 2.5 else 'MEDIUM'
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'SCORE_DROP',
-                'Severity': severity,
-                'Date': (current_date - timedelta(days=random.randint(0, 10))).strftime('%Y-%m-%d'),
-                'Message': f'Composite score below threshold ({score:.2f}/5.0)'
-            })
-        
-        # Alert 4: Low Profitability
-        roe = row.get('roe', 0)
-        if roe < 0.10 and roe > 0:  # Positive but low
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'LOW_PROFITABILITY',
-                'Severity': 'LOW',
-                'Date': (current_date - timedelta(days=random.randint(0, 14))).strftime('%Y-%m-%d'),
-                'Message': f'ROE below 10% ({roe:.1%})'
-            })
-        
-        # Alert 5: Negative Growth
-        revenue_cagr = row.get('revenue_cagr', 0)
-        if revenue_cagr < 0:
-            severity = 'HIGH' if revenue_cagr < -0.10 else 'MEDIUM'
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'NEGATIVE_GROWTH',
-                'Severity': severity,
-                'Date': (current_date - timedelta(days=random.randint(0, 7))).strftime('%Y-%m-%d'),
-                'Message': f'Revenue declining ({revenue_cagr:.1%} CAGR)'
-            })
-            
-        # Alert 6: Low Interest Coverage (New)
-        int_coverage = row.get('interest_coverage', 100)
-        if int_coverage < 3.0 and int_coverage > 0:  # Only alert if we have valid data
-            severity = 'HIGH' if int_coverage < 1.5 else 'MEDIUM'
-            alerts_list.append({
-                'Company': company,
-                'Alert Type': 'SOLVENCY_RISK',
-                'Severity': severity,
-                'Date': (current_date - timedelta(days=random.randint(0, 3))).strftime('%Y-%m-%d'),
-                'Message': f'Interest Coverage Ratio low ({int_coverage:.2f})'
-            })
-    
-    # Convert to DataFrame
-    if alerts_list:
-        alerts_df = pd.DataFrame(alerts_list)
-        # Sort by date (most recent first) and severity
-        severity_order = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
-        alerts_df['severity_rank'] = alerts_df['Severity'].map(severity_order)
-        alerts_df = alerts_df.sort_values(['severity_rank', 'Date'], ascending=[True, False])
-        alerts_df = alerts_df.drop('severity_rank', axis=1)
-        return alerts_df
-    else:
-        return pd.DataFrame(columns=['Company', 'Alert Type', 'Severity', 'Date', 'Message'])
+    table = alerts.evaluate_alerts_frame(df, prev_df)
+    
+    # Already sorted by severity (HIGH first)
+    return pd.DataFrame({
+        'Company': table['ticker'].to_numpy(),
+        'Alert Type': table['type'].astype(str).to_numpy(),
+        'Severity': table['severity'].astype(str).to_numpy(),
+        'Date': datetime.now().strftime('%Y-%m-%d'),
+        'Message': table['message'].to_numpy()
+    }, columns=['Company', 'Alert Type', 'Severity', 'Date', 'Message'])
 
 
 # ============================================================================
@@ -277,8 +214,14 @@ def display_top_50_table(df):
     # Create a copy for styling
     styled_df = df.copy()
     
+    # AI verdict - stored with the explanation, no text parsing here. Read on every
+    # rerun (not in the cached Top 50 load) so queued verdicts show up once written.
+    explanations = load_ai_explanations()
+    styled_df['AI Verdict'] = styled_df['Company'].map(
+        lambda ticker: explanations.get(ticker, {}).get('verdict') or '—')
+    
     # Prepare display columns
-    display_cols = ['Rank', 'Company', 'Score', 'Key Strengths', 'Has Alerts']
+    display_cols = ['Rank', 'Company', 'Score', 'Key Strengths', 'Has Alerts', 'AI Verdict']
     
     # Apply custom styling using Streamlit's dataframe with conditional formatting
     def highlight_alerts(row):
@@ -365,7 +308,7 @@ def display_company_details(company_ticker, top_50_df):
     st.markdown("---")
     
     # Create tabs for different sections
-    tab1, tab2, tab3 = st.tabs(["📈 Score Breakdown", "⚠️ Active Alerts", "🔄 Churn Status"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📈 Score Breakdown", "⚠️ Active Alerts", "🔄 Churn Status", "🤖 AI Analysis"])
     
     with tab1:
         st.markdown("### Composite Score Analysis")
@@ -438,7 +381,7 @@ def display_company_details(company_ticker, top_50_df):
         st.markdown("### Active Alerts for this Company")
         
         # Generate alerts for this specific company
-        company_alerts = generate_alerts_from_data(company_data)
+        company_alerts = generate_alerts_from_data(company_data, load_previous_snapshot())
         
         if company_alerts.empty:
             st.success("✅ No active alerts for this company!")
@@ -523,6 +466,32 @@ def display_company_details(company_ticker, top_50_df):
         else:
             st.warning(f"**Last Decision:** RETAIN (Under review)")
             st.caption("Decision Date: 2025-12-15 | Reason: Score above threshold but monitoring required")
+    
+    with tab4:
+        st.markdown("### AI Explanation")
+        
+        sections = load_ai_explanations().get(company_ticker)
+        if not sections:
+            st.info("No AI explanation available for this company yet.")
+        else:
+            if sections.get('verdict'):
+                st.success(f"**Overall Verdict:** {sections['verdict']}")
+            
+            if sections.get('summary'):
+                st.markdown("#### Business Strength Summary")
+                st.markdown(sections['summary'])
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown("#### Key Fundamental Strengths")
+                for item in sections.get('strengths') or []:
+                    st.markdown(f"- {item}")
+            
+            with col2:
+                st.markdown("#### Potential Risks to Monitor")
+                for item in sections.get('risks') or []:
+                    st.markdown(f"- {item}")
 
 
 def display_alerts_panel(alerts_df):
@@ -678,7 +647,7 @@ def main():
         
         if data_path.exists():
             raw_df = pd.read_csv(data_path)
-            alerts_df = generate_alerts_from_data(raw_df.head(50))
+            alerts_df = generate_alerts_from_data(raw_df.head(50), load_previous_snapshot())
         else:
             alerts_df = pd.DataFrame()
     
@@ -0,0 +1,118 @@
+"""
+Rank index: the scored universe kept in rank order, updatable in place.
+
+Intraday refreshes and what-if runs usually change the scores of a few tickers.
+Instead of re-sorting ~6,000 scores, the index keeps two sorted arrays (negated
+score, tie-break id) and moves only the changed tickers: binary search to find
+them, one delete and one insert (O(n) memory moves, no O(n log n) sort).
+
+Order is the same as scorer.get_top_n: higher score first, ties broken by the order
+tickers were first added, NaN scores last.
+"""
+import numpy as np
+import pandas as pd
+
+
+class RankIndex:
+    """Tickers ordered by score, best first."""
+
+    def __init__(self, tickers=(), scores=()):
+        self._id_of = {}
+        self._tickers = []   # id -> ticker
+        self._scores = []    # id -> score
+        self._keys = np.empty(0)
+        self._ids = np.empty(0, dtype=np.int64)
+        if len(tickers):
+            self.update(dict(zip(tickers, scores)))
+
+    @classmethod
+    def from_frame(cls, df, score_column='final_score'):
+        """Index over a scored frame (`ticker` + score columns)."""
+        return cls(df['ticker'].tolist(), df[score_column].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def _keys_for(self, ids):
+        # Ascending keys: negated score, NaN sorts after every real score
+        scores = np.array([self._scores[i] for i in ids], dtype=np.float64)
+        return np.where(np.isnan(scores), np.inf, -scores)
+
+    def _locate(self, keys, ids):
+        """Positions of (key, id) pairs in the sorted arrays (insertion points if absent)."""
+        lo = np.searchsorted(self._keys, keys, side='left')
+        hi = np.searchsorted(self._keys, keys, side='right')
+        positions = lo.astype(np.int64)
+        for i in np.flatnonzero(hi > lo):
+            # Within a run of equal scores, ids are sorted
+            positions[i] += np.searchsorted(self._ids[lo[i]:hi[i]], ids[i])
+        return positions
+
+    def _remove_ids(self, ids):
+        if not len(ids):
+            return
+        positions = self._locate(self._keys_for(ids), np.asarray(ids, dtype=np.int64))
+        self._keys = np.delete(self._keys, positions)
+        self._ids = np.delete(self._ids, positions)
+
+    def update(self, scores):
+        """
+        Sets new scores for some tickers (adds tickers not in the index yet).
+
+        Args:
+            scores (dict or pd.Series): ticker -> score.
+        """
+        if isinstance(scores, pd.Series):
+            scores = scores.to_dict()
+        if not scores:
+            return
+        # Take the changed tickers out, new tickers get the next tie-break id
+        self._remove_ids([self._id_of[t] for t in scores if t in self._id_of])
+        for ticker in scores:
+            if ticker not in self._id_of:
+                self._id_of[ticker] = len(self._tickers)
+                self._tickers.append(ticker)
+                self._scores.append(np.nan)
+
+        ids = np.array([self._id_of[t] for t in scores], dtype=np.int64)
+        for ticker, i in zip(scores, ids):
+            self._scores[i] = np.nan if scores[ticker] is None else float(scores[ticker])
+        keys = self._keys_for(ids)
+        order = np.lexsort((ids, keys))
+        keys, ids = keys[order], ids[order]
+        if not len(self._ids):
+            self._keys, self._ids = keys, ids
+            return
+        # Insertion points come from the arrays before the insert; np.insert keeps the
+        # given order for equal points, and the new entries are already sorted
+        positions = self._locate(keys, ids)
+        self._keys = np.insert(self._keys, positions, keys)
+        self._ids = np.insert(self._ids, positions, ids)
+
+    def remove(self, tickers):
+        """Drops tickers from the index (unknown tickers are ignored)."""
+        ids = [self._id_of[t] for t in tickers if t in self._id_of]
+        self._remove_ids(ids)
+        for i in ids:
+            del self._id_of[self._tickers[i]]
+            self._tickers[i] = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, ticker):
+        return ticker in self._id_of
+
+    def score(self, ticker):
+        return self._scores[self._id_of[ticker]]
+
+    def rank(self, ticker):
+        """1-based rank of a ticker."""
+        i = self._id_of[ticker]
+        return int(self._locate(self._keys_for([i]), np.array([i]))[0]) + 1
+
+    def top(self, n=50):
+        """The n best tickers, best first."""
+        return [self._tickers[i] for i in self._ids[:n]]
+
+    def ranks(self):
+        """pd.Series ticker -> 1-based rank, in rank order."""
+        tickers = [self._tickers[i] for i in self._ids]
+        return pd.Series(np.arange(1, len(tickers) + 1), index=tickers, name='rank')
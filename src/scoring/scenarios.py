@@ -0,0 +1,159 @@
+"""
+What-if scoring over many weightings of SCORING_WEIGHTS at once.
+
+The percentile matrix (metrics x companies, oriented higher-is-better) doesn't depend on
+the weights, so it is computed once. K scenarios are then a (K x metrics) weight matrix
+and all K final-score vectors come out of one matrix multiply:
+
+    scores = W @ P          # (K, companies)
+
+Each scenario's Top N is picked with scorer.top_n_positions, and the Top N lists are
+compared pairwise (overlap, turnover) and against a baseline scenario.
+
+Usage:
+    python src/scoring/scenarios.py [k] [scale]   # k random weightings around SCORING_WEIGHTS
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from src.scoring import scorer
+
+BASELINE = "baseline"
+
+
+def percentile_matrix(df, metrics=None):
+    """
+    Direction-adjusted percentiles for every scored metric present in `df`.
+
+    Args:
+        df (pd.DataFrame): one row per company (`ticker` + metric columns).
+        metrics (list): metrics to rank (default: SCORING_WEIGHTS keys present in df).
+
+    Returns:
+        (list, np.ndarray): metrics, (n_metrics, n_companies) percentile matrix.
+    """
+    if metrics is None:
+        metrics = [m for m in settings.SCORING_WEIGHTS if m in df.columns]
+    numeric = df[metrics].copy()
+    scorer.to_numeric_metrics(numeric, metrics)
+    return metrics, scorer.directional_percentiles(numeric, metrics)
+
+
+def weight_matrix(scenarios, metrics):
+    """
+    Stacks scenario weights into a (K, n_metrics) matrix.
+
+    Args:
+        scenarios (dict): name -> {metric: weight}. Metrics missing from a scenario get 0.
+
+    Returns:
+        (list, np.ndarray): scenario names, weight matrix.
+    """
+    names = list(scenarios)
+    weights = np.zeros((len(names), len(metrics)))
+    for k, name in enumerate(names):
+        for j, metric in enumerate(metrics):
+            weights[k, j] = scenarios[name].get(metric, 0.0)
+    return names, weights
+
+
+def random_scenarios(k, scale=0.25, base=None, seed=0):
+    """
+    `k` weightings around `base` (default SCORING_WEIGHTS): every weight is multiplied
+    by a lognormal factor with sigma `scale`. The base itself is included as BASELINE.
+    """
+    base = dict(base or settings.SCORING_WEIGHTS)
+    rng = np.random.default_rng(seed)
+    scenarios = {BASELINE: base}
+    for i in range(k):
+        factors = rng.lognormal(0.0, scale, size=len(base))
+        scenarios[f"scenario_{i + 1}"] = {m: w * f for (m, w), f in zip(base.items(), factors)}
+    return scenarios
+
+
+def score_scenarios(df, scenarios, n=50):
+    """
+    Scores the universe under every scenario.
+
+    Args:
+        df (pd.DataFrame): features (`ticker` + metric columns).
+        scenarios (dict): name -> {metric: weight}.
+        n (int): size of the Top N lists.
+
+    Returns:
+        dict: {
+            "scores": pd.DataFrame (ticker x scenario) of final scores,
+            "top": pd.DataFrame (rank 1..n x scenario) of tickers,
+            "overlap": pd.DataFrame (scenario x scenario) of shared Top N tickers,
+            "turnover": pd.DataFrame (scenario x scenario), 1 - overlap / n
+        }
+    """
+    metrics, percentiles = percentile_matrix(df)
+    names, weights = weight_matrix(scenarios, metrics)
+    scores = weights @ percentiles  # (K, companies)
+
+    tickers = df['ticker'].to_numpy()
+    top_positions = [scorer.top_n_positions(row, n) for row in scores]
+    n_top = min(n, len(df))
+
+    # Membership matrix -> pairwise overlap with one more matrix multiply
+    members = np.zeros((len(names), len(df)), dtype=np.int64)
+    for k, positions in enumerate(top_positions):
+        members[k, positions] = 1
+    overlap = members @ members.T
+
+    return {
+        "scores": pd.DataFrame(scores.T, index=pd.Index(tickers, name='ticker'), columns=names),
+        "top": pd.DataFrame({name: tickers[pos] for name, pos in zip(names, top_positions)},
+                            index=pd.RangeIndex(1, n_top + 1, name='rank')),
+        "overlap": pd.DataFrame(overlap, index=names, columns=names),
+        "turnover": pd.DataFrame(1 - overlap / max(n_top, 1), index=names, columns=names)
+    }
+
+
+def compare_to_baseline(result, baseline=BASELINE):
+    """
+    Per-scenario summary against one scenario's Top N.
+
+    Returns:
+        pd.DataFrame: overlap, turnover, entered and exited tickers, one row per scenario.
+    """
+    top = result["top"]
+    base = set(top[baseline])
+    rows = []
+    for name in top.columns:
+        current = set(top[name])
+        rows.append({
+            "scenario": name,
+            "overlap": result["overlap"].loc[name, baseline],
+            "turnover": result["turnover"].loc[name, baseline],
+            "entered": sorted(current - base),
+            "exited": sorted(base - current)
+        })
+    return pd.DataFrame(rows).set_index("scenario")
+
+
+if __name__ == "__main__":
+    from src.storage import feature_store
+
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    df = feature_store.load_features()
+    if df.empty:
+        print(f"Error: No processed data in {settings.FEATURE_STORE_DIR}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    result = score_scenarios(df, random_scenarios(k, scale))
+    elapsed = time.perf_counter() - start
+    summary = compare_to_baseline(result)
+    print(f"Scored {k} scenarios over {len(df)} companies in {elapsed:.2f}s")
+    print(summary[["overlap", "turnover"]].describe())
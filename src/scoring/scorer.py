@@ -3,73 +3,187 @@ import pandas as pd
 import numpy as np
 from config import settings
 
-def normalize_metrics(df):
+def percentile_ranks(values):
+    """
+    Percentile ranks of every row of a 2-D array in one vectorized pass.
+    Same numbers as pandas `rank(pct=True)` per metric: ties get their average rank,
+    NaNs stay NaN and don't count towards the denominator.
+    
+    Args:
+        values (np.ndarray): (n_metrics, n_companies) float array, one metric per row
+            (contiguous rows keep the sort fast).
+        
+    Returns:
+        np.ndarray: ranks in (0, 1], same shape.
+    """
+    m, n = values.shape
+    if n == 0 or m == 0:
+        return np.empty((m, n))
+    
+    # NaNs sort last, so valid values occupy positions 1..count in every row
+    order = np.argsort(values, axis=1)
+    flat_order = (order + (np.arange(m) * n)[:, None]).ravel()
+    sorted_values = values.ravel()[flat_order].reshape(m, n)
+    
+    # Tie groups: a new group starts at the beginning of each row and wherever the value changes
+    starts = np.ones((m, n), dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    group = np.cumsum(starts.ravel()) - 1
+    positions = np.tile(np.arange(1, n + 1, dtype=np.float64), m)
+    average = np.bincount(group, weights=positions) / np.bincount(group)
+    
+    ranks = np.empty(m * n)
+    ranks[flat_order] = average[group]
+    ranks = ranks.reshape(m, n)
+    
+    missing = np.isnan(values)
+    ranks[missing] = np.nan
+    return ranks / (n - missing.sum(axis=1))[:, None]
+
+def directional_percentile_matrix(values, lower, present=None):
+    """
+    Array form of directional_percentiles: one metric per row of `values`.
+    
+    Args:
+        values (np.ndarray): (rows, n_companies) float array.
+        lower (np.ndarray): bool per row, True where lower is better.
+        present (np.ndarray): optional (rows, n_companies) bool mask of companies in the
+            universe; absent ones are left out of the ranking (NaN result), e.g. tickers not
+            listed yet on a historical date.
+        
+    Returns:
+        np.ndarray: same shape, percentiles in [0, 1] oriented higher-is-better.
+    """
+    # Fill NaNs with the worst value for the metric before ranking to penalize missing data:
+    # the max where lower is better, the min otherwise
+    if values.size:
+        known = ~np.isnan(values)
+        has_values = known.any(axis=1)
+        worst = np.full(len(values), np.nan)
+        worst[has_values & lower] = np.nanmax(values[has_values & lower], axis=1)
+        worst[has_values & ~lower] = np.nanmin(values[has_values & ~lower], axis=1)
+        fill = ~known if present is None else ~known & present
+        values = np.where(fill, worst[:, None], values)
+    
+    percentile = percentile_ranks(values)
+    # Lower is Better (e.g. Debt): rank is inverted (1 - percentile)
+    return np.where(lower[:, None], 1 - percentile, percentile)
+
+def directional_percentiles(df, metrics):
+    """
+    Percentile of every company on every metric, oriented so that higher is better.
+    Columns must already be numeric (see normalize_metrics).
+    
+    Args:
+        df (pd.DataFrame): one row per company.
+        metrics (list): metric columns to rank.
+        
+    Returns:
+        np.ndarray: (n_metrics, n_companies) array in [0, 1].
+    """
+    # One row per metric
+    values = np.empty((len(metrics), len(df)), dtype=np.float64)
+    for j, metric in enumerate(metrics):
+        values[j] = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+    lower = np.array([metric in settings.LOWER_IS_BETTER for metric in metrics], dtype=bool)
+    return directional_percentile_matrix(values, lower)
+
+def to_numeric_metrics(df, metrics):
+    """Coerces metric columns to numbers in place ('N/A', strings, etc. become NaN)."""
+    for metric in metrics:
+        if not pd.api.types.is_numeric_dtype(df[metric]):
+            df[metric] = pd.to_numeric(df[metric], errors='coerce')
+
+def normalize_metrics(df, include_components=True):
     """
     Normalizes metrics using Percentile Ranking (0 to 1).
     Handles directionality (Lower is Better vs Higher is Better).
+    
+    All weighted metrics are stacked into one (metrics x companies) array and ranked
+    together; weights and directions are applied as vectors.
+    
+    Args:
+        df (pd.DataFrame): one row per company with metric columns.
+        include_components (bool): also add the per-metric `score_<metric>` columns
+            (contributions, for explainability). Off when only `final_score` is needed.
     """
     # Create a copy to avoid SettingWithCopy warnings
     scored_df = df.copy()
     
-    # List of metrics where Lower is Better
-    # We will invert the rank for these: 1 - percentile
-    LOWER_IS_BETTER = settings.LOWER_IS_BETTER 
-    
     weights = settings.SCORING_WEIGHTS
+    metrics = [metric for metric in weights if metric in scored_df.columns]
     
-    # Compute weighted score
-    # score = sum( percentile(metric) * weight )
+    # Ensure columns are numeric (handle 'N/A', strings, etc.)
+    to_numeric_metrics(scored_df, metrics)
     
-    # Initialize total score
-    scored_df['final_score'] = 0.0
+    adjusted = directional_percentiles(scored_df, metrics)
+    weight = np.array([weights[metric] for metric in metrics], dtype=np.float64)
+    contributions = adjusted * weight[:, None]
     
-    for metric, weight in weights.items():
-        if metric not in scored_df.columns:
-            continue
-            
-        # Ensure column is numeric (handle 'N/A', strings, etc.)
-        scored_df[metric] = pd.to_numeric(scored_df[metric], errors='coerce')
-        
-        # 1. Compute Percentile (rank / count)
-        # Handle NaNs: they get rank NaN, so fill with median or 0?  
-        # Better to fill with a low rank (0) so they don't appear in top lists.
-        # But for 'debt', missing might mean 0 debt (good)? No, assume 0 for missing debt.
-        # Let's rely on processor.py dealing with NaNs or filling defaults.
-        # If NaN, let's just skip contributing to score (treat as neutral or bad).
-        # We'll fillna with median for ranking robustness, or 
-        # actually, pandas rank handles NaN by assigning them NaN or keeping them out.
-        # Let's fill NaNs with worst possible value for the metric before ranking to penalize missing data.
-        
-        series = scored_df[metric]
-        
-        if metric in LOWER_IS_BETTER:
-            # For lower is better (e.g. Debt), fill NaNs with a High Value (Max)
-            series_filled = series.fillna(series.max())
-            # Rank Ascending (Low values = Low Rank Number). 
-            # We want Low Debt = High Score.
-            # pct=True gives 0 to 1. 0 = lowest debt, 1 = highest debt.
-            # So we invert: 1 - rank.
-            percentile = series_filled.rank(pct=True, ascending=True)
-            score_contribution = (1 - percentile) * weight
+    # Summed metric by metric, in weight order (same floating point result as before)
+    final_score = np.zeros(len(scored_df))
+    for j in range(len(metrics)):
+        final_score += contributions[j]
+    
+    new_columns = {'final_score': final_score}
+    if include_components:
+        # Individual component scores for debugging/explainability
+        for j, metric in enumerate(metrics):
+            new_columns[f'score_{metric}'] = contributions[j]
+    
+    # Existing columns are overwritten in place, new ones appended in one go (no fragmentation)
+    appended = {}
+    for name, column in new_columns.items():
+        if name in scored_df.columns:
+            scored_df[name] = column
         else:
-            # For higher is better (e.g. ROE), fill NaNs with Low Value (Min)
-            series_filled = series.fillna(series.min())
-            percentile = series_filled.rank(pct=True, ascending=True)
-            score_contribution = percentile * weight
-            
-        # Add to total
-        scored_df['final_score'] += score_contribution
-        
-        # Store individual component score for debugging/explainability
-        scored_df[f'score_{metric}'] = score_contribution
+            appended[name] = column
+    if appended:
+        scored_df = pd.concat([scored_df, pd.DataFrame(appended, index=scored_df.index)], axis=1)
 
     return scored_df
 
+def top_n_positions(scores, n):
+    """
+    Positions of the `n` highest scores, best first, without sorting the whole array:
+    an O(n) partition finds the cut-off, then only the selected scores are sorted.
+    Ties are broken by position (earlier row first); NaN scores come last.
+    
+    Args:
+        scores (array-like): one score per company.
+        n (int): number of positions to return.
+        
+    Returns:
+        np.ndarray: int positions into `scores`.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = max(min(n, len(scores)), 0)
+    valid = np.flatnonzero(~np.isnan(scores))
+    
+    if len(valid) <= n:
+        chosen = valid
+    else:
+        values = scores[valid]
+        cut = len(values) - n
+        threshold = np.partition(values, cut)[cut]
+        # Everything above the n-th best score, then the earliest of the tied ones
+        above = valid[values > threshold]
+        tied = valid[values == threshold][:n - len(above)]
+        chosen = np.concatenate([above, tied])
+    
+    chosen = chosen[np.lexsort((chosen, -scores[chosen]))]
+    if len(chosen) < n:
+        missing = np.flatnonzero(np.isnan(scores))[:n - len(chosen)]
+        chosen = np.concatenate([chosen, missing])
+    return chosen
+
 def get_top_n(df, n=50):
     """
     Returns the top N companies based on 'final_score'.
+    Ties keep their input order, so the result doesn't depend on the sort algorithm.
     """
     if 'final_score' not in df.columns:
         return pd.DataFrame() # Empty
         
-    return df.sort_values(by='final_score', ascending=False).head(n)
+    positions = top_n_positions(df['final_score'].to_numpy(dtype=np.float64, na_value=np.nan), n)
+    return df.iloc[positions]
@@ -0,0 +1,383 @@
+"""
+Parquet feature store (replaces data/processed/features.csv).
+
+Layout under settings.FEATURE_STORE_DIR (data/processed/feature_store):
+
+    _schema.json                         # {"schema_version": N} of the newest writer
+    run_date=YYYY-MM-DD/part-<ns>.parquet
+
+Every ingestion batch is written as its own part file (no re-reading of headers on
+append); compact() merges a run's parts into one ticker-sorted file at the end.
+
+Columns are typed by FEATURE_SCHEMA: `ticker` (string), scalar inputs, metrics and the
+legacy features.csv ratios (float64, derived from the inputs when a row is written), the multi-year histories as fixed-size lists (settings.HISTORY_YEARS
+wide: int16 fiscal years, 0 where missing, float64 values, NaN where missing) and
+the raw input fingerprints used by incremental runs (string).
+Readers go through pyarrow.dataset, so they only read the columns they ask for and
+filters (run date, tickers, any expression) are pushed down to the files.
+
+FEATURE_SCHEMA_VERSION is stored in every file and in _schema.json. Bump it when the
+schema changes: older files are still readable (missing columns come back as null),
+but a store written by a newer version is refused.
+"""
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config import settings
+from src.data_ingestion.history_block import HISTORY_FIELDS, HistoryBlock
+from src.metrics.batch_metrics import LEGACY_RATIOS, METRIC_NAMES, compute_legacy_ratios
+
+# v1: scalars + histories. v2: + input fingerprints (incremental runs). v3: + legacy ratios
+FEATURE_SCHEMA_VERSION = 3
+_VERSION_KEY = b"nfm_schema_version"
+
+# Scalar columns: processor inputs (REQUIRED_FIELDS + PEG), the metrics, then the legacy ratios
+INPUT_COLUMNS = list(settings.REQUIRED_FIELDS) + ["peg_ratio"]
+SCALAR_COLUMNS = INPUT_COLUMNS + [m for m in METRIC_NAMES if m not in INPUT_COLUMNS] + LEGACY_RATIOS
+HISTORY_COLUMNS = ["hist_years"] + HISTORY_FIELDS
+# Raw input fingerprints (src/data_ingestion/incremental.py); not read by default
+FINGERPRINT_COLUMNS = ["fp_statements", "fp_prices"]
+
+
+class FeatureStoreError(Exception):
+    """Raised when the store on disk can't be read by this version of the code."""
+
+
+def feature_schema(width=None):
+    """Arrow schema of one feature row (the run_date partition column is not stored in files)."""
+    width = settings.HISTORY_YEARS if width is None else width
+    fields = [pa.field("ticker", pa.string(), nullable=False)]
+    fields += [pa.field(col, pa.float64()) for col in SCALAR_COLUMNS]
+    fields.append(pa.field("hist_years", pa.list_(pa.int16(), width)))
+    fields += [pa.field(field, pa.list_(pa.float64(), width)) for field in HISTORY_FIELDS]
+    fields += [pa.field(col, pa.string()) for col in FINGERPRINT_COLUMNS]
+    return pa.schema(fields, metadata={_VERSION_KEY: str(FEATURE_SCHEMA_VERSION).encode()})
+
+
+def today_str():
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+# ------------------------
+# Row <-> Arrow conversion
+# ------------------------
+
+def _float_column(rows, col):
+    values = np.full(len(rows), np.nan)
+    for i, row in enumerate(rows):
+        val = row.get(col)
+        if val is None:
+            continue
+        try:
+            values[i] = float(val)
+        except (TypeError, ValueError):
+            pass
+    return pa.array(values, type=pa.float64())
+
+
+def _fixed_list(matrix, value_type):
+    width = matrix.shape[1]
+    return pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel(), type=value_type), width)
+
+
+def rows_to_table(rows, block=None, width=None):
+    """
+    Builds a typed table from processed rows (scalar fields + metrics).
+    Histories come from `block` (a HistoryBlock of the same rows) or are stacked from the rows.
+    Columns missing from the rows are NaN; columns unknown to the schema are dropped.
+    """
+    width = settings.HISTORY_YEARS if width is None else width
+    schema = feature_schema(width)
+    if block is None:
+        block = HistoryBlock.from_rows(rows, width=width)
+
+    scalars = {col: _float_column(rows, col) for col in SCALAR_COLUMNS if col not in LEGACY_RATIOS}
+    scalars.update(_legacy_columns(scalars))
+    arrays = [pa.array([str(row["ticker"]) for row in rows], type=pa.string())]
+    arrays += [scalars[col] for col in SCALAR_COLUMNS]
+    arrays.append(_fixed_list(block.years, pa.int16()))
+    for field in HISTORY_FIELDS:
+        matrix = block.values.get(field)
+        if matrix is None:
+            matrix = np.full((len(rows), width), np.nan)
+        arrays.append(_fixed_list(matrix, pa.float64()))
+    for col in FINGERPRINT_COLUMNS:
+        arrays.append(pa.array([row.get(col) for row in rows], type=pa.string()))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _legacy_columns(columns):
+    # {input: Arrow float column} -> {legacy ratio: Arrow float column}
+    frame = pd.DataFrame({col: columns[col].to_numpy(zero_copy_only=False) for col in INPUT_COLUMNS})
+    ratios = compute_legacy_ratios(frame)
+    return {col: pa.array(ratios[col].to_numpy(), type=pa.float64()) for col in LEGACY_RATIOS}
+
+
+def table_to_block(table):
+    """HistoryBlock from a table holding `ticker`, `hist_years` and hist_* columns."""
+    n = table.num_rows
+    years_col = table.column("hist_years").combine_chunks()
+    width = years_col.type.list_size
+    years = years_col.flatten().to_numpy(zero_copy_only=False).reshape(n, width)
+    values = {}
+    for field in HISTORY_FIELDS:
+        if field in table.column_names:
+            col = table.column(field).combine_chunks()
+            values[field] = col.flatten().to_numpy(zero_copy_only=False).reshape(n, width)
+    return HistoryBlock(table.column("ticker").to_pylist(), years, years != 0, values)
+
+
+# ------------------------
+# Store
+# ------------------------
+
+class FeatureStore:
+    """Date-partitioned Parquet store of per-ticker features."""
+
+    def __init__(self, root=None, width=None):
+        self.root = root or settings.FEATURE_STORE_DIR
+        self.width = settings.HISTORY_YEARS if width is None else width
+        self.schema = feature_schema(self.width)
+        self.schema_path = os.path.join(self.root, "_schema.json")
+
+    # --- Layout ---
+
+    def _partition_dir(self, run_date):
+        return os.path.join(self.root, f"run_date={run_date}")
+
+    def run_dates(self):
+        """Run dates with data, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        dates = []
+        for name in os.listdir(self.root):
+            if name.startswith("run_date=") and os.path.isdir(os.path.join(self.root, name)):
+                files = os.listdir(os.path.join(self.root, name))
+                if any(f.endswith(".parquet") and not f.startswith(".") for f in files):
+                    dates.append(name.split("=", 1)[1])
+        return sorted(dates)
+
+    def latest_run_date(self):
+        dates = self.run_dates()
+        return dates[-1] if dates else None
+
+    def previous_run_date(self, before):
+        """Latest run strictly before `before` ('YYYY-MM-DD'), or None."""
+        dates = [d for d in self.run_dates() if d < before]
+        return dates[-1] if dates else None
+
+    def is_empty(self):
+        return not self.run_dates()
+
+    # --- Schema version ---
+
+    def stored_version(self):
+        if not os.path.exists(self.schema_path):
+            return None
+        with open(self.schema_path, "r") as f:
+            return json.load(f).get("schema_version")
+
+    def check_version(self):
+        version = self.stored_version()
+        if version is not None and version > FEATURE_SCHEMA_VERSION:
+            raise FeatureStoreError(
+                f"Feature store at {self.root} has schema v{version}, "
+                f"this code reads up to v{FEATURE_SCHEMA_VERSION}."
+            )
+
+    def _write_version(self):
+        version = self.stored_version()
+        if version == FEATURE_SCHEMA_VERSION:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.schema_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"schema_version": FEATURE_SCHEMA_VERSION,
+                       "columns": {field.name: str(field.type) for field in self.schema}}, f, indent=2)
+        os.replace(tmp_path, self.schema_path)
+
+    # --- Writing ---
+
+    def append(self, rows, block=None, run_date=None):
+        """
+        Writes one batch of processed rows (with metrics) as a new part file.
+
+        Returns:
+            str: path of the written file (None for an empty batch).
+        """
+        if not rows:
+            return None
+        self.check_version()
+        self._write_version()
+        run_date = run_date or today_str()
+        table = rows_to_table(rows, block, self.width)
+
+        part_dir = self._partition_dir(run_date)
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{time.time_ns()}.parquet")
+        self._write_atomic(table, path)
+        return path
+
+    @staticmethod
+    def _write_atomic(table, path):
+        # Hidden temp name (readers skip dot files) + rename, so a crash never leaves a torn part
+        tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    def carry_forward(self, tickers, from_run_date, to_run_date):
+        """
+        Copies the stored rows of `tickers` from one run to another unchanged (no decoding).
+
+        Returns:
+            int: number of rows copied.
+        """
+        tickers = list(tickers)
+        if not tickers or from_run_date is None:
+            return 0
+        table = self.read_table([f.name for f in self.schema], tickers, from_run_date)
+        if table.num_rows == 0:
+            return 0
+        table = table.select([f.name for f in self.schema]).cast(self.schema)
+        # Rows written before v3 have no legacy ratios: derive them like append() does
+        ratios = _legacy_columns({col: table.column(col).combine_chunks() for col in INPUT_COLUMNS})
+        for col in LEGACY_RATIOS:
+            table = table.set_column(table.schema.get_field_index(col), self.schema.field(col), ratios[col])
+        part_dir = self._partition_dir(to_run_date)
+        os.makedirs(part_dir, exist_ok=True)
+        self._write_version()
+        self._write_atomic(table, os.path.join(part_dir, f"part-{time.time_ns()}.parquet"))
+        return table.num_rows
+
+    def compact(self, run_date=None):
+        """
+        Merges a run's part files into one file sorted by ticker (last write per ticker wins).
+        Sorted tickers let row-group statistics skip data for ticker filters.
+        """
+        run_date = run_date or self.latest_run_date()
+        if run_date is None:
+            return None
+        part_dir = self._partition_dir(run_date)
+        if not os.path.isdir(part_dir):
+            return None
+        parts = sorted(f for f in os.listdir(part_dir) if f.endswith(".parquet") and not f.startswith("."))
+        if len(parts) <= 1:
+            return os.path.join(part_dir, parts[0]) if parts else None
+
+        table = ds.dataset([os.path.join(part_dir, f) for f in parts], schema=self.schema,
+                           format="parquet").to_table()
+        # Keep the last occurrence of each ticker (parts are in write order)
+        tickers = table.column("ticker").to_numpy(zero_copy_only=False)
+        _, last_idx = np.unique(tickers[::-1], return_index=True)
+        keep = np.sort(len(tickers) - 1 - last_idx)
+        table = table.take(pa.array(keep)).sort_by("ticker").replace_schema_metadata(self.schema.metadata)
+
+        path = os.path.join(part_dir, f"part-{time.time_ns()}.parquet")
+        self._write_atomic(table, path)
+        for f in parts:
+            os.remove(os.path.join(part_dir, f))
+        return path
+
+    def prune(self, keep_days=None, today=None):
+        """Deletes run partitions older than `keep_days` (settings.FEATURE_STORE_RETENTION_DAYS)."""
+        keep_days = settings.FEATURE_STORE_RETENTION_DAYS if keep_days is None else keep_days
+        if not keep_days:
+            return []
+        cutoff = (today or date.today()) - timedelta(days=keep_days)
+        removed = []
+        for run_date in self.run_dates():
+            if date.fromisoformat(run_date) < cutoff:
+                shutil.rmtree(self._partition_dir(run_date))
+                removed.append(run_date)
+        return removed
+
+    # --- Reading ---
+
+    def _dataset(self):
+        self.check_version()
+        partitioning = ds.partitioning(pa.schema([("run_date", pa.string())]), flavor="hive")
+        return ds.dataset(self.root, schema=self.schema.append(pa.field("run_date", pa.string())),
+                          format="parquet", partitioning=partitioning,
+                          ignore_prefixes=["_", "."])
+
+    def _filter(self, run_date, tickers, filter):
+        expr = ds.field("run_date") == run_date
+        if tickers is not None:
+            expr = expr & ds.field("ticker").isin([str(t) for t in tickers])
+        if filter is not None:
+            expr = expr & filter
+        return expr
+
+    def read_table(self, columns=None, tickers=None, run_date=None, filter=None):
+        """
+        Arrow table for one run (latest by default), projected and filtered at the source.
+
+        Args:
+            columns (list): columns to read (default: ticker + all scalar columns).
+            tickers (iterable): only these tickers.
+            run_date (str): 'YYYY-MM-DD' partition (default: latest run).
+            filter (pyarrow.dataset.Expression): extra predicate, e.g. ds.field("pe_ratio") < 30.
+        """
+        run_date = run_date or self.latest_run_date()
+        columns = list(columns) if columns is not None else ["ticker"] + SCALAR_COLUMNS
+        if "ticker" not in columns:
+            columns = ["ticker"] + columns
+        if run_date is None:
+            return self.schema.empty_table().select(columns)
+        return self._dataset().to_table(columns=columns, filter=self._filter(run_date, tickers, filter))
+
+    def read(self, columns=None, tickers=None, run_date=None, filter=None):
+        """Same as read_table, as a DataFrame with one row per ticker."""
+        df = self.read_table(columns, tickers, run_date, filter).to_pandas()
+        # Uncompacted parts may hold a ticker twice (re-processed); keep the latest write
+        return df.drop_duplicates("ticker", keep="last").reset_index(drop=True)
+
+    def read_histories(self, tickers=None, run_date=None):
+        """HistoryBlock for one run (latest by default)."""
+        table = self.read_table(HISTORY_COLUMNS, tickers, run_date)
+        return table_to_block(table).dedupe_last()
+
+    def tickers(self, run_date=None):
+        """Tickers stored for a run (reads only the ticker column)."""
+        return set(self.read_table(["ticker"], run_date=run_date).column("ticker").to_pylist())
+
+
+# ------------------------
+# Reader entry points
+# ------------------------
+
+def load_features(columns=None, tickers=None, run_date=None, store=None, legacy_path=None):
+    """
+    Loads features for scoring/validation.
+    Reads the Parquet store; falls back to the legacy features.csv if the store is empty.
+
+    Args:
+        columns (list): columns to load (default: all scalar columns).
+        tickers (iterable): only these tickers.
+        run_date (str): run partition (default: latest).
+
+    Returns:
+        pd.DataFrame: one row per ticker (empty if nothing is stored).
+    """
+    store = store or FeatureStore()
+    if not store.is_empty():
+        return store.read(columns=columns, tickers=tickers, run_date=run_date)
+
+    legacy_path = legacy_path or settings.PROCESSED_DATA_PATH
+    if not os.path.exists(legacy_path):
+        return pd.DataFrame(columns=["ticker"] + list(columns or []))
+    print(f"Feature store is empty, reading legacy CSV {legacy_path}")
+    wanted = None if columns is None else set(columns) | {"ticker"}
+    df = pd.read_csv(legacy_path, usecols=(lambda c: c in wanted) if wanted else None)
+    if tickers is not None:
+        df = df[df["ticker"].isin(set(tickers))].reset_index(drop=True)
+    return df
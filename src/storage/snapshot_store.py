@@ -0,0 +1,320 @@
+"""
+Snapshot history store: the ranked universe of every scoring run, for monitoring.
+
+Replaces globbing data/reports/history/top_50_*.csv. Layout under
+settings.SNAPSHOT_STORE_DIR (data/processed/snapshot_store):
+
+    parts/date=YYYY-MM-DD.parquet    # runs not compacted yet (one file per date)
+    year=YYYY/by_date.parquet        # one row group per date, rows in rank order
+    year=YYYY/by_ticker.parquet      # date, ticker, rank, final_score sorted by (ticker, date)
+
+Columns: date, ticker, rank (1 = best, get_top_n order), final_score and
+settings.SNAPSHOT_STORE_METRICS. Appends only write a part file; once
+SNAPSHOT_STORE_COMPACT_EVERY parts exist they are merged into their year's files, so
+compaction rewrites at most one year and reads never list more than that many parts.
+Files written before a metric was added to SNAPSHOT_STORE_METRICS read it as null.
+
+Both indexes are plain Parquet metadata:
+- by_date.parquet lists its dates in the footer (row group i = dates[i]), so the latest
+  snapshots or an N-day window are a read of a few row groups.
+- by_ticker.parquet row groups carry ticker min/max statistics, so a rank trajectory
+  only reads the row groups that can hold the ticker.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import settings
+from src.scoring import scorer
+
+_DATES_KEY = b"nfm_snapshot_dates"
+_PART_RE = re.compile(r"^date=(\d{4}-\d{2}-\d{2})\.parquet$")
+_YEAR_RE = re.compile(r"^year=(\d{4})$")
+TRAJECTORY_COLUMNS = ["date", "ticker", "rank", "final_score"]
+
+
+def snapshot_schema():
+    fields = [pa.field("date", pa.string()), pa.field("ticker", pa.string()),
+              pa.field("rank", pa.int32()), pa.field("final_score", pa.float64())]
+    fields += [pa.field(m, pa.float64()) for m in settings.SNAPSHOT_STORE_METRICS]
+    return pa.schema(fields)
+
+
+def _write_atomic(table, path, row_group_size=None):
+    # Hidden temp name + rename, so a crash never leaves a torn file
+    tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    pq.write_table(table, tmp_path, compression="zstd", row_group_size=row_group_size)
+    os.replace(tmp_path, path)
+
+
+class SnapshotStore:
+    """Append-only history of ranked snapshots, indexed by date and ticker."""
+
+    def __init__(self, root=None, compact_every=None):
+        self.root = root or settings.SNAPSHOT_STORE_DIR
+        self.compact_every = compact_every or settings.SNAPSHOT_STORE_COMPACT_EVERY
+        self.parts_dir = os.path.join(self.root, "parts")
+        self.schema = snapshot_schema()
+
+    # --- Layout ---
+
+    def _part_path(self, date):
+        return os.path.join(self.parts_dir, f"date={date}.parquet")
+
+    def _year_path(self, year, name):
+        return os.path.join(self.root, f"year={year}", name)
+
+    def _part_dates(self):
+        if not os.path.isdir(self.parts_dir):
+            return []
+        return sorted(m.group(1) for m in map(_PART_RE.match, os.listdir(self.parts_dir)) if m)
+
+    def _years(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(m.group(1) for m in map(_YEAR_RE.match, os.listdir(self.root)) if m)
+
+    def _compacted_dates(self, year):
+        """Dates of a year's by_date file, in row group order (read from the footer only)."""
+        path = self._year_path(year, "by_date.parquet")
+        if not os.path.exists(path):
+            return []
+        return json.loads(pq.read_schema(path).metadata[_DATES_KEY])
+
+    def dates(self):
+        """Stored dates (YYYY-MM-DD strings, ascending)."""
+        dates = set(self._part_dates())
+        for year in self._years():
+            dates.update(self._compacted_dates(year))
+        return sorted(dates)
+
+    def _conform(self, table, columns=None):
+        # Older files lack metrics added to the schema since: fill them with nulls
+        names = columns if columns is not None else self.schema.names
+        for name in names:
+            if name not in table.column_names:
+                field = self.schema.field(name)
+                table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+        return table.select(names)
+
+    def _read_part(self, date, columns=None):
+        path = self._part_path(date)
+        stored = pq.read_schema(path).names
+        table = pq.read_table(path, columns=[c for c in columns if c in stored] if columns is not None else None)
+        return self._conform(table, columns)
+
+    # --- Writing ---
+
+    def _to_table(self, date, df):
+        df = df.reset_index(drop=True)
+        scores = pd.to_numeric(df["final_score"], errors="coerce").to_numpy(dtype=np.float64) \
+            if "final_score" in df.columns else np.full(len(df), np.nan)
+        if "rank" in df.columns:
+            ranks = df["rank"].to_numpy(dtype=np.int32)
+        else:
+            ranks = np.empty(len(df), dtype=np.int32)
+            ranks[scorer.top_n_positions(scores, len(df))] = np.arange(1, len(df) + 1)
+        columns = {
+            "date": pa.array([date] * len(df), type=pa.string()),
+            "ticker": pa.array(df["ticker"].astype(str).to_numpy(), type=pa.string()),
+            "rank": pa.array(ranks, type=pa.int32()),
+            "final_score": pa.array(scores)
+        }
+        for metric in settings.SNAPSHOT_STORE_METRICS:
+            values = pd.to_numeric(df[metric], errors="coerce") if metric in df.columns else np.nan
+            columns[metric] = pa.array(np.broadcast_to(np.asarray(values, dtype=np.float64), len(df)))
+        return pa.table(columns, schema=self.schema).sort_by("rank")
+
+    def append(self, date, df):
+        """
+        Stores (or replaces) one date's snapshot.
+
+        Args:
+            date (str): YYYY-MM-DD.
+            df (pd.DataFrame): `ticker`, `final_score` and metric columns, one row per company.
+                `rank` is computed from final_score (get_top_n order) unless given.
+
+        Returns:
+            str: path of the written part file.
+        """
+        if df.empty:
+            raise ValueError(f"Refusing to store an empty snapshot for {date}")
+        os.makedirs(self.parts_dir, exist_ok=True)
+        path = self._part_path(date)
+        _write_atomic(self._to_table(date, df), path)
+        if len(self._part_dates()) >= self.compact_every:
+            self.compact()
+        return path
+
+    def compact(self):
+        """Merges the part files into their years' by_date / by_ticker files."""
+        parts = self._part_dates()
+        for year in sorted({d[:4] for d in parts}):
+            new = {d: self._read_part(d) for d in parts if d[:4] == year}
+            old = self._compacted_dates(year)
+            tables = []
+            for date in sorted(set(old) | set(new)):
+                # A part replaces the compacted snapshot of the same date
+                tables.append(new[date] if date in new else self._read_row_groups(year, [old.index(date)]))
+            dates = sorted(set(old) | set(new))
+            self._write_year(year, dates, tables)
+            for date in new:
+                os.remove(self._part_path(date))
+
+    def _write_year(self, year, dates, tables):
+        os.makedirs(os.path.dirname(self._year_path(year, "by_date.parquet")), exist_ok=True)
+        by_date = pa.concat_tables([t.cast(self.schema) for t in tables])
+        schema = self.schema.with_metadata({_DATES_KEY: json.dumps(dates).encode()})
+        path = self._year_path(year, "by_date.parquet")
+        tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for table in tables:
+                writer.write_table(table.cast(schema), row_group_size=max(table.num_rows, 1))
+        os.replace(tmp_path, path)
+
+        by_ticker = by_date.select(TRAJECTORY_COLUMNS).sort_by([("ticker", "ascending"), ("date", "ascending")])
+        _write_atomic(by_ticker, self._year_path(year, "by_ticker.parquet"),
+                      row_group_size=settings.SNAPSHOT_STORE_TICKER_ROW_GROUP)
+
+    # --- Reading ---
+
+    def _read_row_groups(self, year, indices, columns=None):
+        pf = pq.ParquetFile(self._year_path(year, "by_date.parquet"))
+        stored = pf.schema_arrow.names
+        table = pf.read_row_groups(indices, columns=[c for c in columns if c in stored] if columns is not None else None)
+        return self._conform(table, columns)
+
+    def snapshots(self, dates, top_n=None, columns=None):
+        """
+        Snapshots of several dates as one long frame.
+
+        Args:
+            dates (list): stored dates.
+            top_n (int): keep only ranks 1..top_n.
+            columns (list): columns to read (date, ticker and rank are always included).
+
+        Returns:
+            pd.DataFrame: sorted by (date, rank).
+        """
+        if columns is not None:
+            columns = ["date", "ticker", "rank"] + [c for c in columns if c not in ("date", "ticker", "rank")]
+        parts = set(self._part_dates())
+        tables = []
+        by_year = {}
+        for date in dates:
+            if date in parts:
+                tables.append(self._read_part(date, columns))
+            else:
+                by_year.setdefault(date[:4], []).append(date)
+        for year, year_dates in by_year.items():
+            stored = self._compacted_dates(year)
+            missing = [d for d in year_dates if d not in stored]
+            if missing:
+                raise KeyError(f"No snapshot for {missing} in {self.root}")
+            tables.append(self._read_row_groups(year, [stored.index(d) for d in year_dates], columns))
+        if not tables:
+            return pd.DataFrame(columns=columns or self.schema.names)
+
+        df = pa.concat_tables([t.cast(pa.schema([self.schema.field(n) for n in t.schema.names]))
+                               for t in tables]).to_pandas()
+        if top_n is not None:
+            df = df[df["rank"] <= top_n]
+        return df.sort_values(["date", "rank"], kind="stable").reset_index(drop=True)
+
+    def snapshot(self, date, top_n=None, columns=None):
+        """One date's snapshot in rank order."""
+        return self.snapshots([date], top_n, columns)
+
+    def latest(self, k=2, top_n=None, columns=None):
+        """
+        The k most recent snapshots, newest first.
+
+        Returns:
+            list: [(date, pd.DataFrame)], fewer than k if the store is younger than that.
+        """
+        dates = self.dates()[-k:]
+        df = self.snapshots(dates, top_n, columns)
+        return [(date, df[df["date"] == date].reset_index(drop=True)) for date in reversed(dates)]
+
+    def trajectory(self, ticker):
+        """
+        A ticker's rank and score on every stored date.
+
+        Returns:
+            pd.DataFrame: date, rank, final_score sorted by date.
+        """
+        tables = []
+        for year in self._years():
+            path = self._year_path(year, "by_ticker.parquet")
+            if not os.path.exists(path):
+                continue
+            pf = pq.ParquetFile(path)
+            col = pf.schema_arrow.get_field_index("ticker")
+            groups = []
+            for i in range(pf.num_row_groups):
+                stats = pf.metadata.row_group(i).column(col).statistics
+                if stats is None or not stats.has_min_max or stats.min <= ticker <= stats.max:
+                    groups.append(i)
+            if groups:
+                tables.append(pf.read_row_groups(groups))
+        compacted = pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=TRAJECTORY_COLUMNS)
+        compacted = compacted[compacted["ticker"] == ticker]
+
+        parts = [pq.read_table(self._part_path(d), columns=TRAJECTORY_COLUMNS,
+                               filters=[("ticker", "==", ticker)]).to_pandas()
+                 for d in self._part_dates()]
+        df = pd.concat([compacted] + parts, ignore_index=True) if parts else compacted
+        # Parts win over compacted rows of the same date (until the next compaction)
+        df = df.drop_duplicates("date", keep="last").sort_values("date")
+        return df[["date", "rank", "final_score"]].reset_index(drop=True)
+
+    def churn_window(self, n_days, top_n=50):
+        """
+        Top N entries and exits between consecutive snapshots of the last n_days dates.
+
+        Returns:
+            pd.DataFrame: one row per date (after the first): entered, exited (ticker lists), churn.
+        """
+        dates = self.dates()[-n_days:]
+        df = self.snapshots(dates, top_n, columns=[])
+        members = {date: set(group["ticker"]) for date, group in df.groupby("date")}
+        rows = []
+        for prev, curr in zip(dates, dates[1:]):
+            before, after = members.get(prev, set()), members.get(curr, set())
+            entered, exited = sorted(after - before), sorted(before - after)
+            rows.append({"date": curr, "entered": entered, "exited": exited, "churn": len(entered)})
+        return pd.DataFrame(rows, columns=["date", "entered", "exited", "churn"])
+
+    # --- Migration ---
+
+    def import_csv_history(self, history_dir):
+        """
+        Backfills the store from legacy top_50_YYYY-MM-DD.csv files (rank = row order).
+
+        Returns:
+            int: number of imported dates.
+        """
+        if not os.path.isdir(history_dir):
+            return 0
+        stored = set(self.dates())
+        imported = 0
+        for name in sorted(os.listdir(history_dir)):
+            match = re.match(r"^top_50_(\d{4}-\d{2}-\d{2})\.csv$", name)
+            if not match or match.group(1) in stored:
+                continue
+            try:
+                df = pd.read_csv(os.path.join(history_dir, name))
+            except (pd.errors.ParserError, UnicodeDecodeError) as e:
+                print(f"Warning: skipping unreadable snapshot {name}: {e}")
+                continue
+            if df.empty:
+                continue
+            df["rank"] = np.arange(1, len(df) + 1)
+            self.append(match.group(1), df)
+            imported += 1
+        return imported
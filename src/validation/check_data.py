@@ -2,16 +2,19 @@ import pandas as pd
 import sys
 import os
 
-# Adjust path to find data relative to this script
+# Adjust path to find the project root relative to this script
 # Layout: src/validation/check_data.py
-# Data: data/processed/features.csv
+# Data: data/processed/feature_store (latest run), legacy features.csv as fallback
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-file_path = os.path.join(base_dir, 'data', 'processed', 'features.csv')
+sys.path.append(base_dir)
 
-print(f"Reading from: {file_path}")
+from config import settings
+from src.storage import feature_store
+
+print(f"Reading from: {settings.FEATURE_STORE_DIR}")
 
 try:
-    df = pd.read_csv(file_path)
+    df = feature_store.load_features()
     print(f"Loaded dataset with {len(df)} rows and {len(df.columns)} columns.")
 except Exception as e:
     print(f"Error loading dataset: {e}")
@@ -0,0 +1,195 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.monitoring import alerts, rules
+from src.scoring import scorer
+
+
+def _snapshots(n, seed=0):
+    rng = np.random.default_rng(seed)
+    prev = pd.DataFrame({
+        "ticker": [f"T{i:04d}" for i in range(n)],
+        "final_score": rng.uniform(0.3, 0.7, n) * settings.SCORING_MAX_SCORE,
+        "debt_to_equity": rng.uniform(0, 3, n),
+        "cfo": rng.normal(100, 80, n),
+        "fcf_margin": rng.normal(0, 0.15, n),
+        "roe": rng.normal(0.12, 0.1, n),
+        "revenue_cagr": rng.normal(0.05, 0.12, n),
+        "interest_coverage": rng.uniform(-1, 6, n)
+    })
+    curr = prev.copy()
+    for col, scale in [("final_score", 10.0), ("debt_to_equity", 0.6), ("cfo", 80)]:
+        curr[col] = prev[col] + rng.normal(0, scale, n)
+    curr.loc[::17, "cfo"] = np.nan
+    # New listings have no previous row
+    return curr, prev.iloc[5:]
+
+
+def _legacy_level_alerts(row):
+    # The thresholds app.generate_alerts_from_data used to apply row by row (score
+    # thresholds since moved from the old 0-5 scale to a share of the real maximum)
+    found = []
+    share = row.get('final_score', np.inf) / settings.SCORING_MAX_SCORE
+    if row.get('debt_to_equity', 0) > 1.0:
+        found.append(('HIGH_DEBT', 'HIGH' if row['debt_to_equity'] > 2.0 else 'MEDIUM'))
+    if row.get('fcf_margin', 0) < 0:
+        found.append(('NEGATIVE_FCF', 'HIGH' if row['fcf_margin'] < -0.10 else 'MEDIUM'))
+    if share < 0.45:
+        found.append(('LOW_SCORE', 'HIGH' if share < 0.40 else 'MEDIUM'))
+    if 0 < row.get('roe', 0) < 0.10:
+        found.append(('LOW_PROFITABILITY', 'LOW'))
+    if row.get('revenue_cagr', 0) < 0:
+        found.append(('NEGATIVE_GROWTH', 'HIGH' if row['revenue_cagr'] < -0.10 else 'MEDIUM'))
+    if 0 < row.get('interest_coverage', 100) < 3.0:
+        found.append(('SOLVENCY_RISK', 'HIGH' if row['interest_coverage'] < 1.5 else 'MEDIUM'))
+    return found
+
+
+def test_frame_matches_per_company_rules():
+    curr, prev = _snapshots(150)
+    table = alerts.evaluate_alerts_frame(curr, prev)
+    assert list(table.columns) == alerts.ALERT_COLUMNS
+    assert list(table["severity"].cat.categories) == alerts.SEVERITIES
+    assert table["severity"].is_monotonic_increasing
+
+    prev_by_ticker = prev.set_index("ticker")
+    change_types = {"SCORE_DROP", "DEBT_SPIKE", "CASH_FLOW_COLLAPSE"}
+    for _, row in curr.iterrows():
+        got = table[table["ticker"] == row["ticker"]]
+        previous = prev_by_ticker.loc[row["ticker"]].to_dict() if row["ticker"] in prev_by_ticker.index else None
+        expected = alerts.evaluate_alerts(row.to_dict(), previous)
+        change = got[got["type"].isin(change_types)]
+        assert sorted((a["type"], a["message"]) for a in expected) == \
+            sorted(zip(change["type"].astype(str), change["message"]))
+        level = got[~got["type"].isin(change_types)]
+        assert sorted(_legacy_level_alerts(row)) == \
+            sorted(zip(level["type"].astype(str), level["severity"].astype(str)))
+
+
+def test_missing_columns_and_no_previous():
+    curr, _ = _snapshots(50)
+    table = alerts.evaluate_alerts_frame(curr[["ticker", "debt_to_equity"]])
+    assert set(table["type"].astype(str)) == {"HIGH_DEBT"}
+    assert table["previous"].isna().all()
+
+    # Rules whose metric is missing are reported, not silently dropped
+    compiled = rules.compile_rules()
+    alerts.evaluate_alerts_frame(curr.drop(columns=["roe", "fcf_margin"]), rules=compiled)
+    assert compiled.skipped() == ["NEGATIVE_FCF", "LOW_PROFITABILITY"]
+    stats = compiled.stats().set_index("type")
+    assert stats.loc["LOW_PROFITABILITY", "skipped"] == 1 and stats.loc["HIGH_DEBT", "skipped"] == 0
+    assert stats.loc["SCORE_DROP", "skipped"] == 0  # change rules aren't run without a previous snapshot
+    compiled.reset_stats()
+    assert compiled.skipped() == []
+    assert alerts.evaluate_alerts_frame(curr.head(0)).empty
+    assert alerts.evaluate_alerts({"final_score": 1.0}, None) == []
+
+
+def test_low_score_fires_on_scored_universe():
+    # Real scores: weighted percentile sums from the scorer, 0 to SCORING_MAX_SCORE
+    rng = np.random.default_rng(3)
+    n = 2000
+    raw = pd.DataFrame({metric: rng.normal(size=n) for metric in settings.SCORING_WEIGHTS})
+    raw["ticker"] = [f"T{i:04d}" for i in range(n)]
+    common = rng.normal(size=n)  # Correlated fundamentals: a few companies are weak across the board
+    for metric in settings.SCORING_WEIGHTS:
+        raw[metric] += (-1 if metric in settings.LOWER_IS_BETTER else 1) * common
+    scored = scorer.normalize_metrics(raw, include_components=False)
+
+    table = alerts.evaluate_alerts_frame(scored)
+    low = table[table["type"] == "LOW_SCORE"].set_index("ticker")
+    share = scored.set_index("ticker")["final_score"] / settings.SCORING_MAX_SCORE
+    assert set(low.index) == set(share.index[share < 0.45])
+    assert 0.05 < len(low) / n < 0.5
+    assert set(low.index[low["severity"] == "HIGH"]) == set(share.index[share < 0.40])
+    assert f"/{settings.SCORING_MAX_SCORE:.0f})" in low["message"].iloc[0]
+    # The Top 50 of the same universe stays clear
+    top = scorer.get_top_n(scored, 50)
+    assert not set(top["ticker"]) & set(low.index)
+
+    try:
+        rules.compile_rules([{**settings.ALERT_RULES[0], "scale": 10.0}])
+        assert False, "scale accepted on a change rule"
+    except rules.RuleError:
+        pass
+
+
+def test_rule_registry_compiles_and_instruments():
+    try:
+        rules.compile_rules([{**settings.ALERT_RULES[0], "comparison": "ratio"}])
+        assert False, "unknown comparison accepted"
+    except rules.RuleError:
+        pass
+    try:
+        rules.compile_rules([{**settings.ALERT_RULES[0], "message": "{missing}"}])
+        assert False, "unknown message field accepted"
+    except rules.RuleError:
+        pass
+
+    # 50 rules: the registry plus threshold variants, compiled once
+    registry = [{**rule, "type": f"{rule['type']}_{i}"} for i in range(6) for rule in settings.ALERT_RULES][:50]
+    compiled = rules.compile_rules(registry)
+    curr, prev = _snapshots(6000)
+    table = alerts.evaluate_alerts_frame(curr, prev, rules=compiled)
+    stats = compiled.stats()
+    assert len(stats) == 50 and (stats["calls"] == 1).all()
+    assert stats["hits"].sum() == len(table)
+    assert stats["total_ms"].sum() < 1000
+
+    # A new rule is config only
+    extra = rules.compile_rules([{"type": "CFO_NEGATIVE", "metric": "cfo", "comparison": "absolute",
+                                  "op": "<", "threshold": 0, "severity": "LOW", "message": "CFO {value:.0f}"}])
+    found = alerts.evaluate_alerts_frame(curr, rules=extra)
+    assert set(found["ticker"]) == set(curr.loc[curr["cfo"] < 0, "ticker"])
+
+
+def test_snapshot_store_alerts_match_csv_frames(tmp_path):
+    from src.storage import snapshot_store
+
+    # The brief evaluates the rules on snapshot store frames: they must carry every rule metric
+    metrics = {rule["metric"] for rule in settings.ALERT_RULES} - {"final_score"}
+    assert metrics <= set(settings.SNAPSHOT_STORE_METRICS)
+
+    curr, prev = _snapshots(150, seed=3)
+    store = snapshot_store.SnapshotStore(str(tmp_path / "store"))
+    store.append("2025-06-02", prev)
+    store.append("2025-06-03", curr)
+    (_, stored_curr), (_, stored_prev) = store.latest(2)
+
+    def key(table):
+        return sorted(zip(table["ticker"], table["type"].astype(str), table["severity"].astype(str)))
+    from_store = alerts.evaluate_alerts_frame(stored_curr, stored_prev)
+    assert key(from_store) == key(alerts.evaluate_alerts_frame(curr, prev))
+    assert set(from_store["type"].astype(str)) >= {"NEGATIVE_FCF", "SOLVENCY_RISK", "SCORE_DROP", "DEBT_SPIKE"}
+
+    # Snapshots written before the rule metrics were stored still read (as nulls), compacted too
+    metrics = settings.SNAPSHOT_STORE_METRICS
+    settings.SNAPSHOT_STORE_METRICS = ["debt_to_equity", "cfo"]
+    try:
+        old = snapshot_store.SnapshotStore(str(tmp_path / "old"))
+        old.append("2025-06-01", prev)
+    finally:
+        settings.SNAPSHOT_STORE_METRICS = metrics
+    old = snapshot_store.SnapshotStore(str(tmp_path / "old"))
+    old.append("2025-06-02", curr)
+    assert old.snapshot("2025-06-01")["roe"].isna().all()
+    old.compact()
+    (_, new), (_, older) = old.latest(2, columns=["roe", "cfo"])
+    assert older["roe"].isna().all() and older["cfo"].notna().any() and new["roe"].notna().all()
+
+
+if __name__ == "__main__":
+    test_frame_matches_per_company_rules()
+    test_missing_columns_and_no_previous()
+    test_low_score_fires_on_scored_universe()
+    test_rule_registry_compiles_and_instruments()
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_snapshot_store_alerts_match_csv_frames(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,93 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.llm_reasoning import generate_explanations, async_explanations, batch_explanations
+from src.llm_reasoning import explanation_cache, llm_client
+from benchmarks.fake_llm import FakeLLMServer
+
+TEMPLATE = os.path.join(settings.BASE_DIR, 'src', 'llm_reasoning', 'prompt_template.txt')
+
+
+def _prompts(n):
+    with open(TEMPLATE) as f:
+        template = f.read()
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({"ticker": [f"T{i:03d}.NS" for i in range(n)], "final_score": rng.uniform(3, 5, n),
+                         "roe": rng.uniform(0.1, 0.3, n), "sector": "N/A", "alerts": "None"})
+    return rows, [(row["ticker"], generate_explanations.render_prompt(template, row)) for _, row in rows.iterrows()]
+
+
+def test_batches_cut_round_trips_and_fall_back(tmp_path):
+    rows, prompts = _prompts(20)
+    input_file = str(tmp_path / "top.csv")
+    output_file = str(tmp_path / "llm_explanations.json")
+    rows.drop(columns=["sector", "alerts"]).to_csv(input_file, index=False)
+    cache = explanation_cache.ExplanationCache(str(tmp_path / "cache.json"))
+
+    with FakeLLMServer(latency=0.05, bad_tickers={"T003.NS"}) as server:
+        stats = generate_explanations.generate_explanations(
+            input_file, TEMPLATE, output_file, client=llm_client.HTTPClient(server.url), cache=cache,
+            batch_size=8, limiter=async_explanations.make_limiter(6000, burst=10))
+        # 3 batches (8 + 8 + 4) and one single-company retry for the malformed item
+        assert server.requests == 4
+        report = stats.report()
+        assert report["batch_fallbacks"] == 1 and report["ok"] == 4
+        assert report["companies_per_request"] == (8 + 8 + 4 + 1) / 4
+
+        # Batch answers are cached under the single-company prompt: single mode reuses them
+        results = async_explanations.run_explanations(
+            prompts, llm_client.HTTPClient(server.url), cache=cache, batch_size=1)
+        assert server.requests == 4
+
+    with open(output_file) as f:
+        explanations = json.load(f)
+    assert [e["ticker"] for e in explanations] == list(rows["ticker"])
+    assert all("4. Overall Verdict" in e["explanation"] for e in explanations)
+    assert results == {e["ticker"]: e["explanation"] for e in explanations}
+
+
+def test_parse_validates_items():
+    tickers = ["A", "B", "C"]
+    good = "1. Business Strength Summary\n...\n4. Overall Verdict\nBuy"
+    text = "```json\n" + json.dumps([
+        {"ticker": "A", "explanation": good},
+        {"ticker": "A", "explanation": good + " again"},  # duplicate: first wins
+        {"ticker": "B", "explanation": "no verdict"},
+        {"ticker": "Z", "explanation": good},            # not in the batch
+        {"ticker": ["C"], "explanation": good},
+        "C"
+    ]) + "\n```"
+    assert batch_explanations.parse_batch_response(text, tickers) == {"A": good}
+    assert batch_explanations.parse_batch_response("Sorry, I can't help with that.", tickers) == {}
+    assert batch_explanations.parse_batch_response('[{"ticker": "A", "explanation": ', tickers) == {}
+    assert batch_explanations.parse_batch_response('{"A": "x"}', tickers) == {}
+
+
+def test_batches_respect_size_and_token_budget():
+    _, prompts = _prompts(10)
+    jobs = [(t, p) for t, p in prompts]
+    cost = batch_explanations.estimate_tokens(batch_explanations.company_block(prompts[0][1])) + 100
+    assert [len(b) for b in batch_explanations.make_batches(jobs, 4, 10**6, 100)] == [4, 4, 2]
+    assert [len(b) for b in batch_explanations.make_batches(jobs, 10, 3 * cost + 5, 100)] == [3, 3, 3, 1]
+    # A company over the budget still goes out, alone
+    assert [len(b) for b in batch_explanations.make_batches(jobs[:2], 10, 1, 100)] == [1, 1]
+
+    batch_prompt = batch_explanations.render_batch_prompt(batch_explanations.load_batch_template(),
+                                                          [p for _, p in prompts[:3]])
+    assert "Company 3:\n- Company Name: T002.NS" in batch_prompt and "Output format" not in batch_prompt
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_batches_cut_round_trips_and_fall_back(pathlib.Path(d))
+    test_parse_validates_items()
+    test_batches_respect_size_and_token_budget()
+    print(">>> TEST PASSED SUCCESSFULLY")
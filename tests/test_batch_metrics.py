@@ -0,0 +1,58 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import compute_metrics, batch_metrics
+from benchmarks.synthetic import make_processed_rows
+
+
+def scalar_matrix(rows):
+    results = [compute_metrics.compute_all_metrics(row) for row in rows]
+    return np.array([[m[name] for name in batch_metrics.METRIC_NAMES] for m in results], dtype=float)
+
+
+def test_batch_matches_scalar_on_synthetic_universe():
+    rows = make_processed_rows(3000, seed=42)
+    batch = batch_metrics.compute_metrics_for_rows(rows)
+
+    assert list(batch.columns) == batch_metrics.METRIC_NAMES
+    expected = scalar_matrix(rows)
+    for j, name in enumerate(batch_metrics.METRIC_NAMES):
+        assert np.allclose(batch[name].to_numpy(), expected[:, j], rtol=1e-12, atol=0, equal_nan=True), name
+
+
+def test_batch_edge_cases():
+    nan = np.nan
+    rows = [
+        # Oldest year NaN -> CAGR NaN (scalar uses the last list element as-is)
+        {"ticker": "A", "revenue": 100.0, "hist_revenue": [100.0, 80.0, nan],
+         "hist_ebit": [40.0, 35.0], "hist_cap_employed": [100.0, 100.0, 100.0],
+         "cfo": 10.0, "capex": 5.0, "net_income": 0.0},
+        # Empty histories, zero denominators
+        {"ticker": "B", "revenue": 0.0, "hist_revenue": [], "hist_ebit": [],
+         "hist_cap_employed": [], "eps": 0.0, "price_current": 10.0,
+         "cfo": nan, "capex": 1.0, "net_income": 5.0},
+        # Single-year history, one ROCE below 30%
+        {"ticker": "C", "revenue": 50.0, "hist_revenue": [50.0], "hist_ebit": [10.0, 50.0],
+         "hist_cap_employed": [100.0, 100.0], "hist_eps": [nan, nan],
+         "price_current": 0.0, "price_1y_ago": 0.0, "cfo": 3.0, "capex": 1.0},
+    ]
+    batch = batch_metrics.compute_metrics_for_rows(rows)
+    expected = scalar_matrix(rows)
+    assert np.allclose(batch.to_numpy(), expected, equal_nan=True)
+
+    assert np.isnan(batch.loc[0, "revenue_growth_10y"])
+    assert batch.loc[0, "coc_roce_check"] == 1.0
+    assert batch.loc[1, "coc_roce_check"] == 0.0
+    assert batch.loc[2, "coc_roce_check"] == 0.0
+    assert np.isnan(batch.loc[1, "pe_ratio"])
+
+
+if __name__ == "__main__":
+    test_batch_matches_scalar_on_synthetic_universe()
+    test_batch_edge_cases()
+    print(">>> TEST PASSED SUCCESSFULLY")
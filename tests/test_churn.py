@@ -0,0 +1,77 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.monitoring import churn
+from src.storage import snapshot_store
+
+
+def _replay(ranks, **kwargs):
+    """Actions of churn_step over a (dates, tickers) rank matrix, from an empty portfolio."""
+    held = np.zeros(ranks.shape[1], dtype=bool)
+    held_days = np.zeros(ranks.shape[1], dtype=np.int64)
+    actions = []
+    for row in ranks:
+        step, _, held, held_days = churn.churn_step(row, held, held_days, **kwargs)
+        actions.append(churn.ACTIONS[step])
+    return np.array(actions)
+
+
+def test_bands_and_min_hold():
+    # Ticker 0 oscillates around rank 50, ticker 1 spikes to rank 10 then falls to 80
+    ranks = np.array([[48, 10], [53, 80], [49, 80], [52, 80], [47, 80], [55, 80], [58, 80]])
+    legacy = _replay(ranks, entry_rank=50, exit_rank=50, min_hold=0)
+    assert list(legacy[:, 0]) == ["ADD", "REMOVE", "ADD", "REMOVE", "ADD", "REMOVE", ""]
+    # Same as decide_churn's threshold on every held day
+    assert all((a == "REMOVE") == (churn.decide_churn(r, [])["action"] == "REMOVE")
+               for a, r in zip(legacy[:, 0], ranks[:, 0]) if a in ("KEEP", "REMOVE"))
+
+    sticky = _replay(ranks, entry_rank=40, exit_rank=60, min_hold=3)
+    assert list(sticky[:, 0]) == [""] * 7
+    assert list(sticky[:, 1]) == ["ADD", "KEEP", "KEEP", "REMOVE", "", "", ""]
+
+    # Alert-forced exits ignore the bands and the holding period
+    forced = np.zeros(2, dtype=bool)
+    forced[1] = True
+    actions, reasons, held, _ = churn.churn_step(np.array([0, 5]), np.array([True, True]), np.array([0, 0]),
+                                                 forced_exit=forced, entry_rank=40, exit_rank=60, min_hold=3)
+    assert list(churn.ACTIONS[actions]) == ["KEEP", "REMOVE"] and list(held) == [True, False]
+    assert churn.REASONS[reasons[1]] == "Alert-forced exit"
+
+
+def test_replay_over_snapshot_store(tmp_path):
+    store = snapshot_store.SnapshotStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i:03d}" for i in range(300)]
+    base = rng.normal(50, 10, len(tickers))
+    dates = [str(d.date()) for d in pd.date_range("2025-01-01", periods=30)]
+    for d, date in enumerate(dates):
+        scores = base + rng.normal(0, 1, len(tickers))
+        cfo = np.full(len(tickers), 100.0)
+        if d == 20:
+            cfo[int(np.argmax(base))] = 10.0  # best ticker's cash flow collapses once
+        store.append(date, pd.DataFrame({"ticker": tickers, "final_score": scores, "cfo": cfo}))
+
+    sticky = churn.replay_churn(store, entry_rank=40, exit_rank=60, min_hold=5)
+    naive = churn.replay_churn(store, entry_rank=50, exit_rank=50, min_hold=0, forced_alerts=[])
+    assert sticky["summary"]["trades"] < naive["summary"]["trades"]
+    assert sticky["summary"]["avg_turnover"] < naive["summary"]["avg_turnover"]
+
+    exits = sticky["decisions"]
+    forced = exits[exits["reason"] == "Alert-forced exit"]
+    assert list(forced[["date", "ticker"]].itertuples(index=False, name=None)) == [(dates[20], tickers[int(np.argmax(base))])]
+    assert sticky["summary"]["forced_exits"] == 1
+    assert set(sticky["latest"]["action"]) <= {"ADD", "KEEP", "REMOVE"}
+    assert sticky["turnover"]["holdings"].iloc[-1] == (sticky["latest"]["action"] != "REMOVE").sum()
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_bands_and_min_hold()
+    with tempfile.TemporaryDirectory() as d:
+        test_replay_over_snapshot_store(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,89 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.llm_reasoning import generate_explanations, async_explanations, explanation_cache, llm_client
+from benchmarks.fake_llm import FakeLLMServer
+
+TEMPLATE = os.path.join(settings.BASE_DIR, 'src', 'llm_reasoning', 'prompt_template.txt')
+
+
+def _top(tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    return pd.DataFrame({
+        "ticker": tickers,
+        "final_score": rng.uniform(3, 5, n),
+        "roe": rng.uniform(0.1, 0.3, n),
+        "roce": rng.uniform(0.1, 0.3, n),
+        "debt_to_equity": rng.uniform(0, 1, n)
+    })
+
+
+def test_unchanged_companies_reuse_cached_text(tmp_path):
+    cache_path = str(tmp_path / "llm_cache.json")
+    output_file = str(tmp_path / "llm_explanations.json")
+    day1 = _top([f"T{i:03d}.NS" for i in range(10)])
+    # Day 2: one company's metrics moved, one left the list and a new one entered
+    day2 = pd.concat([day1.iloc[:9], _top(["NEW.NS"], seed=1)], ignore_index=True)
+    day2.loc[3, "roe"] += 0.05
+    day2.loc[5, "final_score"] += 0.0001  # below the template's 2-decimal rounding: same prompt
+
+    def run(top, model=None):
+        path = str(tmp_path / "top.csv")
+        top.to_csv(path, index=False)
+        client = llm_client.HTTPClient(server.url, model_name=model)
+        return generate_explanations.generate_explanations(
+            path, TEMPLATE, output_file, client=client, cache=explanation_cache.ExplanationCache(cache_path),
+            limiter=async_explanations.make_limiter(6000, burst=10))
+
+    with FakeLLMServer(latency=0.0) as server:
+        first = run(day1)
+        assert server.requests == 10 and first.report()["cache_hits"] == 0
+        second = run(day2)
+        assert server.requests == 12
+        report = second.report()
+        assert (report["cache_hits"], report["cache_misses"], report["requests"]) == (8, 2, 2)
+        assert report["cache_hit_rate"] == 0.8
+        # A different model never reuses another model's text
+        run(day2, model="other-model")
+        assert server.requests == 22
+
+    results = pd.read_json(output_file)
+    assert list(results["ticker"]) == list(day2["ticker"])
+    assert len(explanation_cache.ExplanationCache(cache_path).entries) == 22
+
+
+def test_age_and_size_eviction(tmp_path):
+    now = [1_000_000.0]
+    cache = explanation_cache.ExplanationCache(str(tmp_path / "c.json"), max_age_days=2, max_entries=3,
+                                               clock=lambda: now[0])
+    for i in range(4):
+        cache.put(f"prompt {i}", "m", f"text {i}")
+        now[0] += 3600
+    assert cache.get("prompt 0", "m") == "text 0"  # most recently used now
+    cache.flush()
+    assert set(e["text"] for e in cache.entries.values()) == {"text 0", "text 2", "text 3"}
+    assert cache.stats()["evictions"] == 1
+
+    # Two days after it was written an entry expires, even if it was read since
+    now[0] = 1_000_000.0 + 2 * 86400
+    assert cache.get("prompt 0", "m") is None
+    assert cache.get("prompt 3", "m") == "text 3"
+    cache.flush()
+    reloaded = explanation_cache.ExplanationCache(str(tmp_path / "c.json"), clock=lambda: now[0])
+    assert len(reloaded.entries) == 2
+    assert cache.stats()["expired"] == 1 and cache.stats()["hit_rate"] == 2 / 3
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in [test_unchanged_companies_reuse_cached_text, test_age_and_size_eviction]:
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,65 @@
+import sys
+import os
+import pandas as pd
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_ingestion import processor, history_block
+from src.metrics import compute_metrics, batch_metrics
+from benchmarks.synthetic import make_processed_rows
+from tests.test_async_ingestion import FakeProvider
+
+
+def test_processor_aligns_histories_on_fiscal_years():
+    provider = FakeProvider()
+    raw = {st: provider._payload("T0", st) for st in ["financials", "balance_sheet", "cashflow", "history", "info"]}
+    # Balance sheet is missing FY2024
+    raw["balance_sheet"] = raw["balance_sheet"].drop(columns=pd.Timestamp("2024-03-31"))
+
+    row = processor.process_ticker_data("T0", raw)
+
+    assert row["hist_years"].tolist() == [2025, 2024, 2023, 2022]
+    assert row["hist_revenue"].dtype == np.float64
+    assert row["hist_revenue"].tolist() == [1000, 900, 800, 700]
+    # The gap is NaN at FY2024 rather than shifting older equity values forward
+    assert np.isnan(row["hist_equity"][1])
+    assert row["hist_equity"][2] == 460
+    assert row["hist_cap_employed"][0] == 900 - 200
+
+    # Scalar metrics accept arrays
+    metrics = compute_metrics.compute_all_metrics(row)
+    assert np.isclose(metrics["roe_10y"], np.mean([100 / 500, 80 / 460, 70 / 440]))
+
+
+def test_block_metrics_match_scalar():
+    rows = make_processed_rows(2000, seed=7, typed=True)
+    block = history_block.HistoryBlock.from_rows(rows)
+
+    assert block.values["hist_revenue"].shape == (2000, 10)
+    assert (block.lengths() == [len(r["hist_years"]) for r in rows]).all()
+
+    batch = batch_metrics.compute_metrics_for_rows(rows)
+    expected = np.array([[compute_metrics.compute_all_metrics(r)[name] for name in batch_metrics.METRIC_NAMES]
+                         for r in rows], dtype=float)
+    assert np.allclose(batch.to_numpy(), expected, rtol=1e-12, atol=0, equal_nan=True)
+
+
+def test_dedupe_keeps_latest_row():
+    rows = make_processed_rows(5, seed=1, typed=True)
+    # SYN000002 re-processed later with new values
+    updated = dict(rows[2], hist_revenue=np.full(len(rows[2]["hist_years"]), 7.0))
+    block = history_block.HistoryBlock.from_rows(rows + [updated]).dedupe_last()
+
+    assert sorted(block.tickers) == [r["ticker"] for r in rows]
+    restored = block.row(list(block.tickers).index("SYN000002"))
+    assert (restored["hist_revenue"] == 7.0).all()
+    assert restored["hist_years"].tolist() == rows[2]["hist_years"].tolist()
+
+
+if __name__ == "__main__":
+    test_processor_aligns_histories_on_fiscal_years()
+    test_block_metrics_match_scalar()
+    test_dedupe_keeps_latest_row()
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,91 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_ingestion import incremental, raw_cache, checkpoint
+from src.metrics import batch_metrics
+from src.pipeline import run_data_pipeline
+from src.storage import feature_store
+from tests.test_async_ingestion import FakeProvider
+
+
+class NextDayProvider(FakeProvider):
+    """Day-2 data: T0 files new statements, T1's price moves, everything else is unchanged."""
+
+    def _payload(self, ticker, statement_type):
+        payload = super()._payload(ticker, statement_type)
+        if ticker == "T0" and statement_type == "financials":
+            payload = payload * 1.1
+        if ticker == "T1" and statement_type == "history":
+            payload = payload * 1.5
+        return payload
+
+
+def _raw(provider, ticker):
+    return {st: provider._payload(ticker, st) for st in ["financials", "balance_sheet", "cashflow", "history", "info"]}
+
+
+def test_fingerprints_split_statements_and_prices(tmp_path):
+    day1, day2 = _raw(FakeProvider(), "T1"), _raw(NextDayProvider(), "T1")
+    fp_s1, fp_p1 = incremental.fingerprints("T1", day1)
+    fp_s2, fp_p2 = incremental.fingerprints("T1", day2)
+    assert fp_s1 == fp_s2 and fp_p1 != fp_p2
+
+    # Cached content hashes give the same fingerprint without re-serializing
+    cache = raw_cache.RawStatementCache(str(tmp_path))
+    for st, payload in day1.items():
+        cache.put("T1", st, payload)
+    assert incremental.fingerprints("T1", day1, cache) == (fp_s1, fp_p1)
+
+
+def test_incremental_run_matches_full_recompute(tmp_path):
+    tickers = [f"T{i}" for i in range(8)]
+    store = feature_store.FeatureStore(str(tmp_path / "store"))
+    run_data_pipeline.run_async(tickers, store, provider=FakeProvider(delay=0), run_date="2025-06-02")
+
+    previous = incremental.PreviousRun(store, store.previous_run_date("2025-06-03"))
+    assert previous.run_date == "2025-06-02" and len(previous) == len(tickers)
+
+    rows = [incremental.build_row(t, _raw(NextDayProvider(), t), previous) for t in tickers]
+    kinds = {row["ticker"]: row[incremental.REFRESH_KEY] for row in rows}
+    assert kinds["T0"] == incremental.REFRESH_FULL
+    assert kinds["T1"] == incremental.REFRESH_MARKET
+    assert incremental.refresh_counts(rows) == {"full": 1, "market": 1, "carried": 6}
+
+    # Same result as processing everything from scratch
+    incremental_df = pd.DataFrame(run_data_pipeline.add_metrics(rows))
+    full_rows = [incremental.build_row(t, _raw(NextDayProvider(), t)) for t in tickers]
+    full_df = pd.DataFrame(run_data_pipeline.add_metrics(full_rows))
+    for col in batch_metrics.METRIC_NAMES + ["revenue", "price_current"]:
+        assert np.allclose(incremental_df[col], full_df[col], equal_nan=True), col
+    assert incremental_df.loc[1, "price_current"] == 1.5 * 120
+
+
+def test_failed_tickers_carried_forward(tmp_path):
+    tickers = ["T0", "T1", "GONE", "BROKEN"]
+    store = feature_store.FeatureStore(str(tmp_path / "store"))
+    run_data_pipeline.run_async(tickers, store, provider=FakeProvider(delay=0), run_date="2025-06-02")
+
+    journal = checkpoint.CheckpointLog(str(tmp_path / "checkpoint.jsonl"))
+    provider = FakeProvider(delay=0, empty_tickers={"GONE"}, failing={"BROKEN"})
+    previous = incremental.PreviousRun(store, "2025-06-02")
+    run_data_pipeline.run_async(["T0", "T1", "GONE"], store, provider=provider, run_date="2025-06-03",
+                                journal=journal, previous=previous)
+    journal.record("BROKEN", checkpoint.STATUS_ERROR, "HTTP 500", run_date="2025-06-03")
+
+    carried = run_data_pipeline.carry_forward_missing(store, "2025-06-02", "2025-06-03", tickers, journal)
+    assert carried == 1
+    assert store.tickers(run_date="2025-06-03") == {"T0", "T1", "BROKEN"}
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in [test_fingerprints_split_statements_and_prices, test_incremental_run_matches_full_recompute,
+                 test_failed_tickers_carried_forward]:
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,181 @@
+import sys
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.llm_reasoning import generate_explanations, async_explanations, llm_client, explanation_stream, compile_report
+from src.llm_reasoning import explanation_cache, explanation_sections
+from benchmarks.fake_llm import FakeLLMServer
+
+TEMPLATE = os.path.join(settings.BASE_DIR, 'src', 'llm_reasoning', 'prompt_template.txt')
+
+
+def _top_csv(path, n):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "ticker": [f"T{i:03d}.NS" for i in range(n)],
+        "final_score": rng.uniform(3, 5, n),
+        "roe": rng.uniform(0.1, 0.3, n),
+        "roce": rng.uniform(0.1, 0.3, n),
+        "debt_to_equity": rng.uniform(0, 1, n)
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_concurrent_generation_with_retries(tmp_path):
+    input_file = _top_csv(tmp_path / "top.csv", 20)
+    output_file = str(tmp_path / "llm_explanations.json")
+    base = settings.LLM_RETRY_BACKOFF_BASE_SEC
+    settings.LLM_RETRY_BACKOFF_BASE_SEC = 0.01
+    try:
+        # Every prompt fails once with a 500, and every 7th request is throttled
+        with FakeLLMServer(latency=0.1, fail_first=1, throttle_every=7) as server:
+            started = time.perf_counter()
+            stats = generate_explanations.generate_explanations(
+                input_file, TEMPLATE, output_file, client=llm_client.HTTPClient(server.url),
+                max_concurrency=4, limiter=async_explanations.make_limiter(6000, burst=10))
+            elapsed = time.perf_counter() - started
+    finally:
+        settings.LLM_RETRY_BACKOFF_BASE_SEC = base
+
+    with open(output_file) as f:
+        results = json.load(f)
+    assert [r["ticker"] for r in results] == list(pd.read_csv(input_file)["ticker"])
+    assert all(r["explanation"].startswith("1. Business Strength Summary") for r in results)
+
+    # Bounded pool: several requests in flight, never more than the pool size
+    assert 1 < server.peak <= 4
+    # 40+ calls of 100ms each; sequential would take over 4s
+    assert server.requests >= 40 and elapsed < 3.0
+
+    report = stats.report()
+    assert report["ok"] == 20 and report["failed"] == 0
+    assert report["retries"] == server.requests - 20 and report["throttled"] >= 1
+    assert report["call_p50_ms"] >= 100 and report["requests_per_sec"] > 0
+    requests = pd.read_csv(str(tmp_path / "llm_explanations_requests.csv"))
+    assert len(requests) == 20 and (requests["attempts"] >= 2).all()
+    stream = explanation_stream.ExplanationStream(str(tmp_path / "llm_explanations.ndjson"))
+    assert stream.explanations() == results
+
+
+def test_rate_limit_and_stream_resume(tmp_path):
+    input_file = _top_csv(tmp_path / "top.csv", 10)
+    output_file = str(tmp_path / "llm_explanations.json")
+    with open(TEMPLATE) as f:
+        template = f.read()
+    rows = pd.read_csv(input_file).assign(sector="N/A", alerts="None")
+
+    # A killed run left 4 finished explanations (plus a torn line) and one stale prompt
+    stream_file = str(tmp_path / "llm_explanations.ndjson")
+    stream = explanation_stream.ExplanationStream(stream_file)
+    for _, row in rows.head(4).iterrows():
+        stream.add(row["ticker"], explanation_cache.cache_key(generate_explanations.render_prompt(template, row),
+                                                         settings.LLM_MODEL), f"cached {row['ticker']}")
+    stream.add(rows["ticker"].iloc[4], "stale", "old prompt")
+    stream.close()
+    with open(stream_file, "a") as f:
+        f.write('{"type": "explanation", "ticker": "T009.NS", "prompt')
+
+    with FakeLLMServer(latency=0.0) as server:
+        stats = generate_explanations.generate_explanations(
+            input_file, TEMPLATE, output_file, client=llm_client.HTTPClient(server.url),
+            limiter=async_explanations.make_limiter(600, burst=1))
+
+    assert server.requests == 6 and stats.resumed == 4
+    # 600 RPM = one request per 100ms, after the single burst token
+    gaps = np.diff(server.request_times)
+    assert gaps.min() >= 0.08
+    with open(output_file) as f:
+        results = {r["ticker"]: r["explanation"] for r in json.load(f)}
+    assert results["T000.NS"] == "cached T000.NS"
+    assert results["T004.NS"] != "old prompt"
+    # The stream now holds this run only: header, 4 carried over, 6 new
+    with open(stream_file) as f:
+        assert len(f.readlines()) == 11
+
+
+def test_failed_requests_are_not_resumed(tmp_path):
+    prompts = [("A", "prompt a"), ("B", "prompt b")]
+    stream = explanation_stream.ExplanationStream(str(tmp_path / "stream.ndjson"))
+    with FakeLLMServer(latency=0.0, fail_first=1) as server:
+        results = async_explanations.run_explanations(
+            prompts, llm_client.HTTPClient(server.url), max_retries=0, partial=stream,
+            limiter=async_explanations.make_limiter(6000))
+    stream.close()
+    assert results == {"A": async_explanations.FAILED_EXPLANATION, "B": async_explanations.FAILED_EXPLANATION}
+    reread = explanation_stream.ExplanationStream(str(tmp_path / "stream.ndjson"))
+    assert reread.lookup("A")["status"] == "failed"
+    assert reread.get("A", explanation_cache.cache_key("prompt a", settings.LLM_MODEL)) is None
+
+
+def test_report_follows_the_stream(tmp_path):
+    stream = explanation_stream.ExplanationStream(str(tmp_path / "llm_explanations.ndjson"))
+    stream.begin([("A", "a"), ("B", "b"), ("C", "c")])
+    output_file = str(tmp_path / "top_50_analysis.md")
+    builder = compile_report.ReportBuilder(stream, output_file)
+
+    # C arrives first: nothing after the header until A and B are in
+    stream.add("C", "c", "text C")
+    assert builder.update() == 0
+    stream.add("A", "a", "text A")
+    assert builder.update() == 1
+    # Another process appends B; the builder only reads the new bytes
+    other = explanation_stream.ExplanationStream(stream.path)
+    other.add("B", "b", "text B")
+    assert builder.update() == 2
+    with open(output_file, encoding="utf-8") as f:
+        report = f.read()
+    assert report.index("Rank 1 – A") < report.index("text B") < report.index("Rank 3 – C")
+
+    # A section already written gets a new explanation: the file is rebuilt
+    other.add("A", "a", "text A v2")
+    assert builder.update() == 3
+    with open(output_file, encoding="utf-8") as f:
+        report = f.read()
+    assert "text A v2" in report and "text A\n" not in report and report.count("Rank 2") == 1
+
+    # One-shot compile of the stream matches the incremental build
+    compile_report.compile_report(stream.path, str(tmp_path / "full.md"))
+    with open(str(tmp_path / "full.md"), encoding="utf-8") as f:
+        assert f.read() == report
+
+
+
+def test_sections_parsed_once_and_indexed(tmp_path):
+    text = ("**1. Business Strength Summary:** Market leader\nwith pricing power.\n\n"
+            "**2. Key Fundamental Strengths**\n* ROE of 25%\n- Net cash\n3) Steady growth\n"
+            "### 3. Potential Risks to Monitor (1–2 bullet points)\n• Input costs\n"
+            "4. Overall Verdict: **Buy** - quality compounder\nExtra line.")
+    assert explanation_sections.parse_sections(text) == {
+        "summary": "Market leader with pricing power.",
+        "strengths": ["ROE of 25%", "Net cash", "Steady growth"],
+        "risks": ["Input costs"],
+        "verdict": "Buy - quality compounder"
+    }
+    assert explanation_sections.parse_sections("Sorry, no analysis.")["verdict"] is None
+
+    stream = explanation_stream.ExplanationStream(str(tmp_path / "llm_explanations.ndjson"))
+    stream.begin([("A", "a"), ("B", "b"), ("C", "c")])
+    stream.add("A", "a", text)
+    stream.add("B", "b", async_explanations.FAILED_EXPLANATION, status="failed")
+    assert stream.sections("A")["risks"] == ["Input costs"]
+    # Verdicts come from the in-memory index; readers never see the text
+    reader = explanation_stream.ExplanationStream(stream.path)
+    reader._read = None
+    assert reader.verdicts() == {"A": "Buy - quality compounder", "B": None, "C": None}
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in [test_concurrent_generation_with_retries, test_rate_limit_and_stream_resume,
+                 test_failed_requests_are_not_resumed, test_report_follows_the_stream,
+                 test_sections_parsed_once_and_indexed]:
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
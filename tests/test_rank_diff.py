@@ -0,0 +1,66 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.monitoring import rank_diff
+
+
+def _legacy_diff(df_curr, df_prev, min_move=3):
+    # The per-ticker list.index loops generate_daily_brief used on top-50 CSVs
+    curr_tickers, prev_tickers = set(df_curr['ticker']), set(df_prev['ticker'])
+    entrants = {t: list(df_curr['ticker']).index(t) + 1 for t in curr_tickers - prev_tickers}
+    exits = {t: list(df_prev['ticker']).index(t) + 1 for t in prev_tickers - curr_tickers}
+    movers = {}
+    for t in curr_tickers & prev_tickers:
+        rank_curr = list(df_curr['ticker']).index(t) + 1
+        diff = list(df_prev['ticker']).index(t) + 1 - rank_curr
+        if abs(diff) >= min_move:
+            movers[t] = diff
+    return entrants, exits, movers
+
+
+def _universe(n, seed):
+    rng = np.random.default_rng(seed)
+    tickers = np.array([f"T{i:04d}" for i in range(n)])
+    return pd.DataFrame({"ticker": tickers[rng.permutation(n)], "rank": np.arange(1, n + 1)})
+
+
+def test_top_n_matches_legacy_lists():
+    curr = _universe(300, 1)
+    # Previous order = current ranks plus noise: small and large moves, entrants and exits
+    noise = np.random.default_rng(2).normal(0, 15, len(curr))
+    prev = pd.DataFrame({"ticker": curr["ticker"].to_numpy()[np.argsort(curr["rank"] + noise)],
+                         "rank": np.arange(1, len(curr) + 1)})
+    for top_n in [50, 100]:
+        diff = rank_diff.diff_ranks(curr, prev, top_n=top_n)
+        entrants, exits, movers = _legacy_diff(curr.head(top_n), prev.head(top_n))
+        assert dict(zip(diff.entrants["ticker"], diff.entrants["rank"])) == entrants
+        assert dict(zip(diff.exits["ticker"], diff.exits["prev_rank"])) == exits
+        assert dict(zip(diff.movers["ticker"], diff.movers["change"])) == movers
+        assert list(diff.movers["change"]) == sorted(diff.movers["change"], reverse=True)
+        # Exits know where they rank now (the snapshots hold the whole universe)
+        assert diff.exits["rank"].gt(top_n).all()
+
+
+def test_full_universe_and_serialization():
+    curr = _universe(200, 3)
+    prev = curr.iloc[10:].assign(rank=np.arange(1, 191))
+    diff = rank_diff.diff_ranks(curr, prev, top_n=None, min_move=1, date="2025-06-02")
+    assert set(diff.entrants["ticker"]) == set(curr["ticker"].head(10))
+    assert diff.entrants["prev_rank"].isna().all() and diff.exits.empty
+    assert (diff.movers["change"] == -10).all() and len(diff.movers) == 190
+
+    payload = json.loads(json.dumps(diff.to_dict()))
+    assert payload["date"] == "2025-06-02" and payload["top_n"] is None
+    assert payload["entrants"][0] == {"ticker": curr["ticker"].iloc[0], "rank": 1, "prev_rank": None}
+
+
+if __name__ == "__main__":
+    test_top_n_matches_legacy_lists()
+    test_full_universe_and_serialization()
+    print(">>> TEST PASSED SUCCESSFULLY")
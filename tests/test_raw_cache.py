@@ -0,0 +1,103 @@
+import sys
+import os
+import time
+import pandas as pd
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_ingestion import raw_cache, async_ingestion
+from tests.test_async_ingestion import FakeProvider
+
+
+def test_payload_roundtrip():
+    provider = FakeProvider()
+    for statement_type in ["financials", "history", "info"]:
+        payload = provider._payload("T0", statement_type)
+        restored = raw_cache.deserialize_payload(raw_cache.serialize_payload(payload))
+        if isinstance(payload, dict):
+            assert restored == payload
+        else:
+            pd.testing.assert_frame_equal(restored, payload, check_dtype=False, check_freq=False)
+            assert type(restored.columns) is type(payload.columns)
+
+
+def test_content_addressing_and_ttl(tmp_path):
+    cache = raw_cache.RawStatementCache(str(tmp_path), ttl_days={"financials": 90, "history": 1})
+    frame = FakeProvider()._payload("T0", "financials")
+
+    h1 = cache.put("AAA", "financials", frame)
+    h2 = cache.put("BBB", "financials", frame.copy())
+    assert h1 == h2  # identical payloads share one blob
+    assert cache.total_bytes() == cache.index["AAA/financials"]["size"]
+
+    assert cache.get("AAA", "financials") is not None
+    assert cache.get("CCC", "financials") is None
+
+    # Price entry fetched yesterday is stale today, annual one is not
+    cache.put("AAA", "history", FakeProvider()._payload("T0", "history"))
+    yesterday = time.time() - 86400
+    cache.index["AAA/history"]["fetched_at"] = yesterday
+    cache.index["AAA/financials"]["fetched_at"] = yesterday
+    assert cache.get("AAA", "history") is None
+    assert cache.get("AAA", "financials") is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["expired"] == 1
+
+    # Index survives a restart
+    cache.flush()
+    reopened = raw_cache.RawStatementCache(str(tmp_path))
+    assert reopened.content_hash("BBB", "financials") == h1
+
+
+def test_lru_eviction(tmp_path):
+    provider = FakeProvider()
+    cache = raw_cache.RawStatementCache(str(tmp_path), max_bytes=10 ** 9)
+    for i in range(5):
+        frame = provider._payload("T0", "financials") * (i + 1)
+        cache.put(f"T{i}", "financials", frame)
+        cache.index[f"T{i}/financials"]["last_access"] = i
+    cache.get("T0", "financials")  # most recently used now
+
+    blob_size = cache.index["T1/financials"]["size"]
+    cache.max_bytes = blob_size * 3
+    cache._evict_if_needed()
+
+    assert "T0/financials" in cache.index
+    assert "T1/financials" not in cache.index
+    assert cache.total_bytes() <= cache.max_bytes
+    blobs = [f for _, _, files in os.walk(cache.objects_dir) for f in files]
+    assert len(blobs) == len({e["hash"] for e in cache.index.values()})
+
+
+def test_warm_run_only_fetches_prices(tmp_path):
+    tickers = [f"T{i}" for i in range(10)]
+    # ttl 0 for prices/info simulates the next day's run
+    ttl = {"financials": 90, "balance_sheet": 90, "cashflow": 90, "history": 0, "info": 0}
+
+    cold = FakeProvider(delay=0)
+    cache = raw_cache.RawStatementCache(str(tmp_path), ttl_days=ttl)
+    async_ingestion.run_ingestion(tickers, provider=cold, cache=cache)
+    assert cold.calls == 5 * len(tickers)
+    cache.flush()
+
+    warm = FakeProvider(delay=0)
+    cache = raw_cache.RawStatementCache(str(tmp_path), ttl_days=ttl)
+    received = {}
+    async_ingestion.run_ingestion(tickers, on_result=received.__setitem__, provider=warm, cache=cache)
+    assert warm.calls == 2 * len(tickers)
+    assert set(warm.endpoint_peak) == {"history", "info"}
+    assert all(raw is not None for raw in received.values())
+    assert cache.stats()["hits"] == 3 * len(tickers)
+    print(cache.format_summary())
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_payload_roundtrip()
+    for test in [test_content_addressing_and_ttl, test_lru_eviction, test_warm_run_only_fetches_prices]:
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.scoring import scorer, scenarios
+from tests.test_scorer import _universe as _raw_universe
+
+
+def _universe(n):
+    # Placeholder metrics are all-NaN in the synthetic data, which makes every score NaN
+    df = _raw_universe(n)
+    empty = [m for m in settings.SCORING_WEIGHTS if m in df.columns and df[m].isna().all()]
+    return df.assign(**{m: 0.0 for m in empty})
+
+
+def test_scenarios_match_normalize_metrics():
+    df = _universe(800)
+    doubled = {m: 2 * w for m, w in settings.SCORING_WEIGHTS.items()}
+    only_pe = {"pe_ratio": 1.0}
+    result = scenarios.score_scenarios(df, {"baseline": settings.SCORING_WEIGHTS, "doubled": doubled,
+                                            "only_pe": only_pe}, n=50)
+
+    expected = scorer.normalize_metrics(df, include_components=False)
+    assert np.allclose(result["scores"]["baseline"].to_numpy(), expected["final_score"].to_numpy())
+    assert result["top"]["baseline"].tolist() == scorer.get_top_n(expected, n=50)["ticker"].tolist()
+
+    # Scaling every weight doesn't move the list; a single-metric weighting does
+    overlap = result["overlap"]
+    assert overlap.loc["baseline", "doubled"] == 50 and overlap.loc["only_pe", "only_pe"] == 50
+    summary = scenarios.compare_to_baseline(result)
+    assert summary.loc["doubled", "turnover"] == 0.0
+    assert summary.loc["only_pe", "turnover"] > 0
+    assert len(summary.loc["only_pe", "entered"]) == len(summary.loc["only_pe", "exited"])
+
+
+def test_hundreds_of_scenarios_in_one_pass():
+    df = _universe(6000)
+    start = time.perf_counter()
+    result = scenarios.score_scenarios(df, scenarios.random_scenarios(300, seed=1))
+    assert time.perf_counter() - start < 10
+    assert result["scores"].shape == (6000, 301)
+    assert (np.diag(result["overlap"].to_numpy()) == 50).all()
+
+
+if __name__ == "__main__":
+    test_scenarios_match_normalize_metrics()
+    test_hundreds_of_scenarios_in_one_pass()
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,112 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.scoring import scorer
+from src.scoring.rank_index import RankIndex
+from src.metrics import batch_metrics
+from benchmarks.synthetic import make_processed_rows
+
+
+def legacy_normalize_metrics(df):
+    """Per-metric pandas loop the vectorized kernel replaced (reference output)."""
+    scored_df = df.copy()
+    scored_df['final_score'] = 0.0
+    for metric, weight in settings.SCORING_WEIGHTS.items():
+        if metric not in scored_df.columns:
+            continue
+        scored_df[metric] = pd.to_numeric(scored_df[metric], errors='coerce')
+        series = scored_df[metric]
+        if metric in settings.LOWER_IS_BETTER:
+            percentile = series.fillna(series.max()).rank(pct=True, ascending=True)
+            score_contribution = (1 - percentile) * weight
+        else:
+            percentile = series.fillna(series.min()).rank(pct=True, ascending=True)
+            score_contribution = percentile * weight
+        scored_df['final_score'] += score_contribution
+        scored_df[f'score_{metric}'] = score_contribution
+    return scored_df
+
+
+def _universe(n, seed=0):
+    rows = make_processed_rows(n, seed=seed, typed=True)
+    metrics = batch_metrics.compute_metrics_for_rows(rows)
+    df = pd.DataFrame([{"ticker": r["ticker"]} for r in rows]).join(metrics)
+    # Ties, strings, an all-NaN metric and a non-default index
+    df["coc_roce_check"] = np.where(np.arange(n) % 3 == 0, 1.0, 0.0)
+    df["eps_growth"] = df["eps_growth"].round(1)
+    df["market_share"] = np.nan
+    df["pe_ratio"] = df["pe_ratio"].astype(object)
+    df.loc[df.index[::7], "pe_ratio"] = "N/A"
+    df.index = df.index * 2 + 10
+    return df
+
+
+def test_percentile_ranks_match_pandas():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 5, size=(200, 4)).astype(float)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[:, 3] = np.nan
+    expected = pd.DataFrame(values).rank(pct=True).to_numpy()
+    assert np.array_equal(scorer.percentile_ranks(values.T.copy()).T, expected, equal_nan=True)
+
+
+def test_normalize_metrics_identical_to_legacy_loop():
+    df = _universe(500)
+    expected = legacy_normalize_metrics(df)
+    got = scorer.normalize_metrics(df)
+    pd.testing.assert_frame_equal(got, expected, check_exact=True)
+
+    slim = scorer.normalize_metrics(df, include_components=False)
+    assert not any(c.startswith("score_") for c in slim.columns)
+    assert np.array_equal(slim["final_score"].to_numpy(), expected["final_score"].to_numpy(), equal_nan=True)
+
+
+def test_top_n_matches_stable_sort_with_ties():
+    rng = np.random.default_rng(2)
+    scores = rng.integers(0, 20, size=1000).astype(float)
+    scores[rng.random(1000) < 0.05] = np.nan
+    df = pd.DataFrame({"ticker": [f"T{i}" for i in range(1000)], "final_score": scores})
+
+    expected = df.sort_values("final_score", ascending=False, kind="stable").head(50)
+    pd.testing.assert_frame_equal(scorer.get_top_n(df, n=50), expected)
+    # Fewer valid scores than n: NaNs fill the tail in input order
+    head = df.head(30)
+    assert scorer.get_top_n(head, n=40)["ticker"].tolist() == \
+        head.sort_values("final_score", ascending=False, kind="stable")["ticker"].tolist()
+
+
+def test_rank_index_updates_match_full_resort():
+    rng = np.random.default_rng(3)
+    tickers = [f"T{i}" for i in range(500)]
+    scores = pd.Series(rng.integers(0, 50, size=500).astype(float), index=tickers)
+    index = RankIndex(tickers, scores.to_numpy())
+
+    for _ in range(5):
+        changed = rng.choice(tickers, size=25, replace=False)
+        new_scores = rng.integers(0, 50, size=25).astype(float)
+        new_scores[0] = np.nan
+        scores[changed] = new_scores
+        index.update(dict(zip(changed, new_scores)))
+
+        df = pd.DataFrame({"ticker": tickers, "final_score": scores.to_numpy()})
+        expected = scorer.get_top_n(df, n=len(df))["ticker"].tolist()
+        assert index.top(len(df)) == expected
+        assert index.rank(expected[17]) == 18
+
+    index.remove([expected[0]])
+    index.update({"NEW": 1e9})
+    assert index.top(2) == ["NEW", expected[1]] and len(index) == 500
+
+
+if __name__ == "__main__":
+    test_percentile_ranks_match_pandas()
+    test_normalize_metrics_identical_to_legacy_loop()
+    test_top_n_matches_stable_sort_with_ties()
+    test_rank_index_updates_match_full_resort()
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,80 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scoring import scorer
+from src.storage import snapshot_store
+
+
+def _scored(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ticker": [f"T{i:04d}" for i in range(n)],
+        "final_score": rng.normal(50, 10, n),
+        "debt_to_equity": rng.uniform(0, 2, n),
+        "cfo": rng.normal(1e6, 1e5, n)
+    })
+
+
+def _dates(k):
+    # Spans a year boundary, so compaction writes two year partitions
+    return [str(d.date()) for d in pd.date_range("2024-12-20", periods=k, freq="D")]
+
+
+def test_snapshots_match_get_top_n_across_compaction(tmp_path):
+    store = snapshot_store.SnapshotStore(str(tmp_path), compact_every=5)
+    dates = _dates(23)
+    frames = {date: _scored(200, i) for i, date in enumerate(dates)}
+    for date, df in frames.items():
+        store.append(date, df)
+    assert store.dates() == dates
+    assert len(store._part_dates()) < 5 and store._years() == ["2024", "2025"]
+
+    (latest, df_latest), (prev, df_prev) = store.latest(2, top_n=50)
+    assert (latest, prev) == (dates[-1], dates[-2])
+    assert list(df_latest["ticker"]) == list(scorer.get_top_n(frames[latest], n=50)["ticker"])
+    compacted = store.snapshot(dates[3])
+    assert list(compacted["ticker"]) == list(scorer.get_top_n(frames[dates[3]], n=200)["ticker"])
+    assert list(compacted["rank"]) == list(range(1, 201))
+    assert np.isnan(compacted["roe_10y"]).all()
+
+    # Trajectory: compacted years plus the uncompacted tail
+    trajectory = store.trajectory("T0007")
+    assert list(trajectory["date"]) == dates
+    for date in [dates[0], dates[12], dates[-1]]:
+        snap = store.snapshot(date)
+        expected = int(snap.loc[snap["ticker"] == "T0007", "rank"].iloc[0])
+        assert trajectory.loc[trajectory["date"] == date, "rank"].iloc[0] == expected
+
+    churn = store.churn_window(4, top_n=50)
+    assert list(churn["date"]) == dates[-3:]
+    before = set(store.snapshot(dates[-2], top_n=50)["ticker"])
+    assert set(churn["entered"].iloc[-1]) == set(df_latest["ticker"]) - before
+
+
+def test_replace_date_and_import_csv(tmp_path):
+    history = tmp_path / "history"
+    history.mkdir()
+    first = _scored(60, 1).sort_values("final_score", ascending=False)
+    first.head(50).to_csv(history / "top_50_2025-01-01.csv", index=False)
+    store = snapshot_store.SnapshotStore(str(tmp_path / "store"), compact_every=2)
+    assert store.import_csv_history(str(history)) == 1
+    assert store.import_csv_history(str(history)) == 0
+
+    # Re-running a date replaces its snapshot, before and after compaction
+    store.append("2025-01-02", _scored(60, 2))
+    store.append("2025-01-01", _scored(60, 3))
+    assert store.dates() == ["2025-01-01", "2025-01-02"]
+    assert len(store.snapshot("2025-01-01")) == 60
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in [test_snapshots_match_get_top_n_across_compaction, test_replace_date_and_import_csv]:
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print(">>> TEST PASSED SUCCESSFULLY")
@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+import concurrent.futures
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from src.data_ingestion import checkpoint, incremental
+from src.pipeline import run_data_pipeline
+from src.storage import feature_store
+from tests.test_async_ingestion import FakeProvider
+
+
+def test_staged_matches_async_with_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE_SEC", 0.001)
+    tickers = [f"T{i}" for i in range(20)] + ["EMPTY", "BROKEN"]
+
+    def provider():
+        return FakeProvider(delay=0, empty_tickers={"EMPTY"}, failing={"BROKEN"})
+
+    reference = feature_store.FeatureStore(str(tmp_path / "async"))
+    run_data_pipeline.run_async(tickers, reference, provider=provider(), run_date="2025-06-02")
+
+    store = feature_store.FeatureStore(str(tmp_path / "staged"))
+    journal = checkpoint.CheckpointLog(str(tmp_path / "checkpoint.jsonl"))
+    with run_data_pipeline.make_cpu_executor(workers=2) as executor:
+        _, stage_stats = run_data_pipeline.run_staged(
+            tickers, store, provider=provider(), run_date="2025-06-02", journal=journal,
+            executor=executor, chunk_size=4
+        )
+
+    expected = reference.read().set_index("ticker").sort_index()
+    got = store.read().set_index("ticker").sort_index()
+    assert list(got.index) == list(expected.index) == sorted(tickers[:20])
+    for col in feature_store.METRIC_NAMES + ["revenue", "price_current"]:
+        assert np.allclose(got[col], expected[col], equal_nan=True), col
+    assert journal.counts("2025-06-02") == {"ok": 20, "no_data": 1, "error": 1}
+    assert stage_stats.stage("cpu").items == 20 and stage_stats.stage("write").items == 20
+
+
+def test_backpressure_bounds_queue_and_names_bottleneck(tmp_path, monkeypatch):
+    # CPU stage slower than fetching: the raw queue fills and the I/O stage waits on it
+    build_row = incremental.build_row
+
+    def slow_build_row(*args, **kwargs):
+        time.sleep(0.01)
+        return build_row(*args, **kwargs)
+
+    monkeypatch.setattr(incremental, "build_row", slow_build_row)
+    tickers = [f"T{i}" for i in range(40)]
+    store = feature_store.FeatureStore(str(tmp_path / "store"))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        _, stage_stats = run_data_pipeline.run_staged(
+            tickers, store, provider=FakeProvider(delay=0), run_date="2025-06-02",
+            executor=executor, queue_size=3, chunk_size=2
+        )
+
+    report = stage_stats.report()
+    assert report["queue_max"] <= 3
+    assert report["stages"]["io"]["blocked_sec"] > 0
+    assert report["bottleneck"] == "cpu"
+    assert len(store.read()) == len(tickers)
+
+
+
+def test_write_error_stops_fetching(tmp_path, monkeypatch):
+    # The write stage fails on the first chunk: the error surfaces without fetching the rest
+    provider = FakeProvider(delay=0.001)
+
+    def broken_write_rows(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(run_data_pipeline, "write_rows", broken_write_rows)
+    tickers = [f"T{i}" for i in range(1000)]
+    store = feature_store.FeatureStore(str(tmp_path / "store"))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            run_data_pipeline.run_staged(tickers, store, provider=provider, run_date="2025-06-02",
+                                         executor=executor, queue_size=4, chunk_size=2)
+        except RuntimeError as e:
+            assert str(e) == "disk full"
+        else:
+            raise AssertionError("write error was swallowed")
+    assert provider.calls < len(tickers)  # at least one call per ticker for a full run
+
+
+if __name__ == "__main__":
+    print("Run with pytest (tests use the tmp_path and monkeypatch fixtures)")